@@ -0,0 +1,280 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+from typing import Callable, Hashable, List, Optional
+
+from frontend.page_cache import CacheEntry
+
+
+class SqliteCacheStore:
+    """
+    persistent cache tier storing cache entries in an sqlite database
+    so that a PageCache survives restarts
+
+    keys are stored as json and values are pickled
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Constructor
+
+        Args:
+            db_path(str): the path of the sqlite database file
+            max_bytes(int): the maximum total size of all stored entries
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(self.__class__.__name__)
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""CREATE TABLE IF NOT EXISTS cache_entry (
+  key TEXT PRIMARY KEY,
+  value BLOB NOT NULL,
+  size INTEGER NOT NULL,
+  created REAL NOT NULL,
+  expires REAL,
+  stale_until REAL
+)""")
+        # running total of the stored bytes - avoids a SUM on every put
+        self.size = self._total_size()
+
+    def _total_size(self) -> int:
+        """
+        get the total size of all stored entries from the database
+        """
+        with self._lock:
+            total = self._connection.execute(
+                "SELECT COALESCE(SUM(size),0) FROM cache_entry"
+            ).fetchone()[0]
+        return total
+
+    def _stored_size(self, encoded_key: str) -> int:
+        """
+        get the size of the entry with the given encoded key - 0 if there is none
+        - the lock must be held
+        """
+        row = self._connection.execute(
+            "SELECT size FROM cache_entry WHERE key=?", (encoded_key,)
+        ).fetchone()
+        size = row[0] if row else 0
+        return size
+
+    @classmethod
+    def of_cache_dir(
+        cls, cache_dir: str, name: str, max_bytes: int = 512 * 1024 * 1024
+    ) -> "SqliteCacheStore":
+        """
+        create the store with the given name in the given cache directory
+
+        Args:
+            cache_dir(str): the cache directory e.g. ~/.wikicms/cache
+            name(str): the name of the store e.g. the name of a frontend
+            max_bytes(int): the maximum total size of all stored entries
+
+        Returns:
+            SqliteCacheStore: the store
+        """
+        db_path = os.path.join(os.path.expanduser(cache_dir), f"{name}.db")
+        store = cls(db_path, max_bytes=max_bytes)
+        return store
+
+    @staticmethod
+    def encode_key(key: Hashable) -> str:
+        """
+        encode the given key e.g. a tuple of strings as json
+        """
+        if isinstance(key, tuple):
+            key = list(key)
+        encoded = json.dumps(key, ensure_ascii=False)
+        return encoded
+
+    @staticmethod
+    def decode_key(encoded: str) -> Hashable:
+        """
+        decode the given json key - lists become tuples again
+        """
+        key = json.loads(encoded)
+        if isinstance(key, list):
+            key = tuple(key)
+        return key
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        get the stored entry for the given key
+
+        Args:
+            key: the cache key
+
+        Returns:
+            CacheEntry: the entry or None
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value,size,created,expires,stale_until FROM cache_entry WHERE key=?",
+                (self.encode_key(key),),
+            ).fetchone()
+        entry = None
+        if row is not None:
+            value_blob, size, created, expires, stale_until = row
+            try:
+                value = pickle.loads(value_blob)
+                entry = CacheEntry(
+                    value=value,
+                    size=size,
+                    created=created,
+                    expires=expires,
+                    stale_until=stale_until,
+                )
+            except Exception as ex:
+                # e.g. the stored class has changed incompatibly
+                self.logger.warning(f"dropping unreadable cache entry {key}: {ex}")
+                self.delete(key)
+        return entry
+
+    def put(self, key: Hashable, entry: CacheEntry):
+        """
+        store the given entry for the given key
+
+        Args:
+            key: the cache key
+            entry(CacheEntry): the entry to store
+        """
+        value_blob = pickle.dumps(entry.value, protocol=pickle.HIGHEST_PROTOCOL)
+        encoded_key = self.encode_key(key)
+        with self._lock, self._connection:
+            replaced_size = self._stored_size(encoded_key)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO cache_entry VALUES (?,?,?,?,?,?)",
+                (
+                    encoded_key,
+                    value_blob,
+                    entry.size,
+                    entry.created,
+                    entry.expires,
+                    entry.stale_until,
+                ),
+            )
+            self.size += entry.size - replaced_size
+            if self.size > self.max_bytes:
+                self._shrink()
+
+    def _shrink(self):
+        """
+        delete the oldest entries until the byte budget is met
+        - the lock must be held
+        """
+        rows = self._connection.execute(
+            "SELECT key,size FROM cache_entry ORDER BY created"
+        )
+        evicted = []
+        for encoded_key, size in rows:
+            if self.size <= self.max_bytes:
+                break
+            evicted.append((encoded_key,))
+            self.size -= size
+        self._connection.executemany("DELETE FROM cache_entry WHERE key=?", evicted)
+
+    def delete(self, key: Hashable) -> bool:
+        """
+        delete the entry for the given key
+
+        Returns:
+            bool: True if an entry was deleted
+        """
+        encoded_key = self.encode_key(key)
+        with self._lock, self._connection:
+            self.size -= self._stored_size(encoded_key)
+            cursor = self._connection.execute(
+                "DELETE FROM cache_entry WHERE key=?", (encoded_key,)
+            )
+        return cursor.rowcount > 0
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        delete all entries whose key matches the given predicate
+        in a single transaction
+
+        Returns:
+            int: the number of deleted entries
+        """
+        with self._lock, self._connection:
+            rows = self._connection.execute(
+                "SELECT key,size FROM cache_entry"
+            ).fetchall()
+            deleted = [
+                (encoded_key, size)
+                for encoded_key, size in rows
+                if predicate(self.decode_key(encoded_key))
+            ]
+            self._connection.executemany(
+                "DELETE FROM cache_entry WHERE key=?",
+                [(encoded_key,) for encoded_key, _size in deleted],
+            )
+            self.size -= sum(size for _encoded_key, size in deleted)
+        return len(deleted)
+
+    def purge(self, now: float) -> int:
+        """
+        delete all entries that may not even be served stale anymore
+
+        Args:
+            now(float): the current time
+
+        Returns:
+            int: the number of deleted entries
+        """
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                """DELETE FROM cache_entry
+WHERE COALESCE(stale_until, expires) IS NOT NULL
+AND COALESCE(stale_until, expires) <= ?""",
+                (now,),
+            )
+        # purging is rare - recount instead of selecting the sizes first
+        self.size = self._total_size()
+        return cursor.rowcount
+
+    def clear(self):
+        """
+        delete all entries
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM cache_entry")
+            self.size = 0
+
+    def keys(self) -> List[Hashable]:
+        """
+        get the keys of all stored entries
+        """
+        with self._lock:
+            rows = self._connection.execute("SELECT key FROM cache_entry").fetchall()
+        keys = [self.decode_key(row[0]) for row in rows]
+        return keys
+
+    def __len__(self) -> int:
+        with self._lock:
+            count = self._connection.execute(
+                "SELECT COUNT(*) FROM cache_entry"
+            ).fetchone()[0]
+        return count
+
+    def close(self):
+        """
+        close the database connection
+        """
+        with self._lock:
+            self._connection.close()
@@ -4,12 +4,17 @@ Created on 2022-11-24
 @author: wf
 """
 
+import os
+import socket
 import sys
 from argparse import ArgumentParser
 
+from mwstools_backend.server import Servers
 from ngwidgets.cmd import WebserverCmd
 
+from frontend.static_export import StaticExporter
 from frontend.webserver import CmsWebServer
+from frontend.wikicms import WikiFrontends
 
 
 class CmsMain(WebserverCmd):
@@ -31,8 +36,169 @@ class CmsMain(WebserverCmd):
             required=False,
             help="space-separated list of sites (or use comma-separated string)",
         )
+        parser.add_argument(
+            "--cache-ttl",
+            type=float,
+            help="time to live of rendered pages in the page cache in seconds",
+        )
+        parser.add_argument(
+            "--cache-max-mb",
+            type=float,
+            help="maximum size of the page cache per site in MB",
+        )
+        parser.add_argument(
+            "--cache-stale-ttl",
+            type=float,
+            help="seconds an expired page is still served while it is refreshed or the wiki fails",
+        )
+        parser.add_argument(
+            "--cache-dir",
+            help="directory of the persistent page cache that survives restarts e.g. ~/.wikicms/cache",
+        )
+        parser.add_argument(
+            "--cache-store-max-mb",
+            type=float,
+            help="maximum size of the persistent page cache per site in MB",
+        )
+        parser.add_argument(
+            "--media-cache-dir",
+            help="directory of the disk cache for proxied images and videos e.g. ~/.wikicms/media",
+        )
+        parser.add_argument(
+            "--media-cache-max-mb",
+            type=float,
+            help="maximum size of the media cache per site in MB",
+        )
+        parser.add_argument(
+            "--media-cache-max-age",
+            type=float,
+            help="seconds until a cached image or video is revalidated with the wiki",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            help="seconds between polls of the wikis' recent changes to invalidate changed pages",
+        )
+        parser.add_argument(
+            "--stream-threshold",
+            type=int,
+            help="minimum size in characters of page html that is filtered and sent as a chunked stream instead of being cached",
+        )
+        parser.add_argument(
+            "--proxy-pool-size",
+            type=int,
+            help="maximum number of keep-alive connections per site for proxied images and videos",
+        )
+        parser.add_argument(
+            "--proxy-connect-timeout",
+            type=float,
+            help="seconds to wait for a connection to the wiki when proxying",
+        )
+        parser.add_argument(
+            "--proxy-read-timeout",
+            type=float,
+            help="seconds to wait for data from the wiki when proxying",
+        )
+        parser.add_argument(
+            "--proxy-retries",
+            type=int,
+            help="number of retries of failed proxy requests",
+        )
+        parser.add_argument(
+            "--filter-keys",
+            nargs="+",
+            help="html filter stages e.g. www=editsection,parser-output,-comments or editsection for all sites",
+        )
+        parser.add_argument(
+            "--minify-resources",
+            action="store_true",
+            help="minify the css/js resources framing every page",
+        )
+        parser.add_argument(
+            "--prewarm",
+            action="store_true",
+            help="render the default, CMS and most visited pages into the page cache at startup",
+        )
+        parser.add_argument(
+            "--prewarm-top",
+            type=int,
+            default=0,
+            help="number of most visited pages from the clickstream logs to prewarm",
+        )
+        parser.add_argument(
+            "--prewarm-workers",
+            type=int,
+            default=4,
+            help="maximum number of concurrent renderings per site while prewarming",
+        )
+        parser.add_argument(
+            "--clickstream-path",
+            default=os.path.expanduser("~/.clickstream"),
+            help="directory of the clickstream logs (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--export",
+            action="store_true",
+            help="export all pages of the given --sites as static html files to --out",
+        )
+        parser.add_argument(
+            "--out",
+            default="static",
+            help="output directory of the static export (default: %(default)s)",
+        )
+        parser.add_argument(
+            "--export-workers",
+            type=int,
+            default=8,
+            help="number of pages rendered concurrently by the static export",
+        )
+        parser.add_argument(
+            "--full-export",
+            action="store_true",
+            help="re-render all pages instead of only the pages changed since the last export",
+        )
         return parser
 
+    def handle_args(self, args) -> bool:
+        """
+        handle the static export on top of the default arguments
+        """
+        handled = super().handle_args(args)
+        if not handled and args.export:
+            self.export_sites(args)
+            handled = True
+        return handled
+
+    def export_sites(self, args):
+        """
+        export the sites given in the command line arguments as static html
+        """
+        servers = Servers.of_config_path()
+        server = servers.servers.get(args.server or socket.gethostname())
+        wiki_frontends = WikiFrontends(servers)
+        # the same configuration as for serving the sites
+        sites = wiki_frontends.configure(args, server)
+        if not sites and server is None:
+            # not run on a configured server - all frontends are the default
+            sites = wiki_frontends.get_sites(args, list(servers.frontends_by_name))
+        for site in sites:
+            wiki_frontend = wiki_frontends.get_frontend(site)
+            if wiki_frontend is None:
+                print(f"unknown site {site}", file=sys.stderr)
+                continue
+            exporter = StaticExporter(
+                wiki_frontend, args.out, max_workers=args.export_workers
+            )
+            if args.full_export:
+                result = exporter.export()
+            else:
+                result = exporter.export_incremental()
+            print(
+                f"{site}: exported {result.pages} pages and {result.assets} assets to {exporter.site_dir}"
+                f" ({len(result.failed)} pages and {len(result.failed_assets)} assets failed,"
+                f" {result.unchanged} pages unchanged, {len(result.removed)} pages removed)"
+            )
+
     def cmd_main(self, argv=None):
         """
         override cmd_main to load forms before starting the webserver
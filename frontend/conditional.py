@@ -0,0 +1,83 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Mapping, Optional
+
+
+def http_date(timestamp: float) -> str:
+    """
+    format the given epoch timestamp as an http date e.g. for Last-Modified
+    """
+    return formatdate(timestamp, usegmt=True)
+
+
+def parse_http_date(value: str) -> Optional[float]:
+    """
+    parse the given http date to an epoch timestamp
+
+    Returns:
+        float: the timestamp or None if the value is not a valid date
+    """
+    try:
+        timestamp = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        timestamp = None
+    return timestamp
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    check whether the given If-None-Match header matches the given etag
+    using the weak comparison of RFC 7232 section 2.3.2
+
+    Args:
+        if_none_match(str): the header value e.g. '"abc", W/"def"' or '*'
+        etag(str): the current entity tag of the resource
+    """
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def is_not_modified(
+    request_headers: Optional[Mapping[str, str]],
+    etag: Optional[str] = None,
+    last_modified: Optional[float] = None,
+) -> bool:
+    """
+    evaluate the conditional GET headers of a request - If-None-Match takes
+    precedence over If-Modified-Since as required by RFC 7232 section 6
+
+    Args:
+        request_headers: the headers of the client request
+        etag(str): the current entity tag of the resource
+        last_modified(float): the modification timestamp of the resource
+
+    Returns:
+        bool: True if the client's copy is current and a 304 may be sent
+    """
+    if not request_headers:
+        return False
+    headers = {name.lower(): value for name, value in request_headers.items()}
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = etag is not None and etag_matches(if_none_match, etag)
+        return not_modified
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        since = parse_http_date(if_modified_since)
+        # http dates have a resolution of seconds
+        not_modified = since is not None and int(last_modified) <= since
+        return not_modified
+    return False
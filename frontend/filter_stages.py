@@ -0,0 +1,150 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class FilterContext:
+    """
+    the state passed through the stages of a filter pipeline
+    """
+
+    root: Any  # the lxml element whose content is the filtered html
+    lang: str = "en"
+    # (slot html, form html) tuples to insert after serialization
+    forms: List[tuple] = field(default_factory=list)
+
+
+@dataclass
+class FilterStage:
+    """
+    a registered stage of the MediaWikiHtmlFilter pipeline
+    """
+
+    key: str  # the filter key e.g. editsection
+    func: Callable  # func(html_filter, context) modifying the context
+    enabled_by_default: bool = True  # run even if not listed in filterKeys
+    description: str = ""
+
+
+@dataclass
+class StageStats:
+    """
+    wall time and input/output size of a filter stage
+
+    sizes are in bytes for html strings and in elements for trees
+    """
+
+    calls: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    in_size: int = 0
+    out_size: int = 0
+
+    @property
+    def avg_ms(self) -> float:
+        """
+        the average wall time per call in milliseconds
+        """
+        avg = 1000 * self.seconds / self.calls if self.calls else 0.0
+        return avg
+
+    def add(self, seconds: float, in_size: int, out_size: int):
+        self.calls += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.in_size += in_size
+        self.out_size += out_size
+
+
+class FilterStageRegistry:
+    """
+    registry of filter stages by key - the registration order is the
+    order in which stages enabled by default run if filterKeys does not
+    mention them
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, FilterStage] = {}
+
+    def register(
+        self,
+        key: str,
+        func: Callable,
+        enabled_by_default: bool = True,
+        description: str = "",
+    ) -> FilterStage:
+        """
+        register a stage - replacing a stage with the same key
+
+        Returns:
+            FilterStage: the registered stage
+        """
+        stage = FilterStage(key, func, enabled_by_default, description)
+        self.stages[key] = stage
+        return stage
+
+    def get(self, key: str) -> Optional[FilterStage]:
+        return self.stages.get(key)
+
+    def pipeline(self, filter_keys: List[str]) -> List[FilterStage]:
+        """
+        get the stages to run for the given filter keys: the listed stages
+        in the listed order followed by the stages enabled by default that
+        are neither listed nor disabled with a "-" prefix e.g. "-comments"
+
+        Args:
+            filter_keys(list): the filter keys of a frontend
+
+        Returns:
+            list: the stages to run
+        """
+        disabled = {key[1:] for key in filter_keys if key.startswith("-")}
+        keys = []
+        for key in filter_keys:
+            if not key.startswith("-") and key in self.stages and key not in keys:
+                keys.append(key)
+        for key, stage in self.stages.items():
+            if stage.enabled_by_default and key not in keys and key not in disabled:
+                keys.append(key)
+        stages = [self.stages[key] for key in keys if key not in disabled]
+        return stages
+
+
+class StageTimer:
+    """
+    thread safe collection of the StageStats of a filter
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats: Dict[str, StageStats] = {}
+
+    def record(self, key: str, seconds: float, in_size: int, out_size: int):
+        """
+        record a run of the given stage
+
+        Args:
+            key(str): the stage key
+            seconds(float): the wall time of the run
+            in_size(int): the size of the input
+            out_size(int): the size of the output
+        """
+        with self._lock:
+            self.stats.setdefault(key, StageStats()).add(seconds, in_size, out_size)
+
+    def snapshot(self) -> Dict[str, StageStats]:
+        """
+        get a copy of the statistics by stage key
+        """
+        with self._lock:
+            snapshot = {
+                key: StageStats(**vars(stats)) for key, stats in self.stats.items()
+            }
+        return snapshot
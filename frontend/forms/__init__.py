@@ -7,16 +7,22 @@ Created on 2026-03-30
 from frontend.forms.form_field import FormDefinition, FormField, resolve_i18n
 from frontend.forms.handler import FormHandler
 from frontend.forms.registry import FormRegistry
-from frontend.forms.renderer import FormRenderer
-from frontend.forms.validators import build_wtforms_validators, validate_with_wtforms
+from frontend.forms.renderer import CompiledForm, FormRenderer
+from frontend.forms.validators import (
+    build_wtforms_validators,
+    get_wtforms_validators,
+    validate_with_wtforms,
+)
 
 __all__ = [
+    "CompiledForm",
     "FormDefinition",
     "FormField",
     "FormHandler",
     "FormRegistry",
     "FormRenderer",
     "build_wtforms_validators",
+    "get_wtforms_validators",
     "resolve_i18n",
     "validate_with_wtforms",
 ]
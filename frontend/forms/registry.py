@@ -4,11 +4,14 @@ Created on 2026-03-30
 @author: wf
 """
 
+import hashlib
 import os
+import threading
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from frontend.forms.form_field import FormDefinition
+from frontend.forms.form_field import FormDefinition, FormField
+from frontend.forms.renderer import CompiledForm, FormRenderer
 
 DEFAULT_FORMS_DIR = os.path.expanduser("~/.wikicms/forms")
 
@@ -28,9 +31,55 @@ class FormRegistry:
     """
 
     _instance: Optional["FormRegistry"] = None
+    # incremented whenever forms change so that caches of rendered forms
+    # can detect outdated entries
+    _version: int = 0
 
     def __init__(self):
         self._forms: Dict[str, FormDefinition] = {}
+        # compiled forms and blank form html by (form name, lang, version)
+        self._compiled: Dict[Tuple[str, str, int], CompiledForm] = {}
+        self._blank_html: Dict[Tuple[str, str, int], str] = {}
+        # WTForms validator chains of the registered forms
+        # by (form name, field name, lang, version)
+        self._validator_chains: Dict[Tuple[str, str, str, int], List[Any]] = {}
+        # (version, fingerprint) of the latest fingerprint calculation
+        self._fingerprint: Optional[Tuple[int, str]] = None
+        self._cache_lock = threading.Lock()
+        FormRegistry._version += 1
+
+    @classmethod
+    def version(cls) -> int:
+        """
+        Return the version of the registered forms - it changes whenever a
+        form is registered or a new registry is created.
+
+        Returns:
+            int: the version
+        """
+        return cls._version
+
+    @classmethod
+    def fingerprint(cls) -> str:
+        """
+        Return a fingerprint of the registered forms - unlike the version it
+        is the same in every process that registers the same forms.
+
+        Returns:
+            str: the sha256 hex digest of the form definitions
+        """
+        registry = cls.instance()
+        with registry._cache_lock:
+            if (
+                registry._fingerprint is None
+                or registry._fingerprint[0] != cls._version
+            ):
+                digest = hashlib.sha256()
+                for name in sorted(registry._forms):
+                    digest.update(repr(registry._forms[name]).encode("utf-8"))
+                registry._fingerprint = (cls._version, digest.hexdigest())
+            fingerprint = registry._fingerprint[1]
+        return fingerprint
 
     @classmethod
     def _load_dir(cls, forms_dir: str) -> None:
@@ -88,7 +137,13 @@ class FormRegistry:
         Args:
             form_def(FormDefinition): the form definition to register
         """
-        cls.instance()._forms[form_def.name] = form_def
+        registry = cls.instance()
+        with registry._cache_lock:
+            registry._forms[form_def.name] = form_def
+            registry._compiled.clear()
+            registry._blank_html.clear()
+            registry._validator_chains.clear()
+            FormRegistry._version += 1
 
     @classmethod
     def register_from_yaml(cls, yaml_path: str) -> FormDefinition:
@@ -118,3 +173,97 @@ class FormRegistry:
         """
         form_def = cls.instance()._forms.get(name)
         return form_def
+
+    @classmethod
+    def compiled(cls, name: str, lang: str = "en") -> Optional[CompiledForm]:
+        """
+        Get the registered form with the given name compiled for the given
+        language - cached per (name, lang, version) so that re-rendering it
+        with values and errors e.g. after a failed validation is a join.
+
+        Args:
+            name(str): the form name
+            lang(str): language code for i18n resolution
+
+        Returns:
+            CompiledForm: the compiled form or None if no such form is registered
+        """
+        registry = cls.instance()
+        with registry._cache_lock:
+            form_def = registry._forms.get(name)
+            key = (name, lang, cls._version)
+            compiled = registry._compiled.get(key)
+        if form_def is not None and compiled is None:
+            compiled = FormRenderer().compile(form_def, lang=lang)
+            with registry._cache_lock:
+                # the definition may have changed while compiling
+                if key[2] == cls._version:
+                    registry._compiled[key] = compiled
+        return compiled
+
+    @classmethod
+    def render_blank(cls, name: str, lang: str = "en") -> Optional[str]:
+        """
+        Render the registered form with the given name without values and
+        errors - the html is cached per (name, lang, version) so that pages
+        with forms are not re-rendered field by field on every request.
+
+        Args:
+            name(str): the form name
+            lang(str): language code for i18n resolution
+
+        Returns:
+            str: the rendered html or None if no such form is registered
+        """
+        registry = cls.instance()
+        with registry._cache_lock:
+            form_def = registry._forms.get(name)
+            key = (name, lang, cls._version)
+            html = registry._blank_html.get(key)
+        if form_def is not None and html is None:
+            html = cls.compiled(name, lang).render()
+            with registry._cache_lock:
+                # the definition may have changed while rendering
+                if key[2] == cls._version:
+                    registry._blank_html[key] = html
+        return html
+
+    @classmethod
+    def validator_chain(
+        cls,
+        form_def: FormDefinition,
+        field: FormField,
+        lang: str,
+        build: Callable[[FormField, str], List[Any]],
+    ) -> List[Any]:
+        """
+        Get the validator chain of the given field of the given definition -
+        built with build(field, lang) once per (form name, field name, lang,
+        version) for registered definitions.
+
+        Other definitions e.g. ad-hoc test forms are built on every call so
+        that they are neither kept alive nor mixed up with an equally named
+        registered form.
+
+        Args:
+            form_def(FormDefinition): the form definition the field belongs to
+            field(FormField): the field whose validator chain to get
+            lang(str): language code used to resolve i18n error messages
+            build: the function building the chain
+
+        Returns:
+            list: the validator chain
+        """
+        registry = cls.instance()
+        with registry._cache_lock:
+            registered = registry._forms.get(form_def.name) is form_def
+            key = (form_def.name, field.name, lang, cls._version)
+            validators = registry._validator_chains.get(key) if registered else None
+        if validators is None:
+            validators = build(field, lang)
+            if registered:
+                with registry._cache_lock:
+                    # a form may have been registered while building
+                    if key[3] == cls._version:
+                        registry._validator_chains[key] = validators
+        return validators
@@ -8,12 +8,66 @@ Produces HTML matching the original Rythm template output from
 MediaWiki:Form.rythm (preField/postField/showFormContent).
 """
 
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Union
 
 from markupsafe import Markup, escape
 
 from frontend.forms.form_field import FormDefinition, FormField, I18n
 
+Values = Dict[str, str]
+Errors = Dict[str, List[str]]
+# a static html fragment or a slot rendering the dynamic part from values and errors
+Fragment = Union[str, Callable[[Values, Errors], str]]
+
+
+class CompiledForm:
+    """
+    A form definition rendered for a language with slots for the field
+    values and errors - re-rendering is a join of the fragments.
+    """
+
+    def __init__(self, fragments: List[Fragment]):
+        """
+        Constructor
+
+        Args:
+            fragments(list): the static strings and slots - adjacent
+                static strings are merged
+        """
+        self.fragments: List[Fragment] = []
+        for fragment in fragments:
+            if isinstance(fragment, str):
+                # plain str - concatenating Markup would escape the next fragment
+                fragment = str(fragment)
+                if self.fragments and isinstance(self.fragments[-1], str):
+                    self.fragments[-1] += fragment
+                    continue
+            self.fragments.append(fragment)
+
+    def render(
+        self, values: Optional[Values] = None, errors: Optional[Errors] = None
+    ) -> Markup:
+        """
+        Render the form with the given values and errors.
+
+        Args:
+            values(dict): optional pre-filled field values keyed by field name
+            errors(dict): optional validation errors keyed by field name
+
+        Returns:
+            Markup: rendered HTML
+        """
+        if values is None:
+            values = {}
+        if errors is None:
+            errors = {}
+        parts = [
+            fragment if isinstance(fragment, str) else fragment(values, errors)
+            for fragment in self.fragments
+        ]
+        result = Markup("".join(parts))
+        return result
+
 
 class FormRenderer:
     """
@@ -23,6 +77,9 @@ class FormRenderer:
     multilingual form definitions (label/placeholder/error_msg as dicts)
     are rendered in the requested language.
 
+    A FormDefinition is compiled per language to a CompiledForm first -
+    see compile - that only fills in values and errors when rendering.
+
     Indentation matches the original Rythm template output.
     """
 
@@ -53,11 +110,20 @@ class FormRenderer:
         Returns:
             str: rendered HTML string
         """
-        if values is None:
-            values = {}
-        if errors is None:
-            errors = {}
+        result = self.compile(form_def, lang).render(values, errors)
+        return result
 
+    def compile(self, form_def: FormDefinition, lang: str = "en") -> CompiledForm:
+        """
+        Compile the form definition for the given language.
+
+        Args:
+            form_def(FormDefinition): the form definition to compile
+            lang(str): language code for i18n resolution (default "en")
+
+        Returns:
+            CompiledForm: the static fragments with value and error slots
+        """
         legend = I18n.resolve(form_def.legend, lang)
         form_css_class = (
             form_def.css_class
@@ -65,13 +131,13 @@ class FormRenderer:
             else "form-horizontal"
         )
 
-        parts = []
-        parts.append(
+        fragments: List[Fragment] = []
+        fragments.append(
             Markup(
                 f'{self.I2}<form class="{form_css_class}" action="{escape(form_def.action)}" method="post">\n'
             )
         )
-        parts.append(
+        fragments.append(
             Markup(
                 f"{self.I4}<fieldset>\n"
                 f"{self.I4}<!-- Form Name -->\n"
@@ -80,42 +146,40 @@ class FormRenderer:
         )
 
         for field in form_def.fields:
-            field_html = self._render_field(
-                field,
-                values.get(field.name, ""),
-                errors.get(field.name, []),
-                lang,
-            )
-            parts.append(field_html)
+            fragments.extend(self._compile_field(field, lang))
 
-        parts.append(self._render_submit(form_def, lang))
-        parts.append(Markup(f"{self.I4}</fieldset>\n{self.I2}</form>\n"))
+        fragments.append(self._render_submit(form_def, lang))
+        fragments.append(Markup(f"{self.I4}</fieldset>\n{self.I2}</form>\n"))
 
-        result = Markup("").join(parts)
-        return result
+        compiled = CompiledForm(fragments)
+        return compiled
 
-    def _render_field(
-        self, field: FormField, value: str, field_errors: List[str], lang: str = "en"
-    ) -> Markup:
+    def _compile_field(self, field: FormField, lang: str = "en") -> List[Fragment]:
         """
-        Render a single form field.
+        Compile a single form field.
 
         Args:
             field(FormField): the field definition
-            value(str): current field value
-            field_errors(list): list of error messages for this field
             lang(str): language code for i18n resolution
 
         Returns:
-            Markup: rendered field HTML
+            list: the fragments of the field
         """
         if field.field_type == "hidden":
-            hidden_value = escape(value or field.value or "")
-            rendered = Markup(
-                f'{self.I8}<input type="hidden" name="{escape(field.name)}"'
-                f' id="{escape(field.name)}" value="{hidden_value}">\n'
-            )
-            return rendered
+            default = field.value or ""
+
+            def hidden_value(values: Values, _errors: Errors) -> str:
+                return str(escape(values.get(field.name, "") or default))
+
+            fragments = [
+                Markup(
+                    f'{self.I8}<input type="hidden" name="{escape(field.name)}"'
+                    f' id="{escape(field.name)}" value="'
+                ),
+                hidden_value,
+                '">\n',
+            ]
+            return fragments
 
         # Resolve label — always a FormLabel object
         label = field.label
@@ -130,15 +194,15 @@ class FormRenderer:
             f"{label_extra_css} {size_css}".strip() if label_extra_css else size_css
         )
 
-        parts = []
+        fragments = []
         # form-group open
-        parts.append(Markup(f'{self.I8}<div class="form-group">\n'))
+        fragments.append(Markup(f'{self.I8}<div class="form-group">\n'))
         # label
-        parts.append(
+        fragments.append(
             Markup(f'{self.I10}<label class="{label_css}">{label_text}</label>  \n')
         )
         # input container open
-        parts.append(
+        fragments.append(
             Markup(
                 f'{self.I10}<div class="col-md-6 inputGroupContainer">\n'
                 f'{self.I12}<div class="input-group">\n'
@@ -146,7 +210,7 @@ class FormRenderer:
         )
         # glyphicon addon
         if field.glyphicon:
-            parts.append(
+            fragments.append(
                 Markup(
                     f'{self.I14}<span class="input-group-addon">'
                     f'<i class="glyphicon glyphicon-{escape(field.glyphicon)}"></i>'
@@ -154,82 +218,112 @@ class FormRenderer:
                 )
             )
         # input element
-        parts.append(
-            Markup(f"{self.I14}")
-            + self._render_input(field, value, lang)
-            + Markup("\n")
-        )
+        fragments.append(self.I14)
+        fragments.extend(self._compile_input(field, lang))
+        fragments.append("\n")
         # input container close
-        parts.append(Markup(f"{self.I12}</div>\n{self.I10}</div>\n"))
+        fragments.append(Markup(f"{self.I12}</div>\n{self.I10}</div>\n"))
         # error messages
-        for error in field_errors:
-            parts.append(
-                Markup(
-                    f'{self.I10}<small class="help-block" data-bv-validator="notEmpty">'
-                    f"{escape(error)}</small>\n"
-                )
+        error_prefix = (
+            f'{self.I10}<small class="help-block" data-bv-validator="notEmpty">'
+        )
+
+        def error_messages(_values: Values, errors: Errors) -> str:
+            messages = "".join(
+                f"{error_prefix}{escape(error)}</small>\n"
+                for error in errors.get(field.name, [])
             )
-        # form-group close
-        parts.append(Markup(f"{self.I8}</div>\n"))
+            return messages
 
-        result = Markup("").join(parts)
-        return result
+        fragments.append(error_messages)
+        # form-group close
+        fragments.append(Markup(f"{self.I8}</div>\n"))
+        return fragments
 
-    def _render_input(self, field: FormField, value: str, lang: str = "en") -> Markup:
+    def _compile_input(self, field: FormField, lang: str = "en") -> List[Fragment]:
         """
-        Render the input element for a field.
+        Compile the input element for a field.
 
         Args:
             field(FormField): the field definition
-            value(str): current field value
             lang(str): language code for i18n resolution
 
         Returns:
-            Markup: rendered input HTML
+            list: the fragments of the input element
         """
         placeholder = escape(I18n.resolve(field.placeholder, lang) or "")
         field_name = escape(field.name)
         base_class = field.css_class if field.css_class else "form-control"
 
+        def value(values: Values, _errors: Errors) -> str:
+            return str(escape(values.get(field.name, "")))
+
         if field.field_type == "textarea":
-            rendered = Markup(
-                f'<textarea name="{field_name}" id="{field_name}"'
-                f' placeholder="{placeholder}" class="{base_class}">'
-                f"{escape(value)}</textarea>"
-            )
+            fragments = [
+                Markup(
+                    f'<textarea name="{field_name}" id="{field_name}"'
+                    f' placeholder="{placeholder}" class="{base_class}">'
+                ),
+                value,
+                "</textarea>",
+            ]
         elif field.field_type == "select":
             choices = field.choices or []
             placeholder_choice = I18n.resolve(field.placeholder_choice, lang)
-            options_parts = []
+            # (choice or None for the placeholder, option html, selected option html)
+            options = []
             if placeholder_choice:
-                selected_attr = " selected" if not value else ""
-                options_parts.append(
-                    Markup(
-                        f'{self.I14}<option value=" "{selected_attr}>'
-                        f"{escape(placeholder_choice)}</option>"
+                text = escape(placeholder_choice)
+                options.append(
+                    (
+                        None,
+                        f'{self.I14}<option value=" ">{text}</option>',
+                        f'{self.I14}<option value=" " selected>{text}</option>',
                     )
                 )
             for c in choices:
-                selected_attr = " selected" if c == value else ""
-                options_parts.append(
-                    Markup(f"{self.I14}<option{selected_attr}>{escape(c)}</option>")
+                text = escape(c)
+                options.append(
+                    (
+                        c,
+                        f"{self.I14}<option>{text}</option>",
+                        f"{self.I14}<option selected>{text}</option>",
+                    )
                 )
-            options = Markup("\n").join(options_parts)
+
+            def select_options(values: Values, _errors: Errors) -> str:
+                selected_value = values.get(field.name, "")
+                option_lines = []
+                for c, plain, selected in options:
+                    if c is None:
+                        is_selected = not selected_value
+                    else:
+                        is_selected = c == selected_value
+                    option_lines.append(selected if is_selected else plain)
+                html = "\n".join(option_lines)
+                return html
+
             if "selectpicker" not in base_class:
                 base_class = f"{base_class} selectpicker"
-            rendered = Markup(
-                f'<select name="{field_name}" id="{field_name}"'
-                f' class="{base_class}">\n'
-                f"{options}\n"
-                f"{self.I14}</select>"
-            )
+            fragments = [
+                Markup(
+                    f'<select name="{field_name}" id="{field_name}"'
+                    f' class="{base_class}">\n'
+                ),
+                select_options,
+                f"\n{self.I14}</select>",
+            ]
         else:
-            rendered = Markup(
-                f'<input type="text" name="{field_name}" id="{field_name}"'
-                f' placeholder="{placeholder}" class="{base_class}"'
-                f' value="{escape(value)}">'
-            )
-        return rendered
+            fragments = [
+                Markup(
+                    f'<input type="text" name="{field_name}" id="{field_name}"'
+                    f' placeholder="{placeholder}" class="{base_class}"'
+                    f' value="'
+                ),
+                value,
+                '">',
+            ]
+        return fragments
 
     def _render_submit(self, form_def: FormDefinition, lang: str = "en") -> Markup:
         """
@@ -13,6 +13,7 @@ import wtforms.validators as wv
 from wtforms.validators import StopValidation
 
 from frontend.forms.form_field import FormDefinition, FormField, resolve_i18n
+from frontend.forms.registry import FormRegistry
 
 # Map of YAML type names to WTForms validator classes
 _VALIDATOR_MAP: Dict[str, Any] = {
@@ -83,6 +84,28 @@ def build_wtforms_validators(field: FormField, lang: str = "en") -> List[Any]:
     return result
 
 
+def get_wtforms_validators(
+    form_def: FormDefinition, field: FormField, lang: str = "en"
+) -> List[Any]:
+    """
+    Get the WTForms validator chain of the given field - memoized by the
+    FormRegistry per form name, field name, lang and version for registered
+    definitions so that a submission only runs the checks.
+
+    Args:
+        form_def(FormDefinition): the form definition the field belongs to
+        field(FormField): the field whose validator chain to get
+        lang(str): language code used to resolve i18n error messages
+
+    Returns:
+        list: WTForms validator instances ready for use
+    """
+    validators = FormRegistry.validator_chain(
+        form_def, field, lang, build_wtforms_validators
+    )
+    return validators
+
+
 def validate_with_wtforms(
     form_def: FormDefinition,
     post_data: Dict[str, str],
@@ -108,7 +131,7 @@ def validate_with_wtforms(
     for field in form_def.fields:
         if field.field_type == "hidden":
             continue
-        validators = build_wtforms_validators(field, lang)
+        validators = get_wtforms_validators(form_def, field, lang)
         if not validators:
             continue
 
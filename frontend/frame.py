@@ -4,6 +4,8 @@ Created on 2020-07-27
 @author: wf
 """
 
+from typing import Iterable, Iterator, Tuple
+
 from frontend.resource_loader import ResourceLoader
 
 
@@ -39,6 +41,20 @@ class HtmlFrame:
             cls._resource_loader = ResourceLoader()
         return cls._resource_loader
 
+    @classmethod
+    def configure_resource_loader(cls, **kwargs) -> ResourceLoader:
+        """
+        Replace the shared ResourceLoader by one with the given options.
+
+        Args:
+            **kwargs: the ResourceLoader constructor arguments e.g. minify=True
+
+        Returns:
+            ResourceLoader: the new shared resource loader
+        """
+        cls._resource_loader = ResourceLoader(**kwargs)
+        return cls._resource_loader
+
     def __init__(self, frontend, title: str, lang: str = "en") -> None:
         """
         Initialize HtmlFrame with a specified language and title.
@@ -57,7 +73,8 @@ class HtmlFrame:
         Generate the header part of the HTML document.
 
         Includes Bootstrap 3 CSS/JS and any other resources from the
-        css/ and js/ resource directories.
+        css/ and js/ resource directories - inline styles and scripts
+        are referenced as fingerprinted bundles.
 
         Returns:
             str: Header part of an HTML document as a string.
@@ -65,8 +82,8 @@ class HtmlFrame:
         style_key = "CMS/style"
         style_html = self.frontend.cms_pages.get(style_key, "")
         loader = self.get_resource_loader()
-        css_includes = loader.css()
-        js_includes = loader.js()
+        css_includes = loader.bundle("css").html()
+        js_includes = loader.bundle("js").html()
         html = f"""<!doctype html>
 <html lang="{self.lang}">
 <head>
@@ -96,22 +113,49 @@ class HtmlFrame:
 """
         return html
 
-    def frame(self, content: str) -> str:
+    def frame_parts(self) -> Tuple[str, str]:
         """
-        Frame the given HTML content with the header and footer of the document.
-
-        Args:
-            content (str): HTML content to be framed within the HTML structure.
+        Get the html before and after the content of the framed document.
 
         Returns:
-            str: Complete HTML document as a string with the provided content framed.
+            tuple: the prefix and suffix of the framed html
         """
         header_key = f"CMS/header/{self.lang}"
         header_html = self.frontend.cms_pages.get(header_key, "")
-        html = f"""{self.header()}
+        prefix = f"""{self.header()}
 {header_html}
       <div class="container">
-{content}
+"""
+        suffix = f"""
       </div><!-- /.container -->
 {self.footer()}"""
+        return prefix, suffix
+
+    def frame(self, content: str) -> str:
+        """
+        Frame the given HTML content with the header and footer of the document.
+
+        Args:
+            content (str): HTML content to be framed within the HTML structure.
+
+        Returns:
+            str: Complete HTML document as a string with the provided content framed.
+        """
+        prefix, suffix = self.frame_parts()
+        html = f"{prefix}{content}{suffix}"
         return html
+
+    def frame_stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        """
+        Frame the given HTML content chunks without joining them.
+
+        Args:
+            chunks: the HTML content chunks e.g. of MediaWikiHtmlFilter.filter_stream
+
+        Yields:
+            str: the chunks of the framed document
+        """
+        prefix, suffix = self.frame_parts()
+        yield prefix
+        yield from chunks
+        yield suffix
@@ -0,0 +1,431 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import re
+from html import escape
+from html.parser import HTMLParser
+from typing import Iterable, Iterator, List, Optional
+
+# elements without end tag
+VOID_ELEMENTS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "source",
+    "track",
+    "wbr",
+}
+
+# the start tags that implicitly close the element on top of the stack
+# e.g. <li>one<li>two - the same rules the libxml2 parser of lxml applies
+_P_CLOSERS = {
+    "address",
+    "blockquote",
+    "caption",
+    "center",
+    "col",
+    "colgroup",
+    "dd",
+    "div",
+    "dl",
+    "dt",
+    "fieldset",
+    "form",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "hr",
+    "li",
+    "menu",
+    "ol",
+    "p",
+    "pre",
+    "table",
+    "tbody",
+    "td",
+    "tfoot",
+    "th",
+    "thead",
+    "tr",
+    "ul",
+}
+_CELL_CLOSERS = {"td", "th", "tr", "tbody", "thead", "tfoot"}
+IMPLICIT_END = {
+    "p": _P_CLOSERS,
+    "li": {"li"},
+    "dt": {"dt", "dd"},
+    "dd": {"dt", "dd"},
+    "td": _CELL_CLOSERS,
+    "th": _CELL_CLOSERS,
+    "tr": {"tr", "tbody", "thead", "tfoot"},
+    "thead": {"tbody", "thead", "tfoot"},
+    "tbody": {"tbody", "thead", "tfoot"},
+    "tfoot": {"tbody", "thead", "tfoot"},
+    "option": {"option", "optgroup"},
+}
+
+# the filter keys the StreamingHtmlRewriter implements
+STREAMABLE_KEYS = {
+    "parser-output",
+    "editsection",
+    "comments",
+    "empty-paragraphs",
+    "fix-urls",
+    "forms",
+}
+
+_BLANK_LINES = re.compile(r"\n\s*\n")
+
+
+def iter_chunks(text: str, chunk_size: int = 64 * 1024) -> Iterator[str]:
+    """
+    split the given text into chunks of the given size
+    """
+    for start in range(0, len(text), chunk_size):
+        yield text[start : start + chunk_size]
+
+
+class OpenElement:
+    """
+    an element the rewriter is inside of
+    """
+
+    # how the element is rewritten
+    KEEP = "keep"  # start and end tag are written
+    UNWRAP = "unwrap"  # only the content is written
+    DROP = "drop"  # neither tags nor content are written
+    WRAPPER = "wrapper"  # the mw-parser-output div - only the content is kept
+    EMPTY = "empty"  # an empty paragraph candidate - buffered until decided
+
+    def __init__(self, tag: str, mode: str, start_tag: str = "", space: str = ""):
+        self.tag = tag
+        self.mode = mode
+        # the start tag of a buffered empty paragraph candidate
+        self.start_tag = start_tag
+        # the whitespace before it - joined with the whitespace after it if it is dropped
+        self.space = space
+        self.buffer: List[str] = []
+
+
+class StreamingHtmlRewriter(HTMLParser):
+    """
+    event based rewriter applying the built-in filter stages of a
+    MediaWikiHtmlFilter while the tokens flow through - memory stays
+    bounded by the nesting depth instead of growing with the page size
+
+    the text is passed through as is - only rewritten start tags are
+    serialized again; implicitly closed elements e.g. <li>one<li>two get
+    explicit end tags the way lxml serializes them
+    """
+
+    # where the rewriter is relative to the mw-parser-output div
+    BEFORE = "before"  # held back until the div is found
+    INSIDE = "inside"  # written
+    AFTER = "after"  # dropped
+    # content before the mw-parser-output div up to this size is held back -
+    # beyond it the page is assumed to have no such div and it is written
+    prelude_max_size: int = 64 * 1024
+
+    def __init__(self, html_filter, lang: str = "en", keys: Iterable[str] = None):
+        """
+        Constructor
+
+        Args:
+            html_filter(MediaWikiHtmlFilter): the filter to take the site name, form registry and stages from
+            lang(str): language code for i18n resolution of forms
+            keys(list): the stage keys to apply - default: the pipeline of the filter
+        """
+        super().__init__(convert_charrefs=False)
+        self.html_filter = html_filter
+        self.lang = lang
+        if keys is None:
+            keys = [
+                stage.key
+                for stage in html_filter.stage_registry.pipeline(html_filter.filterKeys)
+            ]
+        self.keys = set(keys)
+        self.stack: List[OpenElement] = []
+        self.parser_output_found = False
+        self.region = self.BEFORE if "parser-output" in self.keys else self.INSIDE
+        self.prelude: List[str] = []
+        self.prelude_size = 0
+        self.out: List[str] = []
+        # trailing whitespace not written yet to collapse blank lines
+        self.pending_space = ""
+
+    @classmethod
+    def is_streamable(cls, keys: Iterable[str]) -> bool:
+        """
+        check whether all the given stage keys can be applied while streaming
+        """
+        streamable = set(keys) <= STREAMABLE_KEYS
+        return streamable
+
+    def rewrite(self, chunks: Iterable[str]) -> Iterator[str]:
+        """
+        rewrite the given html chunks
+
+        Args:
+            chunks: the html e.g. as read from a response
+
+        Yields:
+            str: the filtered html - suitable for a chunked response
+        """
+        for chunk in chunks:
+            self.feed(chunk)
+            output = self.pop_output()
+            if output:
+                yield output
+        self.close()
+        self.close_elements(0)
+        self.flush_space()
+        if self.region == self.BEFORE:
+            # there is no mw-parser-output div
+            self.write_prelude()
+        output = self.pop_output()
+        if output:
+            yield output
+
+    def pop_output(self) -> str:
+        """
+        get and clear the output written so far
+        """
+        output = "".join(self.out)
+        self.out.clear()
+        return output
+
+    @property
+    def dropping(self) -> bool:
+        dropping = bool(self.stack) and self.stack[-1].mode == OpenElement.DROP
+        return dropping
+
+    def has_class(self, attrs: dict, css_class: str) -> bool:
+        has_class = css_class in (attrs.get("class") or "").split()
+        return has_class
+
+    def write(self, text: str):
+        """
+        write the given text - buffered while inside an empty paragraph candidate
+        """
+        if self.stack and self.stack[-1].mode == OpenElement.EMPTY:
+            self.stack[-1].buffer.append(text)
+        elif self.region == self.INSIDE:
+            self.out.append(text)
+        elif self.region == self.BEFORE:
+            self.prelude.append(text)
+            self.prelude_size += len(text)
+            if self.prelude_size > self.prelude_max_size:
+                self.write_prelude()
+
+    def write_prelude(self):
+        """
+        write the held back content - there is no mw-parser-output div
+        """
+        self.region = self.INSIDE
+        self.parser_output_found = True
+        self.out.extend(self.prelude)
+        self.prelude = []
+
+    def flush_space(self):
+        if self.pending_space:
+            self.write(_BLANK_LINES.sub("\n", self.pending_space))
+            self.pending_space = ""
+
+    def write_markup(self, markup: str):
+        self.decide_empty(False)
+        self.flush_space()
+        self.write(markup)
+
+    def write_text(self, text: str):
+        """
+        write the given text collapsing blank lines - also across dropped markup
+        """
+        text = self.pending_space + text
+        stripped = text.rstrip()
+        self.pending_space = text[len(stripped) :]
+        if stripped:
+            self.decide_empty(False)
+            self.write(_BLANK_LINES.sub("\n", stripped))
+
+    def decide_empty(self, empty: bool):
+        """
+        decide about a buffered empty paragraph candidate
+
+        Args:
+            empty(bool): True if the paragraph ended with whitespace content only
+        """
+        if self.stack and self.stack[-1].mode == OpenElement.EMPTY:
+            element = self.stack[-1]
+            element.mode = OpenElement.KEEP
+            if empty:
+                self.pending_space = element.space
+            else:
+                space = _BLANK_LINES.sub("\n", element.space)
+                buffered = [space, element.start_tag] + element.buffer
+                element.buffer = []
+                for text in buffered:
+                    self.write(text)
+
+    def start_tag(self, tag: str, attrs: list) -> str:
+        """
+        serialize the given start tag - with fixed urls if configured
+        """
+        attr_dict = dict(attrs)
+        if "fix-urls" in self.keys:
+            fixed = dict(attr_dict)
+            if tag == "img":
+                self.html_filter.fix_attribute(fixed, "src", "/")
+                self.html_filter.fix_attribute(fixed, "srcset", "/", ", ")
+            elif tag == "source" and any(e.tag == "video" for e in self.stack):
+                self.html_filter.fix_attribute(fixed, "src", "/")
+            elif tag == "a":
+                self.html_filter.fix_attribute(fixed, "href", "/")
+            attrs = [(name, fixed.get(name, value)) for name, value in attrs]
+        parts = [tag]
+        for name, value in attrs:
+            if value is None:
+                parts.append(name)
+            else:
+                parts.append(f'{name}="{escape(value, quote=True)}"')
+        markup = f"<{' '.join(parts)}>"
+        return markup
+
+    def form_html(self, attrs: dict) -> Optional[str]:
+        """
+        get the rendered form for the given wikicms-form div attributes
+        """
+        form_html = None
+        registry = self.html_filter.form_registry
+        form_name = attrs.get("data-form-name")
+        if (
+            "forms" in self.keys
+            and registry is not None
+            and attrs.get("class") == "wikicms-form"
+            and form_name
+        ):
+            form_html = registry.render_blank(form_name, self.lang)
+        return form_html
+
+    def handle_starttag(self, tag: str, attrs: list):
+        if self.dropping:
+            if tag not in VOID_ELEMENTS:
+                self.stack.append(OpenElement(tag, OpenElement.DROP))
+            return
+        while self.stack and tag in IMPLICIT_END.get(self.stack[-1].tag, ()):
+            self.close_elements(len(self.stack) - 1)
+        attr_dict = dict(attrs)
+        mode = OpenElement.KEEP
+        if (
+            tag == "div"
+            and "parser-output" in self.keys
+            and not self.parser_output_found
+            and self.has_class(attr_dict, "mw-parser-output")
+        ):
+            # only the content of the div is kept
+            self.parser_output_found = True
+            self.region = self.INSIDE
+            self.prelude = []
+            self.pending_space = ""
+            mode = OpenElement.WRAPPER
+        elif tag in ("html", "body"):
+            mode = OpenElement.UNWRAP
+        elif tag == "head":
+            mode = OpenElement.DROP
+        elif (
+            tag == "span"
+            and "editsection" in self.keys
+            and self.has_class(attr_dict, "mw-editsection")
+        ):
+            mode = OpenElement.DROP
+        elif tag == "div":
+            form_html = self.form_html(attr_dict)
+            if form_html is not None:
+                self.write_markup(form_html)
+                mode = OpenElement.DROP
+        if mode == OpenElement.KEEP:
+            markup = self.start_tag(tag, attrs)
+            if (
+                tag == "p"
+                and "empty-paragraphs" in self.keys
+                and attr_dict.get("class") == "mw-empty-elt"
+            ):
+                self.decide_empty(False)
+                element = OpenElement(
+                    tag, OpenElement.EMPTY, markup, self.pending_space
+                )
+                self.pending_space = ""
+                self.stack.append(element)
+                return
+            self.write_markup(markup)
+        if tag not in VOID_ELEMENTS:
+            self.stack.append(OpenElement(tag, mode))
+
+    def handle_startendtag(self, tag: str, attrs: list):
+        if not self.dropping:
+            self.handle_starttag(tag, attrs)
+            if tag not in VOID_ELEMENTS and self.stack and self.stack[-1].tag == tag:
+                self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str):
+        # close implicitly closed elements up to the matching one -
+        # end tags without a matching start tag are dropped like lxml does
+        index = len(self.stack) - 1
+        while index >= 0 and self.stack[index].tag != tag:
+            index -= 1
+        if index >= 0:
+            self.close_elements(index)
+
+    def close_elements(self, index: int):
+        """
+        close the open elements from the top of the stack down to the given index
+
+        Args:
+            index(int): the stack index of the last element to close
+        """
+        while len(self.stack) > index:
+            element = self.stack[-1]
+            if element.mode == OpenElement.EMPTY:
+                # only whitespace since the start tag
+                self.decide_empty(True)
+                self.stack.pop()
+                continue
+            self.stack.pop()
+            if element.mode == OpenElement.KEEP:
+                self.write_markup(f"</{element.tag}>")
+            elif element.mode == OpenElement.WRAPPER:
+                # the content after the mw-parser-output div is dropped
+                self.flush_space()
+                self.region = self.AFTER
+
+    def handle_data(self, data: str):
+        if not self.dropping:
+            self.write_text(data)
+
+    def handle_entityref(self, name: str):
+        if not self.dropping:
+            self.write_text(f"&{name};")
+
+    def handle_charref(self, name: str):
+        if not self.dropping:
+            self.write_text(f"&#{name};")
+
+    def handle_comment(self, data: str):
+        if not self.dropping and "comments" not in self.keys:
+            self.write_markup(f"<!--{data}-->")
+
+    def handle_decl(self, decl: str):
+        # the doctype of a complete document is not part of the content
+        pass
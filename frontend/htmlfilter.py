@@ -4,13 +4,21 @@ Created on 2026-03-30
 @author: wf
 """
 
+import hashlib
+import logging
 import re
+import time
+from html import escape
+from typing import List, Optional
 
+import lxml.html
 from basemkit.yamlable import lod_storable
-from bs4 import BeautifulSoup, Comment
+from lxml import etree
 
+from frontend.filter_stages import FilterContext, FilterStageRegistry, StageTimer
 from frontend.forms.registry import FormRegistry
-from frontend.forms.renderer import FormRenderer
+from frontend.html_stream import StreamingHtmlRewriter
+from frontend.page_cache import PageCache
 
 
 @lod_storable
@@ -28,10 +36,26 @@ class PageContent:
     lang: str = (
         "en"  # the language of the wiki page - potentially derived from it's markup
     )
+    revid: int = None  # the revision id of the page
+    display_title: str = None  # the display title of the page
 
     def __post_init__(self):
         self.detect_lang()
 
+    def set_parse_result(self, parse: dict):
+        """
+        set my html, markup, revision id and display title from the result of a
+        MediaWiki action=parse api call with prop=text|wikitext|revid|displaytitle
+
+        Args:
+            parse(dict): the "parse" part of the api result
+        """
+        self.html = parse.get("text", {}).get("*")
+        self.markup = parse.get("wikitext", {}).get("*")
+        self.revid = parse.get("revid")
+        self.display_title = parse.get("displaytitle")
+        self.detect_lang()
+
     def detect_lang(self):
         if self.markup:
             lang_match = re.search(r"{{Language\|[^}]*language=([^}|]+)", self.markup)
@@ -71,14 +95,24 @@ class HtmlFilter:
 class MediaWikiHtmlFilter(HtmlFilter):
     """
     filter mediawiki content
+
+    the filter stages are registered by key in the stage_registry - the
+    filterKeys of an instance select, order and disable them
     """
 
+    stage_registry = FilterStageRegistry()
+    # stages slower than this are logged as warnings
+    slow_stage_seconds = 0.25
+
     def __init__(
         self,
         parser: str = "lxml",
         debug: bool = False,
         filterKeys=None,
         site_name: str = "",
+        memo_entries: int = 256,
+        memo_max_bytes: int = 16 * 1024 * 1024,
+        stream_threshold: Optional[int] = None,
     ):
         """
         Constructor
@@ -86,16 +120,30 @@ class MediaWikiHtmlFilter(HtmlFilter):
             parser(str): the beautiful soup parser to use e.g. html.parser
             debug(bool): True if debugging should be on
             filterKeys(list): a list of keys for filters to be applied e.g. editsection
+                - stages enabled by default run unless disabled with a "-" prefix
             site_name(str): the name of the site e.g. for prefixing image/href paths
+            memo_entries(int): the maximum number of memoized filter results - 0 for off
+            memo_max_bytes(int): the byte budget of the memoized filter results
+            stream_threshold(int): pages of at least this size may be streamed
+                with filter_stream instead of being filtered in memory - None for off
             form_registry(FormRegistry): optional singleton registry for form definitions
         """
         super().__init__(parser=parser, debug=debug)
+        self.filter_logger = logging.getLogger(self.__class__.__name__)
+        self.stage_timer = StageTimer()
         self.site_name = site_name
+        self.stream_threshold = stream_threshold
         self.form_registry = FormRegistry.instance()
         if filterKeys is None:
             self.filterKeys = ["editsection", "parser-output", "parser-output"]
         else:
             self.filterKeys = filterKeys
+        # filtered content by hash of the filter input
+        self.filter_memo = None
+        if memo_entries:
+            self.filter_memo = PageCache(
+                max_entries=memo_entries, max_bytes=memo_max_bytes, ttl=None
+            )
 
     def filter_page_content(self, pc: PageContent):
         """
@@ -107,13 +155,10 @@ class MediaWikiHtmlFilter(HtmlFilter):
         """
         Filter the given page content.
 
-        Pipeline:
-        1. doFilter — parse with BeautifulSoup, strip parser-output wrapper,
-           editsection spans, and comments.  Returns cleaned soup.
-        2. fixHtml — rewrite image/video/link paths for the CMS frontend.
-        3. unwrap — convert soup to HTML string, strip lxml wrapper tags.
-        4. _replace_form_divs — replace wikicms-form divs with rendered forms.
-        5. Store result in pc.content; pc.html stays as the original.
+        The html is parsed once with lxml, the filter stages are applied as
+        tree operations and the result is serialized once - see filter_html.
+        pc.html stays as the original. Pages too large to be filtered in
+        memory are streamed with filter_stream instead - see use_stream.
 
         Args:
             pc(PageContent): the page content to filter
@@ -121,72 +166,303 @@ class MediaWikiHtmlFilter(HtmlFilter):
         Returns:
             PageContent: the same object with pc.content set
         """
-        soup = self.doFilter(pc.html, self.filterKeys)
-        soup = self.fixHtml(soup)
-        filtered_html = self.unwrap(soup)
-        filtered_html = self._replace_form_divs(filtered_html, pc.lang)
-        pc.content = filtered_html
+        content = None
+        if self.filter_memo is not None:
+            memo_key = self.memo_key(pc.html, pc.lang)
+            content = self.filter_memo.get(memo_key)
+        if content is None:
+            content = self.filter_html(pc.html, pc.lang)
+            if self.filter_memo is not None:
+                self.filter_memo.put(memo_key, content)
+        pc.content = content
         return pc
 
-    def _replace_form_divs(self, html: str, lang: str = "en") -> str:
+    def memo_key(self, html: str, lang: str) -> str:
         """
-        Find all <div class="wikicms-form" data-form-name="..."> elements and
-        replace each with the rendered form HTML from the registry.
+        get the key of the memoized filter result for the given input - it
+        covers everything the filtered content depends on
 
         Args:
-            html(str): the HTML string to process
-            lang(str): language code for i18n resolution
+            html(str): the raw html
+            lang(str): the language of the forms
 
         Returns:
-            str: the HTML with form divs replaced
+            str: the sha256 hex digest of the filter input
         """
-        if self.form_registry is None:
-            result = html
-        else:
-            renderer = FormRenderer()
+        digest = hashlib.sha256((html or "").encode("utf-8"))
+        digest.update(self.filter_context(lang).encode("utf-8"))
+        memo_key = digest.hexdigest()
+        return memo_key
 
-            def replace_match(m: re.Match) -> str:
-                form_name = m.group(1)
-                form_def = self.form_registry.get(form_name)
-                if form_def is None:
-                    replacement = m.group(0)
-                else:
-                    replacement = renderer.render(form_def, lang=lang)
-                return replacement
-
-            result = re.sub(
-                r'<div\s+class="wikicms-form"\s+data-form-name="([^"]+)"[^>]*>.*?</div>',
-                replace_match,
-                html,
-                flags=re.DOTALL,
+    def filter_context(self, lang: str) -> str:
+        """
+        get everything besides the html that the filtered content depends on
+
+        Args:
+            lang(str): the language of the forms
+
+        Returns:
+            str: the site name, filter keys, stages, language and the fingerprint
+            of the registered forms - the same in every process with the same setup
+        """
+        context = [
+            self.site_name,
+            ",".join(self.filterKeys),
+            ",".join(self.stage_registry.stages),
+            lang or "",
+            FormRegistry.fingerprint(),
+        ]
+        filter_context = "\0".join(context)
+        return filter_context
+
+    def use_stream(self, html: str) -> bool:
+        """
+        check whether the given html should be filtered with the streaming
+        rewriter i.e. it is large and all stages of my pipeline can be streamed
+        """
+        use_stream = bool(
+            self.stream_threshold
+            and html
+            and len(html) >= self.stream_threshold
+            and StreamingHtmlRewriter.is_streamable(
+                stage.key for stage in self.stage_registry.pipeline(self.filterKeys)
             )
-        return result
+        )
+        return use_stream
+
+    def filter_stream(self, chunks, lang: str = "en"):
+        """
+        Filter the given MediaWiki html chunks while they flow through
+        with the built-in stages of my pipeline - see StreamingHtmlRewriter
 
-    def doFilter(self, html: str, filterKeys) -> BeautifulSoup:
+        Args:
+            chunks: the raw html chunks
+            lang(str): language code for i18n resolution of forms
+
+        Yields:
+            str: the filtered html chunks e.g. for a chunked response
+        """
+        start = time.perf_counter()
+        in_size = 0
+        out_size = 0
+
+        def counted():
+            nonlocal in_size
+            for chunk in chunks:
+                in_size += len(chunk)
+                yield chunk
+
+        rewriter = StreamingHtmlRewriter(self, lang=lang)
+        for output in rewriter.rewrite(counted()):
+            out_size += len(output)
+            yield output
+        seconds = time.perf_counter() - start
+        self._record_stage("stream", seconds, in_size, out_size)
+
+    @staticmethod
+    def _class_xpath(tag: str, css_class: str) -> str:
+        """
+        get the xpath of the descendant tags having the given css class
         """
-        Parse *html* with BeautifulSoup and apply structural filters.
+        xpath = f".//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {css_class} ')]"
+        return xpath
+
+    def filter_html(
+        self, html: str, lang: str = "en", filter_keys: Optional[List[str]] = None
+    ) -> str:
+        """
+        Filter the given MediaWiki html with a single parse and serialization.
+
+        The stages of the pipeline - see stage_registry.pipeline - modify
+        the lxml tree in between; the built-in stages are:
+        - parser-output: select the mw-parser-output div
+        - editsection: drop the editsection spans
+        - comments: drop comments
+        - empty-paragraphs: drop empty paragraphs
+        - fix-urls: rewrite image/video/link paths for the CMS frontend
+        - forms: replace wikicms-form divs with rendered forms
+
+        Args:
+            html(str): the raw HTML string
+            lang(str): language code for i18n resolution of forms
+            filter_keys(list): the filter keys to use instead of my filterKeys
+
+        Returns:
+            str: the filtered html
+        """
+        if filter_keys is None:
+            filter_keys = self.filterKeys
+        if not html or not html.strip():
+            return ""
+        start = time.perf_counter()
+        root = lxml.html.document_fromstring(html).body
+        if root is None:
+            return ""
+        seconds = time.perf_counter() - start
+        size = self._tree_size(root)
+        self._record_stage("parse", seconds, len(html), size)
+        context = FilterContext(root=root, lang=lang)
+        for stage in self.stage_registry.pipeline(filter_keys):
+            start = time.perf_counter()
+            stage.func(self, context)
+            seconds = time.perf_counter() - start
+            in_size = size
+            size = self._tree_size(context.root)
+            self._record_stage(stage.key, seconds, in_size, size)
+        start = time.perf_counter()
+        filtered_html = self.serialize_children(context.root)
+        # Replace multiple newline characters with a single newline character
+        filtered_html = re.sub(r"\n\s*\n", "\n", filtered_html)
+        for slot, form_html in context.forms:
+            filtered_html = filtered_html.replace(slot, form_html, 1)
+        seconds = time.perf_counter() - start
+        self._record_stage("serialize", seconds, size, len(filtered_html))
+        return filtered_html
+
+    @staticmethod
+    def serialize_children(root) -> str:
+        """
+        serialize the content of the given lxml element without the element itself
+        """
+        parts = [escape(root.text or "", quote=False)]
+        for child in root:
+            parts.append(etree.tostring(child, encoding="unicode", method="html"))
+        html = "".join(parts)
+        return html
+
+    @staticmethod
+    def _tree_size(root) -> int:
+        """
+        the number of elements of the given tree
+        """
+        size = sum(1 for _node in root.iter())
+        return size
+
+    def _record_stage(self, key: str, seconds: float, in_size: int, out_size: int):
+        """
+        record the wall time and sizes of a stage run and log slow stages
+        """
+        self.stage_timer.record(key, seconds, in_size, out_size)
+        msg = f"{self.site_name} filter stage {key}: {1000*seconds:.1f} ms {in_size}→{out_size}"
+        if seconds > self.slow_stage_seconds:
+            self.filter_logger.warning(msg)
+        else:
+            self.filter_logger.debug(msg)
+
+    def stage_stats(self):
+        """
+        get the statistics of the filter stages including parse and serialize
+
+        Returns:
+            dict: the StageStats by stage key
+        """
+        stats = self.stage_timer.snapshot()
+        return stats
+
+    def stage_parser_output(self, context: FilterContext):
+        """
+        select the mw-parser-output div as the root
+        """
+        parser_divs = context.root.xpath(self._class_xpath("div", "mw-parser-output"))
+        if parser_divs:
+            context.root = parser_divs[0]
+
+    def stage_editsection(self, context: FilterContext):
+        """
+        drop the edit section links
+        """
+        for span in context.root.xpath(self._class_xpath("span", "mw-editsection")):
+            span.drop_tree()
+
+    def stage_comments(self, context: FilterContext):
+        """
+        drop html comments
+        """
+        for comment in list(context.root.iter(etree.Comment)):
+            comment.drop_tree()
+
+    def stage_empty_paragraphs(self, context: FilterContext):
+        """
+        drop the empty paragraphs MediaWiki marks with mw-empty-elt
+        """
+        for p in context.root.xpath(".//p[@class='mw-empty-elt']"):
+            if len(p) == 0 and not (p.text or "").strip():
+                p.drop_tree()
+
+    def stage_fix_urls(self, context: FilterContext):
+        """
+        rewrite image, video and link paths for the CMS frontend
+        """
+        self.fix_tree(context.root)
+
+    def stage_forms(self, context: FilterContext):
+        """
+        replace the wikicms-form divs with rendered forms
+        """
+        context.forms.extend(self._replace_form_elements(context.root, context.lang))
+
+    def fix_tree(self, root):
+        """
+        fix image, video and link paths in the given lxml tree
+
+        Args:
+            root: the lxml element to fix the descendants of
+        """
+        for img in root.iter("img"):
+            self.fix_attribute(img.attrib, "src", "/")
+            self.fix_attribute(img.attrib, "srcset", "/", ", ")
+        for source in root.xpath(".//video//source"):
+            self.fix_attribute(source.attrib, "src", "/")
+        for a in root.iter("a"):
+            self.fix_attribute(a.attrib, "href", "/")
+
+    def _replace_form_elements(self, root, lang: str = "en") -> list:
+        """
+        replace the wikicms-form divs in the given lxml tree with slots
+        for the rendered forms - the forms are inserted after serialization
+        so that their html is kept as rendered
+
+        Args:
+            root: the lxml element to search
+            lang(str): language code for i18n resolution
+
+        Returns:
+            list: (slot html, form html) tuples
+        """
+        forms = []
+        if self.form_registry is not None:
+            for div in root.xpath(".//div[@class='wikicms-form'][@data-form-name]"):
+                form_html = self.form_registry.render_blank(
+                    div.get("data-form-name"), lang
+                )
+                if form_html is None:
+                    continue
+                slot = etree.Element("wikicms-form-slot", id=str(len(forms)))
+                slot.tail = div.tail
+                div.getparent().replace(div, slot)
+                slot_html = etree.tostring(
+                    slot, encoding="unicode", method="html", with_tail=False
+                )
+                forms.append((slot_html, form_html))
+        return forms
+
+    def doFilter(self, html: str, filterKeys) -> str:
+        """
+        Apply the structural filters i.e. parser-output, editsection and
+        comment removal to the given html - kept for compatibility, see filter_html
 
         Args:
             html(str): the raw HTML string
             filterKeys(list): which filters to apply
 
         Returns:
-            BeautifulSoup: the cleaned soup
-        """
-        # https://stackoverflow.com/questions/5598524/can-i-remove-script-tags-with-beautifulsoup
-        soup = BeautifulSoup(html, self.parser)
-        if "parser-output" in filterKeys:
-            parserdiv = soup.find("div", {"class": "mw-parser-output"})
-            if parserdiv:
-                inner_html = parserdiv.decode_contents()
-                soup = BeautifulSoup(inner_html, self.parser)
-        # https://stackoverflow.com/questions/5041008/how-to-find-elements-by-class
-        if "editsection" in filterKeys:
-            for s in soup.select("span.mw-editsection"):
-                s.extract()
-        for comments in soup.find_all(string=lambda text: isinstance(text, Comment)):
-            comments.extract()
-        return soup
+            str: the filtered html
+        """
+        if isinstance(filterKeys, str):
+            filterKeys = [filterKeys]
+        filter_keys = list(filterKeys) + ["-empty-paragraphs", "-fix-urls", "-forms"]
+        html = self.filter_html(html, filter_keys=filter_keys)
+        return html
 
     def fixNode(self, node, attribute, prefix, delim=None):
         """
@@ -197,9 +473,20 @@ class MediaWikiHtmlFilter(HtmlFilter):
         prefix (str): the prefix to replace e.g. "/", "/images", "/thumbs"
         delim (str): if not None the delimiter for multiple values
         """
+        self.fix_attribute(node.attrs, attribute, prefix, delim)
+
+    def fix_attribute(self, attrs, attribute, prefix, delim=None):
+        """
+        prefix the value(s) of the given attribute with the site name
+
+        attrs (dict): the attributes of a BeautifulSoup node or lxml element
+        attribute (str): the name of the attribute e.g. "href", "src"
+        prefix (str): the prefix to replace e.g. "/", "/images", "/thumbs"
+        delim (str): if not None the delimiter for multiple values
+        """
         siteprefix = f"/{self.site_name}{prefix}"
-        if attribute in node.attrs:
-            attrval = node.attrs[attribute]
+        if attribute in attrs:
+            attrval = attrs[attribute]
             if delim is not None:
                 vals = attrval.split(delim)
             else:
@@ -211,32 +498,7 @@ class MediaWikiHtmlFilter(HtmlFilter):
                     newvals.append(val.replace(prefix, siteprefix, 1))
                 else:
                     newvals.append(val)
-            if delim is not None:
-                node.attrs[attribute] = delim.join(newvals)
-
-    def fix_images_and_videos(self, soup):
-        """
-        fix image and video entries in the source code
-        """
-        for img in soup.findAll("img"):
-            self.fixNode(img, "src", "/")
-            self.fixNode(img, "srcset", "/", ", ")
-        for video in soup.findAll("video"):
-            for source in video.findAll("source"):
-                self.fixNode(source, "src", "/")
-
-    def fixHtml(self, soup):
-        """
-        fix the HTML in the given soup
-
-        Args:
-            soup(BeautifulSoup): the html parser
-        """
-        self.fix_images_and_videos(soup)
-        # fix absolute hrefs
-        for a in soup.findAll("a"):
-            self.fixNode(a, "href", "/")
-        return soup
+            attrs[attribute] = delim.join(newvals)
 
     def wrapWithReveal(self, html: str):
         """
@@ -266,20 +528,109 @@ class MediaWikiHtmlFilter(HtmlFilter):
         convert the given html to reveal
         see https://revealjs.com/
         """
-        soup = BeautifulSoup(html, "lxml")
-        for h2 in soup.findChildren(recursive=True):
-            if h2.name == "h2":
-                span = h2.next_element
-                if span.name == "span":
-                    tagid = span.get("id")
-                    if tagid.startswith("⌘⌘"):
-                        section = soup.new_tag("section")
-                        h2.parent.append(section)
-                        section.insert(0, h2)
-                        tag = h2.next_element
-                        while tag is not None and tag.name != "h2":
-                            if tag.parent != h2:
-                                section.append(tag)
-                            tag = tag.next_element
-        html = self.unwrap(soup)
+        html = self.build_slides(html)
+        return html
+
+    @staticmethod
+    def is_slide_heading(h2) -> bool:
+        """
+        check whether the given h2 element starts a slide i.e. its
+        heading or the id of it or one of its spans starts with ⌘⌘
+        """
+        slide_heading = h2.text_content().strip().startswith("⌘⌘")
+        if not slide_heading:
+            for node in h2.iter():
+                if (node.get("id") or "").startswith("⌘⌘"):
+                    slide_heading = True
+                    break
+        return slide_heading
+
+    @staticmethod
+    def _heading_node(node):
+        """
+        get the h2 of the given node if it is a h2 or a
+        <div class="mw-heading"> wrapper of a h2 as of MediaWiki 1.43
+        """
+        h2 = None
+        if node.tag == "h2":
+            h2 = node
+        elif node.tag == "div" and "mw-heading" in (node.get("class") or ""):
+            h2 = node.find("h2")
+        return h2
+
+    def build_slides(self, html: str) -> str:
+        """
+        split the given html into reveal.js sections in a single pass:
+        every slide heading starts a section that holds all following
+        siblings up to the next h2 heading
+
+        Args:
+            html(str): the filtered html of a page
+
+        Returns:
+            str: the html with the slides wrapped in section elements
+        """
+        if not html or not html.strip():
+            return ""
+        root = lxml.html.document_fromstring(html).body
+        if root is None:
+            return ""
+        # the parents of the slide headings - in document order
+        parents = {}
+        for h2 in root.iter("h2"):
+            if self.is_slide_heading(h2):
+                node = h2
+                parent = h2.getparent()
+                if parent is not root and self._heading_node(parent) is h2:
+                    node = parent
+                    parent = parent.getparent()
+                parents.setdefault(parent, None)
+        for parent in parents:
+            section = None
+            for child in list(parent):
+                if not isinstance(child.tag, str):
+                    # comments and processing instructions
+                    h2 = None
+                else:
+                    h2 = self._heading_node(child)
+                if h2 is not None:
+                    section = None
+                    if self.is_slide_heading(h2):
+                        section = etree.Element("section")
+                        child.addprevious(section)
+                if section is not None:
+                    # moves the tail text along with the child
+                    section.append(child)
+        html = self.serialize_children(root)
         return html
+
+
+for _key, _func, _default, _description in [
+    (
+        "parser-output",
+        MediaWikiHtmlFilter.stage_parser_output,
+        False,
+        "select the mw-parser-output div",
+    ),
+    (
+        "editsection",
+        MediaWikiHtmlFilter.stage_editsection,
+        False,
+        "drop the edit section links",
+    ),
+    ("comments", MediaWikiHtmlFilter.stage_comments, True, "drop html comments"),
+    (
+        "empty-paragraphs",
+        MediaWikiHtmlFilter.stage_empty_paragraphs,
+        True,
+        "drop empty paragraphs",
+    ),
+    (
+        "fix-urls",
+        MediaWikiHtmlFilter.stage_fix_urls,
+        True,
+        "rewrite image, video and link paths",
+    ),
+    ("forms", MediaWikiHtmlFilter.stage_forms, True, "render wikicms forms"),
+]:
+    MediaWikiHtmlFilter.stage_registry.register(_key, _func, _default, _description)
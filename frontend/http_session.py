@@ -0,0 +1,87 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+from dataclasses import dataclass
+from typing import Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+@dataclass
+class HttpSessionConfig:
+    """
+    configuration of the pooled http session a WikiFrontend proxies
+    images and videos with
+    """
+
+    pool_connections: int = 4  # number of hosts to keep a connection pool for
+    pool_maxsize: int = 32  # maximum number of keep-alive connections per host
+    connect_timeout: float = 5.0  # seconds to wait for a connection
+    read_timeout: float = 30.0  # seconds to wait between bytes of the response
+    retries: int = 2  # number of retries of failed idempotent requests
+    backoff_factor: float = 0.3  # factor of the exponential backoff between retries
+
+    @classmethod
+    def of_args(cls, args) -> "HttpSessionConfig":
+        """
+        create a session configuration from the given command line arguments
+
+        Args:
+            args: the parsed command line arguments
+
+        Returns:
+            HttpSessionConfig: the configuration
+        """
+        config = cls()
+        if getattr(args, "proxy_pool_size", None) is not None:
+            config.pool_maxsize = args.proxy_pool_size
+        if getattr(args, "proxy_connect_timeout", None) is not None:
+            config.connect_timeout = args.proxy_connect_timeout
+        if getattr(args, "proxy_read_timeout", None) is not None:
+            config.read_timeout = args.proxy_read_timeout
+        if getattr(args, "proxy_retries", None) is not None:
+            config.retries = args.proxy_retries
+        return config
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        """
+        the (connect, read) timeout tuple for requests
+        """
+        return (self.connect_timeout, self.read_timeout)
+
+    def create_session(self) -> requests.Session:
+        """
+        create a session with keep-alive connection pools
+
+        the connection pools are thread-safe so the session may be shared
+        by the threads of the FastAPI threadpool as long as no per request
+        state like cookies or auth is changed on it
+
+        Returns:
+            requests.Session: the session
+        """
+        retry = Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=("GET", "HEAD"),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry,
+            pool_block=False,
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
@@ -0,0 +1,369 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, Optional
+
+from starlette.responses import FileResponse
+
+
+@dataclass
+class MediaEntry:
+    """
+    the metadata of a cached media file
+    """
+
+    path: str  # the proxied path e.g. /images/wiki/a/ab/Logo.png
+    size: int
+    content_type: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched: Optional[float] = None  # time of the download or last revalidation
+
+    def is_fresh(self, max_age: Optional[float], now: float = None) -> bool:
+        """
+        check whether the file may be served without asking the wiki
+
+        Args:
+            max_age(float): the seconds a file is fresh after fetching - None for ever
+            now(float): the current time - defaults to time.time()
+
+        Returns:
+            bool: True if the entry is fresh
+        """
+        if max_age is None:
+            return True
+        if self.fetched is None:
+            return False
+        if now is None:
+            now = time.time()
+        fresh = now - self.fetched < max_age
+        return fresh
+
+    @property
+    def conditional_headers(self) -> Dict[str, str]:
+        """
+        the request headers to revalidate the cached file with the wiki
+        """
+        headers = {}
+        if self.etag:
+            headers["if-none-match"] = self.etag
+        if self.last_modified:
+            headers["if-modified-since"] = self.last_modified
+        return headers
+
+    @property
+    def headers(self) -> dict:
+        """
+        the upstream headers to serve the cached file with
+        """
+        headers = {}
+        if self.etag:
+            headers["etag"] = self.etag
+        if self.last_modified:
+            headers["last-modified"] = self.last_modified
+        return headers
+
+
+class MediaCache:
+    """
+    size-capped least recently used disk cache for proxied media e.g. images
+
+    every cached file has a json sidecar with its upstream metadata; the
+    recency order survives restarts via the modification times of the sidecars
+
+    files that are being served are pinned and not evicted or replaced
+    until they are released
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_bytes: int = 1024 * 1024 * 1024,
+        max_age: Optional[float] = None,
+    ):
+        """
+        Constructor
+
+        Args:
+            cache_dir(str): the directory of the cached files
+            max_bytes(int): the maximum total size of all cached files
+            max_age(float): seconds until a cached file needs to be revalidated
+                with the wiki - None for never
+        """
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        # size by cache key - least recently used first
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        # number of responses serving the file by cache key
+        self._pins: Counter = Counter()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def key_of(path: str) -> str:
+        """
+        get the cache key i.e. the file name for the given proxied path
+        """
+        key = hashlib.sha256(path.encode("utf-8")).hexdigest()
+        return key
+
+    def file_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def meta_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load(self):
+        """
+        index the files of a previous run - removing incomplete ones
+        """
+        recency = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".tmp"):
+                os.remove(path)
+            elif name.endswith(".json"):
+                key = name[: -len(".json")]
+                if os.path.isfile(self.file_path(key)):
+                    size = os.path.getsize(self.file_path(key))
+                    recency.append((os.path.getmtime(path), key, size))
+                else:
+                    os.remove(path)
+        for _mtime, key, size in sorted(recency):
+            self._sizes[key] = size
+            self.size += size
+        with self._lock:
+            self._shrink()
+
+    def get(self, path: str) -> Optional[MediaEntry]:
+        """
+        get the cached entry for the given path and mark it as recently used
+
+        Args:
+            path(str): the proxied path
+
+        Returns:
+            MediaEntry: the entry or None if the path is not cached
+        """
+        key = self.key_of(path)
+        entry = None
+        with self._lock:
+            if key in self._sizes:
+                try:
+                    with open(self.meta_path(key), "r", encoding="utf-8") as meta:
+                        entry = MediaEntry(**json.load(meta))
+                    # persist the recency for the next start
+                    os.utime(self.meta_path(key))
+                    self._sizes.move_to_end(key)
+                except (OSError, ValueError, TypeError) as ex:
+                    self.logger.warning(f"dropping unreadable media entry {path}: {ex}")
+                    self._remove(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def is_fresh(self, entry: MediaEntry) -> bool:
+        """
+        check whether the given entry may be served without revalidation
+        """
+        fresh = entry.is_fresh(self.max_age)
+        return fresh
+
+    def pin(self, path: str) -> bool:
+        """
+        pin the file of the given path so that it is kept while it is served
+
+        Args:
+            path(str): the proxied path
+
+        Returns:
+            bool: True if the file is cached and pinned - False if it is gone
+        """
+        key = self.key_of(path)
+        with self._lock:
+            pinned = key in self._sizes
+            if pinned:
+                self._pins[key] += 1
+        return pinned
+
+    def release(self, path: str):
+        """
+        release a pin of the file of the given path
+        """
+        key = self.key_of(path)
+        with self._lock:
+            self._pins[key] -= 1
+            if self._pins[key] <= 0:
+                del self._pins[key]
+                self._shrink()
+
+    def refresh(self, path: str):
+        """
+        mark the entry of the given path as fetched now
+        e.g. after the wiki answered 304 Not Modified
+        """
+        key = self.key_of(path)
+        with self._lock:
+            if key in self._sizes:
+                try:
+                    with open(self.meta_path(key), "r", encoding="utf-8") as meta:
+                        entry = MediaEntry(**json.load(meta))
+                    entry.fetched = time.time()
+                    self._write_meta(key, entry)
+                except (OSError, ValueError, TypeError) as ex:
+                    self.logger.warning(f"could not refresh media entry {path}: {ex}")
+
+    def get_file_path(self, path: str) -> str:
+        """
+        get the path of the cached file for the given proxied path
+        """
+        return self.file_path(self.key_of(path))
+
+    def store(
+        self, entry: MediaEntry, chunks: Iterator[bytes], expected_size: int = None
+    ) -> Iterator[bytes]:
+        """
+        pass on the given chunks while writing them to the cache
+        - the entry is only added if all chunks have been read
+
+        Args:
+            entry(MediaEntry): the metadata of the file
+            chunks: the content of the file
+            expected_size(int): the Content-Length if known
+
+        Yields:
+            bytes: the chunks
+        """
+        if expected_size is not None and expected_size > self.max_bytes:
+            yield from chunks
+            return
+        key = self.key_of(entry.path)
+        tmp_path = f"{self.file_path(key)}.{threading.get_ident()}.tmp"
+        complete = False
+        size = 0
+        try:
+            with open(tmp_path, "wb") as tmp_file:
+                for chunk in chunks:
+                    tmp_file.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+            complete = expected_size is None or size == expected_size
+        finally:
+            # e.g. the client went away before the end
+            if complete and size <= self.max_bytes:
+                entry.size = size
+                self._add(key, entry, tmp_path)
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _add(self, key: str, entry: MediaEntry, tmp_path: str):
+        """
+        add the completely written file at tmp_path as the given entry
+        """
+        if entry.fetched is None:
+            entry.fetched = time.time()
+        with self._lock:
+            if key in self._pins:
+                # the old file is being served - the new one is cached next time
+                os.remove(tmp_path)
+                return
+            if key in self._sizes:
+                self._remove(key)
+            os.replace(tmp_path, self.file_path(key))
+            self._write_meta(key, entry)
+            self._sizes[key] = entry.size
+            self.size += entry.size
+            self._shrink()
+
+    def _write_meta(self, key: str, entry: MediaEntry):
+        """
+        atomically write the sidecar of the given entry - the lock must be held
+        """
+        meta_tmp = f"{self.meta_path(key)}.tmp"
+        with open(meta_tmp, "w", encoding="utf-8") as meta:
+            json.dump(asdict(entry), meta)
+        os.replace(meta_tmp, self.meta_path(key))
+
+    def _remove(self, key: str):
+        """
+        remove the files of the given key - the lock must be held
+        """
+        self.size -= self._sizes.pop(key, 0)
+        for path in (self.meta_path(key), self.file_path(key)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _shrink(self):
+        """
+        evict the least recently used files until the size budget is met
+        - pinned files are skipped - the lock must be held
+        """
+        if self.size <= self.max_bytes:
+            return
+        for key in list(self._sizes):
+            if self.size <= self.max_bytes:
+                break
+            if key in self._pins:
+                continue
+            self._remove(key)
+            self.evictions += 1
+
+    def __contains__(self, path: str) -> bool:
+        with self._lock:
+            contained = self.key_of(path) in self._sizes
+        return contained
+
+    def __len__(self) -> int:
+        with self._lock:
+            count = len(self._sizes)
+        return count
+
+
+class MediaFileResponse(FileResponse):
+    """
+    a response with a pinned file of the media cache
+    that releases the pin when the file has been sent
+    """
+
+    def __init__(self, media_cache: MediaCache, path: str, entry: MediaEntry):
+        """
+        Constructor
+
+        Args:
+            media_cache(MediaCache): the cache the file has been pinned in
+            path(str): the proxied path
+            entry(MediaEntry): the metadata of the file
+        """
+        super().__init__(
+            media_cache.get_file_path(path),
+            headers=entry.headers,
+            media_type=entry.content_type,
+        )
+        self.media_cache = media_cache
+        self.media_path = path
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.media_cache.release(self.media_path)
@@ -0,0 +1,153 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import re
+
+# quoted strings which are kept as is and /* ... */ comments which are dropped
+_CSS_STRING_OR_COMMENT = re.compile(
+    r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')|/\*.*?\*/", re.DOTALL
+)
+# whitespace around css punctuation - not before colons which would
+# turn a descendant selector like "a :hover" into "a:hover"
+_CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+_CSS_COLON = re.compile(r":\s+")
+# html comments except conditional comments like <!--[if IE]>
+_HTML_COMMENT = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+# blocks whose content is whitespace sensitive or minified by its own rules
+_RAW_BLOCK = re.compile(
+    r"(<(style|script|pre|textarea)\b[^>]*>)(.*?)(</\2\s*>)",
+    re.DOTALL | re.IGNORECASE,
+)
+_BETWEEN_TAGS = re.compile(r">\s+<")
+
+
+def minify_css(css: str) -> str:
+    """
+    minify the given style sheet by removing comments and whitespace
+    - quoted strings e.g. of content or url() values are kept as is
+
+    Args:
+        css(str): the style sheet
+
+    Returns:
+        str: the minified style sheet
+    """
+    parts = []
+    code = []
+    pos = 0
+    for match in _CSS_STRING_OR_COMMENT.finditer(css):
+        code.append(css[pos : match.start()])
+        if match.group(1):
+            parts.append(minify_css_code("".join(code)))
+            parts.append(match.group(1))
+            code = []
+        else:
+            # a comment separates tokens like whitespace
+            code.append(" ")
+        pos = match.end()
+    code.append(css[pos:])
+    parts.append(minify_css_code("".join(code)))
+    minified = "".join(parts)
+    return minified.strip()
+
+
+def minify_css_code(css: str) -> str:
+    """
+    remove the whitespace of the given style sheet code
+    that contains neither strings nor comments
+
+    Args:
+        css(str): the code between two strings
+
+    Returns:
+        str: the minified code
+    """
+    css = re.sub(r"\s+", " ", css)
+    css = _CSS_PUNCTUATION.sub(r"\1", css)
+    css = _CSS_COLON.sub(":", css)
+    css = css.replace(";}", "}")
+    return css
+
+
+def minify_js(js: str) -> str:
+    """
+    minify the given script by removing indentation and blank lines
+
+    line breaks and comments are kept so that automatic semicolon insertion,
+    string literals and regular expressions containing // are not affected -
+    lines continuing a string literal after a trailing backslash are kept as
+    is and scripts with template literals are not changed at all since their
+    lines may be part of a string
+
+    Args:
+        js(str): the script
+
+    Returns:
+        str: the minified script
+    """
+    if "`" in js:
+        return js.strip()
+    lines = []
+    continued = False
+    for line in js.splitlines():
+        if not continued:
+            line = line.strip()
+        if line or continued:
+            lines.append(line)
+        continued = line.endswith("\\")
+    return "\n".join(lines)
+
+
+def minify_markup(html: str, after_block: bool, before_block: bool) -> str:
+    """
+    remove the comments and the whitespace between the tags of the given
+    html that is outside of any style, script, pre and textarea block
+
+    Args:
+        html(str): the html between two blocks
+        after_block(bool): True if the html follows a block
+        before_block(bool): True if a block follows the html
+
+    Returns:
+        str: the minified html
+    """
+    html = _HTML_COMMENT.sub("", html)
+    html = _BETWEEN_TAGS.sub("><", html)
+    if after_block and html.lstrip().startswith("<"):
+        html = html.lstrip()
+    if before_block and html.rstrip().endswith(">"):
+        html = html.rstrip()
+    return html
+
+
+def minify_html(html: str) -> str:
+    """
+    minify the given html snippets e.g. the resources of a ResourceLoader
+    by removing comments and whitespace between tags and minifying
+    the content of inline style and script blocks - the content of
+    pre and textarea blocks is kept as is
+
+    Args:
+        html(str): the html
+
+    Returns:
+        str: the minified html
+    """
+    parts = []
+    pos = 0
+    for match in _RAW_BLOCK.finditer(html):
+        open_tag, tag, content, close_tag = match.groups()
+        parts.append(minify_markup(html[pos : match.start()], pos > 0, True))
+        tag = tag.lower()
+        if tag == "style":
+            content = minify_css(content)
+        elif tag == "script" and "src=" not in open_tag:
+            content = minify_js(content)
+        parts.append(f"{open_tag}{content}{close_tag}")
+        pos = match.end()
+    parts.append(minify_markup(html[pos:], pos > 0, False))
+    minified = "".join(parts)
+    return minified.strip()
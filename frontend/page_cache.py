@@ -0,0 +1,649 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+from frontend.conditional import http_date, is_not_modified
+
+
+@dataclass
+class PageCacheConfig:
+    """
+    configuration of the rendered page cache of a WikiFrontend
+    """
+
+    max_entries: int = 1000  # maximum number of cached pages
+    max_bytes: int = 64 * 1024 * 1024  # byte budget for all cached pages
+    ttl: float = 300.0  # seconds until a cached page expires - None for no expiry
+    poll_interval: float = None  # seconds between recent changes polls - None for off
+    # seconds an expired page may still be served while it is refreshed
+    # or while the wiki is failing - None for off
+    stale_ttl: float = None
+    # seconds to wait before revalidating a page again after its rendering failed
+    revalidate_backoff: float = 30.0
+    cache_dir: str = None  # directory of the persistent cache tier - None for off
+    store_max_bytes: int = 512 * 1024 * 1024  # size budget of the persistent tier
+    # directory of the disk cache for proxied images and videos - None for off
+    media_cache_dir: str = None
+    media_max_bytes: int = 1024 * 1024 * 1024  # size budget of the media cache
+    # seconds until a cached media file is revalidated with the wiki - None for never
+    media_max_age: float = 86400.0
+    # pages with at least this many characters of html are filtered and
+    # sent as a chunked stream instead of being rendered in memory and cached
+    # - None for off
+    stream_threshold: int = None
+
+    @classmethod
+    def of_args(cls, args) -> "PageCacheConfig":
+        """
+        create a cache configuration from the given command line arguments
+
+        Args:
+            args: the parsed command line arguments
+
+        Returns:
+            PageCacheConfig: the configuration
+        """
+        config = cls()
+        if getattr(args, "cache_ttl", None) is not None:
+            config.ttl = args.cache_ttl
+        if getattr(args, "cache_max_mb", None) is not None:
+            config.max_bytes = int(args.cache_max_mb * 1024 * 1024)
+        if getattr(args, "cache_stale_ttl", None) is not None:
+            config.stale_ttl = args.cache_stale_ttl
+        if getattr(args, "cache_dir", None) is not None:
+            config.cache_dir = args.cache_dir
+        if getattr(args, "cache_store_max_mb", None) is not None:
+            config.store_max_bytes = int(args.cache_store_max_mb * 1024 * 1024)
+        if getattr(args, "media_cache_dir", None) is not None:
+            config.media_cache_dir = args.media_cache_dir
+        if getattr(args, "media_cache_max_mb", None) is not None:
+            config.media_max_bytes = int(args.media_cache_max_mb * 1024 * 1024)
+        if getattr(args, "media_cache_max_age", None) is not None:
+            config.media_max_age = args.media_cache_max_age
+        if getattr(args, "poll_interval", None) is not None:
+            config.poll_interval = args.poll_interval
+        if getattr(args, "stream_threshold", None) is not None:
+            config.stream_threshold = args.stream_threshold
+        return config
+
+
+@dataclass
+class CacheStats:
+    """
+    hit/miss/eviction counters of a cache
+    """
+
+    hits: int = 0
+    stale_hits: int = 0
+    store_hits: int = 0  # hits served from the persistent tier
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    size: int = 0  # total size of all entries in bytes
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        the ratio of hits to all lookups
+        """
+        lookups = self.hits + self.stale_hits + self.misses
+        ratio = (self.hits + self.stale_hits) / lookups if lookups else 0.0
+        return ratio
+
+
+@dataclass
+class CacheEntry:
+    """
+    a single entry of a PageCache
+    """
+
+    value: Any
+    size: int
+    created: float
+    expires: Optional[float] = None  # None for entries that never expire
+    stale_until: Optional[float] = (
+        None  # end of the period an expired entry may be served
+    )
+
+    def is_expired(self, now: float) -> bool:
+        """
+        check whether this entry is expired at the given time
+        """
+        expired = self.expires is not None and now >= self.expires
+        return expired
+
+    def is_dead(self, now: float) -> bool:
+        """
+        check whether this entry is expired and may not even be served stale
+        """
+        until = self.stale_until if self.stale_until is not None else self.expires
+        dead = until is not None and now >= until
+        return dead
+
+
+@dataclass
+class RenderedPage:
+    """
+    a framed page as served by a WikiFrontend
+    """
+
+    page_title: str
+    body: bytes  # the utf-8 encoded framed html
+    status_code: int = 200
+    media_type: str = "text/html"
+    revid: Optional[int] = None  # the revision id of the rendered page
+    etag: Optional[str] = None  # strong entity tag of the body
+    last_modified: Optional[float] = None  # timestamp of the rendering
+    # precompressed variants of the body by content coding e.g. gzip or br
+    encodings: Optional[Dict[str, bytes]] = None
+    # function yielding the html chunks of a page that is too large to be
+    # rendered in memory - such pages have an empty body and are not cached
+    stream: Optional[Callable[[], Iterable[str]]] = None
+
+    # bodies smaller than this are not worth compressing
+    min_compress_size = 1024
+
+    @property
+    def size(self) -> int:
+        """
+        the number of bytes this page occupies in a cache
+        """
+        size = len(self.body) + len(self.page_title)
+        for variant in (self.encodings or {}).values():
+            size += len(variant)
+        return size
+
+    def compress(self):
+        """
+        precompress my body with gzip and - if available - brotli
+        so that no compression is needed when serving me
+        """
+        encodings = {}
+        if len(self.body) >= self.min_compress_size:
+            encodings["gzip"] = gzip.compress(self.body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                encodings["br"] = brotli.compress(self.body, quality=9)
+        self.encodings = encodings
+
+    @staticmethod
+    def negotiate_encoding(accept_encoding: Optional[str], available) -> Optional[str]:
+        """
+        select the content coding for the given Accept-Encoding header
+
+        Args:
+            accept_encoding(str): the Accept-Encoding header of the request
+            available: the available content codings
+
+        Returns:
+            str: the best acceptable coding - brotli preferred over gzip
+            or None for the identity coding
+        """
+        if not accept_encoding:
+            return None
+        qualities = {}
+        for item in accept_encoding.split(","):
+            parts = item.strip().split(";")
+            coding = parts[0].strip().lower()
+            quality = 1.0
+            for param in parts[1:]:
+                name, _, value = param.strip().partition("=")
+                if name.strip() == "q":
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            qualities[coding] = quality
+        selected = None
+        best = 0.0
+        for coding in ("br", "gzip"):
+            if coding in available:
+                quality = qualities.get(coding, qualities.get("*", 0.0))
+                if quality > best:
+                    selected = coding
+                    best = quality
+        return selected
+
+    def set_validators(self, last_modified: Optional[float] = None):
+        """
+        compute my strong etag from the body and set my modification time
+        unless it is already known
+
+        Args:
+            last_modified(float): the modification time e.g. the render time
+        """
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        if self.last_modified is None:
+            self.last_modified = last_modified
+
+    @property
+    def validator_headers(self) -> Dict[str, str]:
+        """
+        the ETag and Last-Modified headers of this page
+        """
+        headers = {}
+        if self.etag:
+            headers["ETag"] = self.etag
+        if self.last_modified is not None:
+            headers["Last-Modified"] = http_date(self.last_modified)
+        return headers
+
+    def as_response(self, request_headers=None) -> Response:
+        """
+        convert me to a FastAPI response
+
+        Args:
+            request_headers: the headers of the client request - a
+                304 Not Modified is returned if its conditional headers match
+
+        Returns:
+            Response: the response - with the precompressed variant
+            negotiated from the Accept-Encoding request header if there is one
+            or a chunked StreamingResponse for streamed pages
+        """
+        if self.stream is not None:
+            chunks = (chunk.encode("utf-8") for chunk in self.stream())
+            response = StreamingResponse(
+                chunks, status_code=self.status_code, media_type=self.media_type
+            )
+            return response
+        headers = self.validator_headers
+        body = self.body
+        if self.encodings:
+            accept_encoding = None
+            for name, value in (request_headers or {}).items():
+                if name.lower() == "accept-encoding":
+                    accept_encoding = value
+            coding = self.negotiate_encoding(accept_encoding, self.encodings)
+            headers["Vary"] = "Accept-Encoding"
+            if coding is not None:
+                body = self.encodings[coding]
+                headers["Content-Encoding"] = coding
+                # each representation needs its own strong etag
+                if self.etag:
+                    headers["ETag"] = f'{self.etag[:-1]}-{coding}"'
+        if self.status_code == 200 and is_not_modified(
+            request_headers, headers.get("ETag"), self.last_modified
+        ):
+            response = Response(status_code=304, headers=headers)
+        else:
+            response = Response(
+                content=body,
+                status_code=self.status_code,
+                media_type=self.media_type,
+                headers=headers,
+            )
+        return response
+
+
+class PageCache:
+    """
+    thread safe in-memory LRU cache with time to live and byte size budget
+
+    entries are evicted in least recently used order as soon as either the
+    maximum number of entries or the byte budget is exceeded
+
+    an optional persistent store e.g. a SqliteCacheStore is used as a
+    second tier: entries are written through to it and memory misses are
+    looked up there
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: Optional[float] = 300.0,
+        stale_ttl: Optional[float] = None,
+    ):
+        """
+        Constructor
+
+        Args:
+            max_entries(int): the maximum number of entries
+            max_bytes(int): the maximum total size of all entries
+            ttl(float): default time to live in seconds - None for no expiry
+            stale_ttl(float): default seconds an expired entry is kept to be served stale
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._size = 0
+        self._stats = CacheStats()
+        self._lock = threading.RLock()
+        self.store = None
+
+    def attach_store(self, store):
+        """
+        attach the given persistent store as my second tier
+        purging the entries that may not be served anymore
+
+        Args:
+            store: the store e.g. a SqliteCacheStore
+        """
+        store.purge(time.time())
+        self.store = store
+
+    @classmethod
+    def of_config(cls, config: PageCacheConfig) -> "PageCache":
+        """
+        create a page cache for the given configuration
+        """
+        page_cache = cls(
+            max_entries=config.max_entries,
+            max_bytes=config.max_bytes,
+            ttl=config.ttl,
+            stale_ttl=config.stale_ttl,
+        )
+        return page_cache
+
+    @staticmethod
+    def size_of(value: Any) -> int:
+        """
+        estimate the size of the given value in bytes
+
+        Args:
+            value: the value to estimate the size for
+
+        Returns:
+            int: the estimated size
+        """
+        if hasattr(value, "size"):
+            size = value.size
+        elif isinstance(value, (bytes, bytearray)):
+            size = len(value)
+        elif isinstance(value, str):
+            size = len(value.encode("utf-8"))
+        else:
+            size = 0
+        return size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            found = entry is not None and not entry.is_expired(time.time())
+        return found
+
+    def _remove(self, key: Hashable) -> CacheEntry:
+        """
+        remove the entry for the given key - the lock must be held
+        """
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        get the value for the given key
+
+        Args:
+            key: the cache key
+            default: the value to return on a miss
+
+        Returns:
+            the cached value or the default
+        """
+        value = default
+        entry = self._lookup(key)
+        with self._lock:
+            if entry is None or entry.is_expired(time.time()):
+                self._stats.misses += 1
+            else:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self._stats.hits += 1
+                value = entry.value
+        return value
+
+    def _lookup(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        get the entry for the given key removing it if it is dead
+        - the lock is only held for the memory tier so that memory hits
+        never wait for the disk i/o of the store
+
+        Returns:
+            CacheEntry: the fresh or stale entry or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None and self.store is not None:
+            entry = self.store.get(key)
+            if entry is not None:
+                with self._lock:
+                    self._stats.store_hits += 1
+                    # keep an entry that has been put in the meantime
+                    if key in self._entries:
+                        entry = self._entries[key]
+                    else:
+                        self._insert(key, entry)
+        if entry is not None and entry.is_dead(time.time()):
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._remove(key)
+                self._stats.expirations += 1
+            if self.store is not None:
+                self.store.delete(key)
+            entry = None
+        return entry
+
+    def get_entry(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        get the entry for the given key even if it is expired
+        as long as it may still be served stale
+
+        Args:
+            key: the cache key
+
+        Returns:
+            CacheEntry: the entry or None - check is_expired for staleness
+        """
+        entry = self._lookup(key)
+        with self._lock:
+            if entry is None:
+                self._stats.misses += 1
+            else:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                if entry.is_expired(time.time()):
+                    self._stats.stale_hits += 1
+                else:
+                    self._stats.hits += 1
+        return entry
+
+    def peek(
+        self, key: Hashable, default: Any = None, allow_stale: bool = False
+    ) -> Any:
+        """
+        get the value for the given key without affecting
+        the statistics or the least recently used order
+
+        Args:
+            key: the cache key
+            default: the value to return if there is no valid entry
+            allow_stale(bool): if True return expired values that may be served stale
+
+        Returns:
+            the cached value or the default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.time()
+            if entry is None or entry.is_dead(now):
+                value = default
+            elif entry.is_expired(now) and not allow_stale:
+                value = default
+            else:
+                value = entry.value
+        return value
+
+    def put(
+        self,
+        key: Hashable,
+        value: Any,
+        size: Optional[int] = None,
+        ttl: Optional[float] = None,
+        stale_ttl: Optional[float] = None,
+    ) -> bool:
+        """
+        put the given value into the cache
+
+        Args:
+            key: the cache key
+            value: the value to cache
+            size(int): the size of the value - estimated if not given
+            ttl(float): time to live in seconds - the cache default if not given
+            stale_ttl(float): seconds the expired value may be served stale
+                - the cache default if not given
+
+        Returns:
+            bool: True if the value was cached, False if it exceeds the byte budget
+        """
+        if size is None:
+            size = self.size_of(value)
+        if ttl is None:
+            ttl = self.ttl
+        if stale_ttl is None:
+            stale_ttl = self.stale_ttl
+        if size > self.max_bytes:
+            return False
+        now = time.time()
+        expires = now + ttl if ttl is not None else None
+        stale_until = expires + stale_ttl if expires and stale_ttl else None
+        entry = CacheEntry(
+            value=value,
+            size=size,
+            created=now,
+            expires=expires,
+            stale_until=stale_until,
+        )
+        with self._lock:
+            self._insert(key, entry)
+        if self.store is not None:
+            self.store.put(key, entry)
+        return True
+
+    def _insert(self, key: Hashable, entry: CacheEntry):
+        """
+        insert the given entry into the memory tier - the lock must be held
+        """
+        if key in self._entries:
+            self._remove(key)
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._size += entry.size
+        self._evict()
+
+    def _evict(self):
+        """
+        evict least recently used entries until the limits are met
+        - the lock must be held
+        """
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._size > self.max_bytes
+        ):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self._stats.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """
+        remove the entry with the given key
+
+        Returns:
+            bool: True if an entry was removed
+        """
+        with self._lock:
+            removed = key in self._entries
+            if removed:
+                self._remove(key)
+        if self.store is not None:
+            removed = self.store.delete(key) or removed
+        if removed:
+            with self._lock:
+                self._stats.invalidations += 1
+        return removed
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        remove all entries whose key matches the given predicate
+
+        Args:
+            predicate: a function of the key returning True for entries to remove
+
+        Returns:
+            int: the number of removed entries
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+        count = len(keys)
+        if self.store is not None:
+            count = max(count, self.store.delete_where(predicate))
+        with self._lock:
+            self._stats.invalidations += count
+        return count
+
+    def clear(self):
+        """
+        remove all entries
+        """
+        with self._lock:
+            self._stats.invalidations += len(self._entries)
+            self._entries.clear()
+            self._size = 0
+        if self.store is not None:
+            self.store.clear()
+
+    def keys(self) -> List[Hashable]:
+        """
+        get a snapshot of the keys in least recently used order
+        """
+        with self._lock:
+            keys = list(self._entries)
+        return keys
+
+    @property
+    def stats(self) -> CacheStats:
+        """
+        get a snapshot of my statistics
+        """
+        with self._lock:
+            stats = CacheStats(**self._stats.__dict__)
+            stats.entries = len(self._entries)
+            stats.size = self._size
+        return stats
+
+    def stats_dict(self) -> Dict[str, Any]:
+        """
+        get my statistics as a dict e.g. for logging or json output
+        """
+        stats = self.stats
+        stats_dict = dict(stats.__dict__)
+        stats_dict["hit_ratio"] = stats.hit_ratio
+        return stats_dict
@@ -0,0 +1,212 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional
+
+from tqdm import tqdm
+
+from frontend.clickstream import ClickstreamManager
+
+
+class CachePrewarmer:
+    """
+    renders the most relevant pages of a WikiFrontend in the background
+    so that they are in its page cache before the first visitor asks for them
+    """
+
+    # clickstream managers are shared between the prewarmers of all frontends
+    _clickstream_lock = threading.Lock()
+
+    def __init__(
+        self,
+        wiki_frontend,
+        max_workers: int = 4,
+        top_titles: Optional[List[str]] = None,
+        show_progress: bool = True,
+        clickstream_manager: Optional[ClickstreamManager] = None,
+        top_n: int = 0,
+    ):
+        """
+        Constructor
+
+        Args:
+            wiki_frontend(WikiFrontend): the frontend to prewarm
+            max_workers(int): the maximum number of concurrent renderings
+            top_titles(list): optional most visited titles e.g. from clickstream logs
+            show_progress(bool): if True show a progress bar
+            clickstream_manager(ClickstreamManager): optional manager whose logs are
+                loaded in the background to add the top_n most visited titles
+            top_n(int): the number of most visited titles to take from the clickstream logs
+        """
+        self.wiki_frontend = wiki_frontend
+        self.max_workers = max_workers
+        self.top_titles = top_titles or []
+        self.show_progress = show_progress
+        self.clickstream_manager = clickstream_manager
+        self.top_n = top_n
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.rendered = 0
+        self.failed = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def top_paths_of_clickstream(
+        manager: ClickstreamManager, limit: int, domain: Optional[str] = None
+    ) -> List[str]:
+        """
+        get the most visited paths of the loaded clickstream logs
+
+        Args:
+            manager(ClickstreamManager): the manager with the loaded logs
+            limit(int): the number of paths to return
+            domain(str): optionally only count the clickstreams of this domain
+
+        Returns:
+            list: the most visited paths, most visited first
+        """
+        counter = Counter()
+        for clickstream_log in manager.clickstream_logs:
+            for clickstream in clickstream_log.clickStreams:
+                if domain and clickstream.domain != domain:
+                    continue
+                for page_hit in clickstream.pageHits:
+                    counter[page_hit.path] += 1
+        paths = [path for path, _count in counter.most_common(limit)]
+        return paths
+
+    def load_top_titles(self) -> List[str]:
+        """
+        load the clickstream logs if not done yet and add the most visited
+        titles of the domain of my frontend to my top titles
+
+        Returns:
+            list: the top titles
+        """
+        manager = self.clickstream_manager
+        if manager is not None and self.top_n:
+            with CachePrewarmer._clickstream_lock:
+                if not manager.clickstream_logs:
+                    manager.load_clickstream_logs()
+            top_paths = self.top_paths_of_clickstream(
+                manager, self.top_n, domain=self.wiki_frontend.frontend.hostname
+            )
+            self.top_titles = self.top_titles + top_paths
+        return self.top_titles
+
+    def collect_titles(self) -> List[str]:
+        """
+        collect the titles to prewarm: the default page, the CMS pages
+        and the most visited titles - without duplicates, proxied paths
+        e.g. /images/... and paths with a query string
+
+        Returns:
+            list: the page titles in order of relevance
+        """
+        frontend = self.wiki_frontend
+        candidates = [frontend.frontend.defaultPage]
+        candidates.extend(self.top_titles)
+        candidates.extend(frontend.cms_pages.keys())
+        titles = []
+        seen = set()
+        for candidate in candidates:
+            if not candidate or "?" in candidate or frontend.needsProxy(candidate):
+                continue
+            page_title, error = frontend.get_page_title(candidate)
+            if error:
+                continue
+            title = frontend.normalize_title(page_title)
+            if title and title not in seen:
+                seen.add(title)
+                titles.append(page_title)
+        return titles
+
+    def prewarm_title(self, page_title: str) -> bool:
+        """
+        render the page with the given title into the page cache
+
+        Returns:
+            bool: True if the page was rendered successfully
+        """
+        response = self.wiki_frontend.get_path_response(f"/{page_title}")
+        ok = response.status_code == 200
+        return ok
+
+    def prewarm(self, titles: Optional[List[str]] = None) -> int:
+        """
+        render the given titles with bounded concurrency
+
+        Args:
+            titles(list): the titles to render - collected if None
+
+        Returns:
+            int: the number of successfully rendered pages
+        """
+        if titles is None:
+            titles = self.collect_titles()
+        progress_bar = None
+        if self.show_progress:
+            progress_bar = tqdm(
+                total=len(titles), desc=f"prewarming {self.wiki_frontend.name}"
+            )
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=f"prewarm-{self.wiki_frontend.name}",
+        ) as executor:
+            futures = {
+                executor.submit(self.prewarm_title, title): title for title in titles
+            }
+            for future in as_completed(futures):
+                try:
+                    ok = future.result()
+                except Exception as ex:
+                    self.logger.warning(f"prewarming {futures[future]} failed: {ex}")
+                    ok = False
+                if ok:
+                    self.rendered += 1
+                else:
+                    self.failed += 1
+                if progress_bar is not None:
+                    progress_bar.update(1)
+        if progress_bar is not None:
+            progress_bar.close()
+        return self.rendered
+
+    def run(self) -> int:
+        """
+        load the top titles and prewarm
+
+        Returns:
+            int: the number of successfully rendered pages
+        """
+        try:
+            self.load_top_titles()
+        except Exception as ex:
+            self.logger.warning(f"loading the clickstream logs failed: {ex}")
+        rendered = self.prewarm()
+        return rendered
+
+    def start(self):
+        """
+        start loading the top titles and prewarming in a background thread
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self.run,
+                name=f"prewarm-{self.wiki_frontend.name}",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def join(self, timeout: Optional[float] = None):
+        """
+        wait for the background prewarming to finish
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,174 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class RecentChangesPoller:
+    """
+    periodically polls the recent changes of the wiki of a WikiFrontend
+    and invalidates exactly the cached content of the changed pages
+    """
+
+    def __init__(self, wiki_frontend, interval: float = 60.0):
+        """
+        Constructor
+
+        Args:
+            wiki_frontend(WikiFrontend): the frontend whose caches to invalidate
+            interval(float): the polling interval in seconds
+        """
+        self.wiki_frontend = wiki_frontend
+        self.interval = interval
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.last_timestamp: Optional[str] = None
+        self.last_rcid: int = 0
+        # True after the first poll has taken the latest change of the wiki
+        self.seeded = False
+        self.poll_count = 0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def to_mw_timestamp(value) -> str:
+        """
+        convert the given time value to a MediaWiki API timestamp
+
+        Args:
+            value: a datetime, a time.struct_time or a timestamp string
+
+        Returns:
+            str: the ISO 8601 UTC timestamp e.g. 2026-10-17T08:15:00Z
+        """
+        if isinstance(value, str):
+            timestamp = value
+        else:
+            if not isinstance(value, datetime):
+                value = datetime(*value[:6], tzinfo=timezone.utc)
+            timestamp = value.strftime("%Y-%m-%dT%H:%M:%SZ")
+        return timestamp
+
+    @staticmethod
+    def titles_of_change(change: Dict) -> List[str]:
+        """
+        get the titles affected by the given recent change record
+
+        Args:
+            change(dict): a record of the recentchanges api list
+
+        Returns:
+            list: the affected titles - for moves both the old and the new title
+        """
+        titles = []
+        title = change.get("title")
+        if title:
+            titles.append(title)
+        logparams = change.get("logparams") or {}
+        target_title = logparams.get("target_title")
+        if target_title:
+            titles.append(target_title)
+        return titles
+
+    def fetch_latest_change(self) -> Optional[Dict]:
+        """
+        fetch the latest recent change record from the wiki
+
+        Returns:
+            dict: the latest change or None if there are no recent changes
+        """
+        site = self.wiki_frontend.wiki.getSite()
+        changes = site.recentchanges(dir="older", prop="ids|timestamp", max_items=1)
+        latest = next(iter(changes), None)
+        return latest
+
+    def fetch_changes(self) -> Iterable[Dict]:
+        """
+        fetch the recent changes since my last poll from the wiki
+
+        Returns:
+            the recent change records in chronological order
+        """
+        site = self.wiki_frontend.wiki.getSite()
+        changes = site.recentchanges(
+            start=self.last_timestamp,
+            dir="newer",
+            prop="title|ids|timestamp|loginfo",
+        )
+        return changes
+
+    def poll(self) -> Set[str]:
+        """
+        poll the recent changes once and invalidate the changed pages
+
+        Returns:
+            set: the titles of the changed pages
+        """
+        changed_titles = set()
+        if not self.seeded:
+            # first poll - only changes after the latest known one are relevant
+            # - the wiki's clock is used since the local one may differ
+            latest = self.fetch_latest_change()
+            if latest is not None:
+                self.last_rcid = latest.get("rcid", 0)
+                if latest.get("timestamp"):
+                    self.last_timestamp = self.to_mw_timestamp(latest["timestamp"])
+            self.seeded = True
+        else:
+            for change in self.fetch_changes():
+                rcid = change.get("rcid", 0)
+                # the start timestamp is inclusive - skip changes we have seen
+                if rcid and rcid <= self.last_rcid:
+                    continue
+                self.last_rcid = max(self.last_rcid, rcid)
+                if change.get("timestamp"):
+                    self.last_timestamp = self.to_mw_timestamp(change["timestamp"])
+                changed_titles.update(self.titles_of_change(change))
+            if changed_titles:
+                self.wiki_frontend.invalidate_titles(changed_titles)
+        self.poll_count += 1
+        return changed_titles
+
+    def run(self):
+        """
+        poll until stopped
+        """
+        while not self._stop_event.is_set():
+            try:
+                changed_titles = self.poll()
+                if changed_titles:
+                    self.logger.info(
+                        f"{self.wiki_frontend.name}: invalidated {len(changed_titles)} changed pages"
+                    )
+            except Exception as ex:
+                self.logger.warning(
+                    f"{self.wiki_frontend.name}: polling recent changes failed: {ex}"
+                )
+            self._stop_event.wait(self.interval)
+
+    def start(self):
+        """
+        start polling in a background thread
+        """
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self.run,
+                name=f"recentchanges-{self.wiki_frontend.name}",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self):
+        """
+        stop polling
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
@@ -4,10 +4,17 @@ Created on 2026-03-31
 @author: wf
 """
 
+import hashlib
 import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
+from frontend.minify import minify_html
 
 # Built-in resources shipped with the package
 _BUILTIN_DIR = Path(__file__).parent / "resources"
@@ -16,6 +23,66 @@ _BUILTIN_DIR = Path(__file__).parent / "resources"
 _USER_DIR = Path(os.path.expanduser("~/.wikicms"))
 
 
+@dataclass
+class ResourceBundle:
+    """
+    the inline styles or scripts of all resources of a kind
+    concatenated into a single fingerprinted static asset
+    """
+
+    kind: str  # "css" or "js"
+    content: str  # the concatenated style sheet or script
+    remainder: str  # the html that stays inline e.g. link tags of CDNs
+    # bytes of the bundle content before and after minification
+    original_size: int = 0
+    minified_size: int = 0
+
+    # url prefix the bundles are served at
+    url_prefix = "/_assets/"
+    media_types = {"css": "text/css", "js": "application/javascript"}
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        the content hash that makes the bundle url change with its content
+        """
+        digest = hashlib.sha256(self.content.encode("utf-8")).hexdigest()[:16]
+        return digest
+
+    @property
+    def file_name(self) -> str:
+        return f"app.{self.fingerprint}.{self.kind}"
+
+    @property
+    def url(self) -> str:
+        return f"{self.url_prefix}{self.file_name}"
+
+    @property
+    def saved_bytes(self) -> int:
+        """
+        the number of bytes saved by minification
+        """
+        return self.original_size - self.minified_size
+
+    @property
+    def media_type(self) -> str:
+        return self.media_types[self.kind]
+
+    def html(self) -> str:
+        """
+        the html to include in a page: the remainder followed by
+        the reference to the bundle if there is any content
+        """
+        html = self.remainder
+        if self.content.strip():
+            if self.kind == "css":
+                tag = f'<link rel="stylesheet" href="{self.url}">'
+            else:
+                tag = f'<script src="{self.url}"></script>'
+            html = f"{html}\n{tag}"
+        return html
+
+
 class ResourceLoader:
     """
     Loads CSS and JS resource snippets from the built-in resource directory
@@ -28,16 +95,60 @@ class ResourceLoader:
     If a user file has the same name as a built-in file, the user file
     wins (override).  Files are sorted alphabetically so load order is
     deterministic.
+
+    Inline ``<style>`` and ``<script>`` blocks can be extracted into a
+    :class:`ResourceBundle` per kind so that pages reference them as
+    cacheable static assets instead of repeating them.
+
+    Changes of the resource files are detected by the names, modification
+    times and sizes of the files - checked at most every *check_interval*
+    seconds - and only the affected kind is reloaded.
     """
 
+    # number of outdated bundles still served to browsers that loaded
+    # a page before a change - cached pages are keyed by the fingerprint
+    max_published = 16
+
+    # inline blocks that are moved to the bundle of their kind
+    _inline_patterns = {
+        "css": re.compile(r"<style[^>]*>(.*?)</style>\s*", re.DOTALL | re.IGNORECASE),
+        "js": re.compile(
+            r"<script(?![^>]*\bsrc=)[^>]*>(.*?)</script>\s*", re.DOTALL | re.IGNORECASE
+        ),
+    }
+
     def __init__(
         self,
         builtin_dir: Path = _BUILTIN_DIR,
         user_dir: Path = _USER_DIR,
+        check_interval: Optional[float] = 2.0,
+        minify: bool = False,
     ):
+        """
+        constructor
+
+        Args:
+            builtin_dir(Path): the directory of the built-in resources
+            user_dir(Path): the directory of the user overrides
+            check_interval(float): minimum seconds between checks for changed
+                files - None to never check
+            minify(bool): if True minify the resources once per build
+        """
         self.builtin_dir = builtin_dir
         self.user_dir = user_dir
+        self.check_interval = check_interval
+        self.minify = minify
         self._cache: Dict[str, str] = {}
+        # the resources by kind before minification
+        self._originals: Dict[str, str] = {}
+        self._bundles: Dict[str, ResourceBundle] = {}
+        # bundles by file name - including outdated ones
+        self._published: "OrderedDict[str, ResourceBundle]" = OrderedDict()
+        # (css bundle, js bundle, fingerprint) of the latest calculation
+        self._fingerprint: Optional[Tuple[ResourceBundle, ResourceBundle, str]] = None
+        self._signatures: Dict[str, Tuple] = {}
+        self._last_check: Dict[str, float] = {}
+        self._lock = threading.RLock()
 
     def _collect_files(self, kind: str) -> List[Path]:
         """
@@ -71,25 +182,84 @@ class ResourceLoader:
         result = [files_by_name[name] for name in sorted(files_by_name)]
         return result
 
+    def _signature(self, kind: str) -> Tuple:
+        """
+        Get the signature of the resource files of *kind* - it changes when
+        a file is added, removed, overridden or modified.
+
+        Args:
+            kind(str): resource type — ``"css"`` or ``"js"``
+
+        Returns:
+            tuple: the (path, mtime, size) of each file
+        """
+        signature = []
+        for path in self._collect_files(kind):
+            try:
+                stat = path.stat()
+                signature.append((str(path), stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                # removed while checking
+                signature.append((str(path), None, None))
+        return tuple(signature)
+
+    def check_changes(self, kind: str, force: bool = False) -> bool:
+        """
+        Drop the cached resources of *kind* if its files have changed.
+
+        Args:
+            kind(str): resource type — ``"css"`` or ``"js"``
+            force(bool): check even if the check interval has not passed
+
+        Returns:
+            bool: True if the files have changed
+        """
+        changed = False
+        now = time.monotonic()
+        with self._lock:
+            if not force:
+                if self.check_interval is None or kind not in self._signatures:
+                    return changed
+                if now - self._last_check.get(kind, 0.0) < self.check_interval:
+                    return changed
+            self._last_check[kind] = now
+            signature = self._signature(kind)
+            changed = self._signatures.get(kind, signature) != signature
+            if changed:
+                self._cache.pop(kind, None)
+                self._bundles.pop(kind, None)
+        return changed
+
     def _load_kind(self, kind: str) -> str:
         """
         Load and concatenate all resource files of *kind*.
 
-        Results are cached after first call.
+        Results are cached after first call and minified on the way
+        if minification is on.
 
         Args:
             kind(str): resource type — ``"css"`` or ``"js"``
 
         Returns:
-            str: concatenated file contents
-        """
-        if kind not in self._cache:
-            parts = []
-            for path in self._collect_files(kind):
-                content = path.read_text(encoding="utf-8")
-                parts.append(content)
-            self._cache[kind] = "\n".join(parts)
-        result = self._cache[kind]
+            str: concatenated (minified) file contents
+        """
+        self.check_changes(kind)
+        with self._lock:
+            if kind not in self._cache:
+                # the signature is taken before reading so that changes
+                # while reading are detected by the next check
+                self._signatures[kind] = self._signature(kind)
+                self._last_check[kind] = time.monotonic()
+                parts = []
+                for path in self._collect_files(kind):
+                    content = path.read_text(encoding="utf-8")
+                    parts.append(content)
+                html = "\n".join(parts)
+                self._originals[kind] = html
+                if self.minify:
+                    html = minify_html(html)
+                self._cache[kind] = html
+            result = self._cache[kind]
         return result
 
     def css(self) -> str:
@@ -112,8 +282,95 @@ class ResourceLoader:
         result = self._load_kind("js")
         return result
 
+    def _extract_blocks(self, kind: str, html: str, separator: str) -> str:
+        """
+        Get the joined content of the inline blocks of *kind* in the given html.
+        """
+        pattern = self._inline_patterns[kind]
+        blocks = [match.group(1).strip() for match in pattern.finditer(html)]
+        content = separator.join(blocks)
+        return content
+
+    def bundle(self, kind: str) -> ResourceBundle:
+        """
+        Get the bundle of the inline blocks of all resources of *kind*.
+
+        Args:
+            kind(str): resource type — ``"css"`` or ``"js"``
+
+        Returns:
+            ResourceBundle: the bundle
+        """
+        html = self._load_kind(kind)
+        with self._lock:
+            if kind not in self._bundles:
+                pattern = self._inline_patterns[kind]
+                separator = "\n" if kind == "css" else ";\n"
+                bundle = ResourceBundle(
+                    kind=kind,
+                    content=self._extract_blocks(kind, html, separator),
+                    remainder=pattern.sub("", html).strip(),
+                )
+                original_content = self._extract_blocks(
+                    kind, self._originals[kind], separator
+                )
+                bundle.original_size = len(original_content.encode("utf-8"))
+                bundle.minified_size = len(bundle.content.encode("utf-8"))
+                self._bundles[kind] = bundle
+                self._published[bundle.file_name] = bundle
+                while len(self._published) > self.max_published:
+                    self._published.popitem(last=False)
+            result = self._bundles[kind]
+        return result
+
+    def fingerprint(self) -> str:
+        """
+        Get the fingerprint of the html the resources add to a page header
+        i.e. of the current css and js bundles and their remainders.
+
+        Cached pages are keyed by it so that a page restored e.g. from the
+        persistent cache tier never refers to a bundle that is not published.
+
+        Returns:
+            str: the fingerprint
+        """
+        css = self.bundle("css")
+        js = self.bundle("js")
+        with self._lock:
+            if (
+                self._fingerprint is None
+                or self._fingerprint[0] is not css
+                or self._fingerprint[1] is not js
+            ):
+                header_html = f"{css.html()}\n{js.html()}"
+                digest = hashlib.sha256(header_html.encode("utf-8")).hexdigest()[:16]
+                self._fingerprint = (css, js, digest)
+            result = self._fingerprint[2]
+        return result
+
+    def get_bundle(self, file_name: str) -> Optional[ResourceBundle]:
+        """
+        Get the current bundle with the given file name.
+
+        Args:
+            file_name(str): the file name e.g. ``app.0123456789abcdef.css``
+
+        Returns:
+            ResourceBundle: the bundle or None if there is no bundle with
+            this name - recently outdated bundles are still returned for
+            pages that browsers loaded before the change
+        """
+        for kind in ("css", "js"):
+            self.bundle(kind)
+        with self._lock:
+            result = self._published.get(file_name)
+        return result
+
     def clear_cache(self):
         """
         Clear the cached resources so they are reloaded on next access.
         """
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
+            self._bundles.clear()
+            self._signatures.clear()
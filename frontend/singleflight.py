@@ -0,0 +1,81 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    """
+    a call in flight whose outcome is shared by all waiting callers
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    coalesces concurrent calls for the same key so that only one of them
+    - the leader - actually runs while all others wait for and share its result
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.leader_count = 0  # number of calls that actually ran
+        self.shared_count = 0  # number of calls that shared a leader's result
+
+    def in_flight(self, key: Hashable) -> bool:
+        """
+        check whether a call for the given key is currently running
+        """
+        with self._lock:
+            running = key in self._calls
+        return running
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        call fn(*args, **kwargs) unless a call for the same key is already in
+        flight in which case the result of that call is returned
+
+        Args:
+            key: the key identifying equivalent calls
+            fn: the function to call
+
+        Returns:
+            the result of the (shared) call
+
+        Raises:
+            the exception of the (shared) call if it failed
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.leader_count += 1
+            else:
+                call.waiters += 1
+                self.shared_count += 1
+        if leader:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as ex:
+                call.error = ex
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+        else:
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
@@ -0,0 +1,520 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+from tqdm import tqdm
+
+from frontend.frame import HtmlFrame
+from frontend.media_cache import MediaEntry
+
+
+@dataclass
+class ExportResult:
+    """
+    the result of a static export
+    """
+
+    pages: int = 0
+    failed: List[str] = field(default_factory=list)
+    assets: int = 0
+    failed_assets: List[str] = field(default_factory=list)
+    unchanged_assets: int = 0  # assets the wiki reported as not modified
+    unchanged: int = 0  # pages skipped by an incremental export
+    removed: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ManifestEntry:
+    """
+    the state of an exported page
+    """
+
+    revid: Optional[int] = None
+    hash: Optional[str] = None  # sha256 of the written html
+
+
+@dataclass
+class ExportManifest:
+    """
+    manifest of a static export used to only re-render changed pages
+    """
+
+    pages: Dict[str, ManifestEntry] = field(default_factory=dict)
+    # hash of the CMS pages all frames are built from
+    cms_hash: Optional[str] = None
+    # fingerprint of the css/js bundles all pages refer to
+    resource_fingerprint: Optional[str] = None
+    # hash of the html filter configuration and registered forms
+    filter_hash: Optional[str] = None
+    # validators of the mirrored assets by path
+    assets: Dict[str, MediaEntry] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, manifest_path: str) -> "ExportManifest":
+        """
+        load the manifest from the given path
+
+        Returns:
+            ExportManifest: the manifest - empty if there is none
+        """
+        manifest = cls()
+        if os.path.isfile(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+                data = json.load(manifest_file)
+            manifest.cms_hash = data.get("cms_hash")
+            manifest.resource_fingerprint = data.get("resource_fingerprint")
+            manifest.filter_hash = data.get("filter_hash")
+            for title, entry in data.get("pages", {}).items():
+                manifest.pages[title] = ManifestEntry(**entry)
+            for path, entry in data.get("assets", {}).items():
+                manifest.assets[path] = MediaEntry(**entry)
+        return manifest
+
+    def save(self, manifest_path: str):
+        """
+        atomically save me to the given path
+        """
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as manifest_file:
+            json.dump(asdict(self), manifest_file, indent=1, ensure_ascii=False)
+        os.replace(tmp_path, manifest_path)
+
+
+class StaticExporter:
+    """
+    exports all pages of a WikiFrontend as static html files in the
+    URL layout served by CmsWebServer.render_path so that a plain
+    webserver e.g. nginx with try_files $uri $uri/index.html can serve them
+    """
+
+    # the language of the exported frames
+    lang: str = "en"
+
+    def __init__(
+        self,
+        wiki_frontend,
+        out_dir: str,
+        max_workers: int = 8,
+        show_progress: bool = True,
+    ):
+        """
+        Constructor
+
+        Args:
+            wiki_frontend(WikiFrontend): the frontend to export
+            out_dir(str): the output directory
+            max_workers(int): the number of pages/assets to render/fetch concurrently
+            show_progress(bool): if True show progress bars
+        """
+        self.wiki_frontend = wiki_frontend
+        self.out_dir = out_dir
+        self.site_dir = os.path.join(out_dir, wiki_frontend.name)
+        self.max_workers = max_workers
+        self.show_progress = show_progress
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.manifest_path = os.path.join(self.site_dir, ".export-manifest.json")
+        # the state of the previous export
+        self.manifest = ExportManifest.load(self.manifest_path)
+        # the revision ids fetched by an incremental export
+        self.revisions: Dict[str, int] = {}
+
+    def all_titles(self) -> List[str]:
+        """
+        enumerate the titles of all pages in the main namespace of the wiki
+
+        Returns:
+            list: the page titles
+        """
+        site = self.wiki_frontend.wiki.getSite()
+        titles = [page.name for page in site.allpages(namespace=0)]
+        return titles
+
+    def all_revisions(self) -> Dict[str, int]:
+        """
+        get the latest revision ids of all pages in the main namespace
+        in bulk with an allpages generator query
+
+        Returns:
+            dict: the revision ids by page title
+        """
+        site = self.wiki_frontend.wiki.getSite()
+        revisions = {}
+        params = {
+            "generator": "allpages",
+            "gapnamespace": 0,
+            "gaplimit": "max",
+            "prop": "revisions",
+            "rvprop": "ids",
+        }
+        while True:
+            result = site.api("query", **params)
+            for page in result.get("query", {}).get("pages", {}).values():
+                page_revisions = page.get("revisions")
+                if page_revisions:
+                    revisions[page["title"]] = page_revisions[0]["revid"]
+            if "continue" not in result:
+                break
+            params.update(result["continue"])
+        return revisions
+
+    def cms_hash(self) -> str:
+        """
+        get a hash of the CMS pages e.g. header and footer every page is framed with
+        """
+        cms_pages = self.wiki_frontend.cms_pages
+        cms_json = json.dumps(cms_pages, sort_keys=True, ensure_ascii=False)
+        cms_hash = hashlib.sha256(cms_json.encode("utf-8")).hexdigest()
+        return cms_hash
+
+    def filter_hash(self) -> str:
+        """
+        get a hash of the html filter configuration e.g. filter keys and forms
+        every page is filtered with
+        """
+        filter_context = self.wiki_frontend.filter_context(self.lang)
+        filter_hash = hashlib.sha256(filter_context.encode("utf-8")).hexdigest()
+        return filter_hash
+
+    def frame_changed(self) -> bool:
+        """
+        check whether the CMS pages, css/js bundles or html filter configuration
+        all pages depend on have changed since the last export
+        """
+        fingerprint = HtmlFrame.get_resource_loader().fingerprint()
+        frame_changed = (
+            self.manifest.cms_hash != self.cms_hash()
+            or self.manifest.resource_fingerprint != fingerprint
+            or self.manifest.filter_hash != self.filter_hash()
+        )
+        return frame_changed
+
+    def page_file_path(self, page_title: str) -> str:
+        """
+        get the file path for the given page title
+
+        the file is an index.html in the directory of the /{site}/index.php/{title}
+        url the framed pages link to
+
+        Args:
+            page_title(str): the title of the page
+
+        Returns:
+            str: the path of the html file
+        """
+        url_title = page_title.replace(" ", "_")
+        file_path = os.path.join(self.site_dir, "index.php", url_title, "index.html")
+        return file_path
+
+    def write_file(self, file_path: str, content: bytes):
+        """
+        atomically write the given content to the given file path
+        so that a webserver never serves a half written file
+        """
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, "wb") as tmp_file:
+            tmp_file.write(content)
+        os.replace(tmp_path, file_path)
+
+    def write_chunks(self, file_path: str, chunks: Iterable[bytes]) -> int:
+        """
+        atomically write the given chunks to the given file path
+
+        Returns:
+            int: the number of bytes written
+        """
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_path = f"{file_path}.tmp"
+        size = 0
+        try:
+            with open(tmp_path, "wb") as tmp_file:
+                for chunk in chunks:
+                    tmp_file.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return size
+
+    def asset_file_path(self, path: str) -> Optional[str]:
+        """
+        get the file path of the asset with the given path
+
+        Args:
+            path(str): the path of the asset relative to the site
+
+        Returns:
+            str: the path of the file or None if the path points outside
+            of the site directory e.g. with .. segments
+        """
+        site_dir = os.path.realpath(self.site_dir)
+        file_path = os.path.realpath(os.path.join(site_dir, path.lstrip("/")))
+        if not file_path.startswith(site_dir + os.sep):
+            file_path = None
+        return file_path
+
+    def asset_paths(self, html: str) -> Set[str]:
+        """
+        get the paths of the proxied assets e.g. images and videos
+        the given rendered html refers to
+
+        Args:
+            html(str): the rendered html
+
+        Returns:
+            set: the asset paths relative to the site e.g. /images/wiki/a/ab/Logo.png
+        """
+        site_prefix = f"/{self.wiki_frontend.name}"
+        paths = set()
+        for match in re.finditer(r'(?:src|srcset|href)="([^"]+)"', html):
+            for candidate in match.group(1).split(","):
+                url = candidate.strip().split(" ")[0]
+                url = url.split("?")[0].split("#")[0]
+                if url.startswith(site_prefix + "/"):
+                    path = url[len(site_prefix) :]
+                    if self.wiki_frontend.needsProxy(path):
+                        paths.add(path)
+        return paths
+
+    def export_page(self, page_title: str) -> Optional[bytes]:
+        """
+        render the page with the given title and write it to its file
+
+        Args:
+            page_title(str): the title of the page
+
+        Returns:
+            bytes: the rendered html or None if rendering failed
+        """
+        rendered = self.wiki_frontend.render_page(f"/{page_title}", self.lang)
+        body = None
+        if rendered.status_code == 200:
+            body = rendered.body
+            body_hash = hashlib.sha256(body).hexdigest()
+            file_path = self.page_file_path(page_title)
+            entry = self.manifest.pages.get(page_title)
+            # identical output is not written again
+            if (
+                entry is None
+                or entry.hash != body_hash
+                or not os.path.isfile(file_path)
+            ):
+                self.write_file(file_path, body)
+            revid = self.revisions.get(page_title, rendered.revid)
+            self.manifest.pages[page_title] = ManifestEntry(revid=revid, hash=body_hash)
+        return body
+
+    def export_asset(self, path: str) -> Optional[bool]:
+        """
+        mirror the proxied asset with the given path - an existing file is
+        revalidated with the ETag/Last-Modified of the previous export
+
+        Args:
+            path(str): the path of the asset relative to the site
+
+        Returns:
+            bool: True if the asset was downloaded, False if it was not modified
+            and None if it could not be mirrored
+        """
+        file_path = self.asset_file_path(path)
+        if file_path is None:
+            self.logger.warning(f"not mirroring {path} - outside of {self.site_dir}")
+            return None
+        entry = self.manifest.assets.get(path)
+        headers = None
+        if entry is not None and os.path.isfile(file_path):
+            headers = entry.conditional_headers
+        response = self.wiki_frontend.proxy(path, headers=headers, stream=True)
+        try:
+            if headers and response.status_code == 304:
+                mirrored = False
+            elif response.status_code == 200:
+                chunks = response.iter_content(self.wiki_frontend.proxy_chunk_size)
+                size = self.write_chunks(file_path, chunks)
+                self.manifest.assets[path] = MediaEntry(
+                    path=path,
+                    size=size,
+                    content_type=response.headers.get("Content-Type"),
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                )
+                mirrored = True
+            else:
+                mirrored = None
+        finally:
+            response.close()
+        return mirrored
+
+    def export_bundles(self) -> List[str]:
+        """
+        write the fingerprinted css/js bundles the pages refer to
+        to the _assets directory of the output directory
+
+        Returns:
+            list: the paths of the newly written bundles
+        """
+        loader = HtmlFrame.get_resource_loader()
+        written = []
+        for kind in ("css", "js"):
+            bundle = loader.bundle(kind)
+            file_path = os.path.join(
+                self.out_dir, bundle.url_prefix.strip("/"), bundle.file_name
+            )
+            if bundle.content.strip() and not os.path.isfile(file_path):
+                self.write_file(file_path, bundle.content.encode("utf-8"))
+                written.append(file_path)
+        return written
+
+    def remove_page(self, page_title: str):
+        """
+        remove the exported file of the given page and its empty directories
+        """
+        file_path = self.page_file_path(page_title)
+        if os.path.isfile(file_path):
+            os.remove(file_path)
+        index_dir = os.path.join(self.site_dir, "index.php")
+        dir_path = os.path.dirname(file_path)
+        while dir_path.startswith(index_dir) and dir_path != index_dir:
+            try:
+                os.rmdir(dir_path)
+            except OSError:
+                # not empty e.g. because of subpages
+                break
+            dir_path = os.path.dirname(dir_path)
+        self.manifest.pages.pop(page_title, None)
+
+    def remove_missing(self, titles: Iterable[str], result: ExportResult):
+        """
+        remove the exported pages that are not in the given titles
+
+        Args:
+            titles: the titles of all existing pages
+            result(ExportResult): the result to add the removed titles to
+        """
+        titles = set(titles)
+        for page_title in list(self.manifest.pages):
+            if page_title not in titles:
+                self.remove_page(page_title)
+                result.removed.append(page_title)
+
+    def _run(self, fn, items: Iterable[str], desc: str):
+        """
+        run fn for all items with my worker pool showing progress
+
+        Returns:
+            list: (item, result) tuples - the result is None for failed items
+        """
+        items = list(items)
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [(item, executor.submit(fn, item)) for item in items]
+            if self.show_progress:
+                futures = tqdm(futures, desc=desc)
+            for item, future in futures:
+                try:
+                    result = future.result()
+                except Exception as ex:
+                    self.logger.warning(f"{desc} {item} failed: {ex}")
+                    result = None
+                results.append((item, result))
+        return results
+
+    def export(
+        self, titles: Optional[List[str]] = None, result: ExportResult = None
+    ) -> ExportResult:
+        """
+        export the given pages and the assets they refer to
+
+        Args:
+            titles(list): the titles to export - all pages if None in which
+                case the pages of the previous export that no longer exist are removed
+            result(ExportResult): the result to add the statistics to
+
+        Returns:
+            ExportResult: the export statistics
+        """
+        if result is None:
+            result = ExportResult()
+        if titles is None:
+            titles = self.all_titles()
+            self.remove_missing(titles, result)
+        asset_paths = set()
+        name = self.wiki_frontend.name
+        for page_title, body in self._run(
+            self.export_page, titles, f"exporting {name} pages"
+        ):
+            if body is None:
+                result.failed.append(page_title)
+            else:
+                result.pages += 1
+                asset_paths.update(self.asset_paths(body.decode("utf-8")))
+        # the default page is also served for the site root
+        default_page = self.wiki_frontend.frontend.defaultPage
+        if default_page and os.path.isfile(self.page_file_path(default_page)):
+            with open(self.page_file_path(default_page), "rb") as html_file:
+                self.write_file(
+                    os.path.join(self.site_dir, "index.html"), html_file.read()
+                )
+        for path, mirrored in self._run(
+            self.export_asset, sorted(asset_paths), f"mirroring {name} assets"
+        ):
+            if mirrored is None:
+                result.failed_assets.append(path)
+            elif mirrored:
+                result.assets += 1
+            else:
+                result.unchanged_assets += 1
+        self.export_bundles()
+        self.manifest.cms_hash = self.cms_hash()
+        self.manifest.resource_fingerprint = (
+            HtmlFrame.get_resource_loader().fingerprint()
+        )
+        self.manifest.filter_hash = self.filter_hash()
+        os.makedirs(self.site_dir, exist_ok=True)
+        self.manifest.save(self.manifest_path)
+        return result
+
+    def export_incremental(
+        self, revisions: Optional[Dict[str, int]] = None
+    ) -> ExportResult:
+        """
+        export only the pages that are new or have a new revision since the
+        last export and remove the pages that no longer exist
+
+        all pages are re-rendered if the CMS pages of the frame, the css/js
+        bundles or the html filter configuration have changed
+
+        Args:
+            revisions(dict): the current revision ids by title - fetched in bulk if None
+
+        Returns:
+            ExportResult: the export statistics
+        """
+        if revisions is None:
+            revisions = self.all_revisions()
+        self.revisions = revisions
+        self.manifest = ExportManifest.load(self.manifest_path)
+        result = ExportResult()
+        frame_changed = self.frame_changed()
+        self.remove_missing(revisions, result)
+        titles = []
+        for page_title, revid in revisions.items():
+            entry = self.manifest.pages.get(page_title)
+            if frame_changed or entry is None or entry.revid != revid:
+                titles.append(page_title)
+            else:
+                result.unchanged += 1
+        self.export(titles, result=result)
+        return result
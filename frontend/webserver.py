@@ -8,8 +8,7 @@ import os
 import socket
 from typing import Optional
 
-from fastapi import HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import HTTPException, Request, Response
 from mwstools_backend.server import Servers
 from mwstools_backend.site import Wikis
 from ng3.graph_navigator import GraphNavigatorSolution, GraphNavigatorWebserver
@@ -21,6 +20,7 @@ from nicegui import Client, app, ui
 from starlette.responses import RedirectResponse
 from wikibot3rd.sso_users import Sso_Users
 
+from frontend.frame import HtmlFrame
 from frontend.servers_view import ServersView
 from frontend.version import Version
 from frontend.wikicms import WikiFrontends
@@ -92,31 +92,78 @@ class CmsWebServer(GraphNavigatorWebserver):
         async def login(client: Client) -> None:
             return await self.page(client, CmsSolution.show_login)
 
+        @app.get("/_assets/{file_name}")
+        def render_asset(file_name: str) -> Response:
+            """
+            Handles a GET request for a fingerprinted css/js bundle.
+
+            Args:
+                file_name: The file name of the bundle e.g. app.<hash>.css
+
+            Returns:
+                A Response with the bundle that may be cached forever.
+            """
+            return self.render_asset(file_name)
+
         @app.get("/{frontend_name}/{page_path:path}")
-        def render_path(frontend_name: str, page_path: str) -> HTMLResponse:
+        def render_path(
+            frontend_name: str, page_path: str, request: Request
+        ) -> Response:
             """
             Handles a GET request to render the path of the given frontend.
 
             Args:
                 frontend_name: The name of the frontend to be rendered.
                 page_path: The specific path within the frontend to be rendered.
+                request: The request e.g. with the Range header of a video player.
 
             Returns:
-                An HTMLResponse containing the rendered page content.
+                A Response with the rendered page, a streamed page or proxied
+                file or the 304 Not Modified for a matching conditional request.
 
             """
-            return self.render_path(frontend_name, page_path)
+            return self.render_path(frontend_name, page_path, request.headers)
 
-    def render_path(self, frontend_name: str, page_path: str):
+    def render_asset(self, file_name: str) -> Response:
+        """
+        Renders the css/js bundle with the given file name.
+
+        Args:
+            file_name: The file name of the bundle e.g. app.<hash>.css
+
+        Returns:
+            A Response with the bundle and immutable, year-long cache headers.
+
+        Raises:
+            HTTPException: 404 if there is no current bundle with this name.
+        """
+        bundle = HtmlFrame.get_resource_loader().get_bundle(file_name)
+        if bundle is None:
+            raise HTTPException(status_code=404, detail=f"{file_name} not found")
+        response = Response(
+            content=bundle.content,
+            media_type=bundle.media_type,
+            headers={
+                "Cache-Control": "public, max-age=31536000, immutable",
+                "ETag": f'"{bundle.fingerprint}"',
+            },
+        )
+        return response
+
+    def render_path(
+        self, frontend_name: str, page_path: str, request_headers=None
+    ) -> Response:
         """
         Renders the content for a specific path of the given frontend.
 
         Args:
             frontend_name: The name of the frontend to be rendered.
             page_path: The specific path within the frontend to be rendered.
+            request_headers: The optional headers of the client request.
 
         Returns:
-            An HTMLResponse containing the rendered page content or an error page if something goes wrong.
+            A Response e.g. an HTML page, a StreamingResponse or a FileResponse
+            of the media cache or an error page if something goes wrong.
 
         Raises:
             SomeException: If an error occurs during page content retrieval or rendering.
@@ -127,7 +174,7 @@ class CmsWebServer(GraphNavigatorWebserver):
             raise HTTPException(
                 status_code=404, detail=f"frontend {frontend_name} is not available"
             )
-        response = wiki_frontend.get_path_response(f"/{page_path}")
+        response = wiki_frontend.get_path_response(f"/{page_path}", request_headers)
         return response
 
     def configure_run(self):
@@ -135,17 +182,20 @@ class CmsWebServer(GraphNavigatorWebserver):
         configure command line specific details
         """
         super().configure_run()
-        sites = []
         self.local_server = self.servers.servers.get(self.hostname)
         server_name = self.args.server or self.hostname
         self.server = self.servers.servers.get(server_name)
         if self.local_server:
             self.local_server.probe_local()
 
-        if self.server and self.server.frontends:
-            sites = [frontend.name for frontend in self.server.frontends.values()]
-        sites = self.wiki_frontends.get_sites(self.args, sites)
+        sites = self.wiki_frontends.configure(self.args, self.server)
         self.wiki_frontends.enableSites(sites)
+        if self.args.prewarm:
+            self.wiki_frontends.prewarm(
+                max_workers=self.args.prewarm_workers,
+                top_n=self.args.prewarm_top,
+                clickstream_path=self.args.clickstream_path,
+            )
         module_path = os.path.dirname(os.path.abspath(__file__))
         yaml_path = os.path.join(module_path, "resources", "schema.yaml")
         self.load_schema(yaml_path)
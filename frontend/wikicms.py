@@ -5,19 +5,34 @@ Created on 2020-07-27
 """
 
 import logging
+import os
 import re
+import threading
+import time
 import traceback
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 import requests
 from fastapi import Response
-from fastapi.responses import HTMLResponse
+from fastapi.responses import StreamingResponse
 from mwstools_backend.site import FrontendSite
 from wikibot3rd.smw import SMWClient
 from wikibot3rd.wikiclient import WikiClient
 
+from frontend.cache_store import SqliteCacheStore
+from frontend.clickstream import ClickstreamManager
+from frontend.conditional import is_not_modified, parse_http_date
+from frontend.filter_stages import StageStats
 from frontend.frame import HtmlFrame
+from frontend.html_stream import iter_chunks
 from frontend.htmlfilter import MediaWikiHtmlFilter, PageContent
+from frontend.http_session import HttpSessionConfig
+from frontend.media_cache import MediaCache, MediaEntry, MediaFileResponse
+from frontend.page_cache import CacheStats, PageCache, PageCacheConfig, RenderedPage
+from frontend.prewarm import CachePrewarmer
+from frontend.recent_changes import RecentChangesPoller
+from frontend.singleflight import SingleFlight
 
 
 class WikiFrontend(MediaWikiHtmlFilter):
@@ -26,6 +41,25 @@ class WikiFrontend(MediaWikiHtmlFilter):
     """
 
     with_login: bool = True
+    # request headers forwarded to the wiki when proxying
+    proxy_request_headers = [
+        "range",
+        "if-range",
+        "if-none-match",
+        "if-modified-since",
+    ]
+    # hop-by-hop headers that must not be passed on by a proxy - see RFC 7230 6.1
+    hop_by_hop_headers = [
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailer",
+        "transfer-encoding",
+        "upgrade",
+    ]
+    proxy_chunk_size: int = 64 * 1024
 
     def __init__(
         self,
@@ -34,6 +68,8 @@ class WikiFrontend(MediaWikiHtmlFilter):
         proxy_prefixes=["/images/", "/videos"],
         debug: bool = False,
         filterKeys=None,
+        cache_config: PageCacheConfig = None,
+        http_config: HttpSessionConfig = None,
     ):
         """
         Constructor
@@ -43,15 +79,57 @@ class WikiFrontend(MediaWikiHtmlFilter):
             proxy_prefixes(list): the list of prefixes that need direct proxy access
             debug: (bool): True if debugging should be on
             filterKeys: (list): a list of keys for filters to be applied e.g. editsection
+            cache_config(PageCacheConfig): the configuration of the rendered page cache
+            http_config(HttpSessionConfig): the configuration of the pooled proxy session
         """
+        if cache_config is None:
+            cache_config = PageCacheConfig()
         super().__init__(
-            parser=parser, debug=debug, filterKeys=filterKeys, site_name=frontend.name
+            parser=parser,
+            debug=debug,
+            filterKeys=filterKeys,
+            site_name=frontend.name,
+            stream_threshold=cache_config.stream_threshold,
         )
         self.logger = logging.getLogger(self.__class__.__name__)
         self.proxy_prefixes = proxy_prefixes
         self.frontend = frontend
         self.name = self.frontend.name
         self.wiki = None
+        self.cache_config = cache_config
+        self.page_cache = PageCache.of_config(cache_config)
+        # reveal.js slide html by (normalized page title, revision id, filter context)
+        self.slide_cache = PageCache(
+            max_entries=64, max_bytes=64 * 1024 * 1024, ttl=None
+        )
+        # coalesces concurrent renderings of the same page
+        self.single_flight = SingleFlight()
+        # refreshes stale pages in the background
+        self.revalidate_executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix=f"revalidate-{self.name}"
+        )
+        # time of the last failed revalidation by cache key - the entries
+        # expire after the revalidation backoff and the least recently used
+        # ones are evicted so that failing pages can not grow it without bound
+        self.render_failures = PageCache(
+            max_entries=1024, ttl=cache_config.revalidate_backoff
+        )
+        # invalidation generation by normalized title - "" counts the
+        # invalidations of all pages - renderings that were in flight while
+        # their page was invalidated are not cached
+        self.invalidations: Dict[str, int] = {}
+        self.invalidation_lock = threading.Lock()
+        # fingerprint of the css/js resources the cached pages refer to
+        self.resource_fingerprint: Optional[str] = None
+        self.cms_pages = {}
+        self.recent_changes_poller = None
+        if http_config is None:
+            http_config = HttpSessionConfig()
+        self.http_config = http_config
+        # keep-alive connection pool shared by all proxied requests
+        self.http_session = http_config.create_session()
+        # disk cache of proxied images and videos - None for off
+        self.media_cache: Optional[MediaCache] = None
 
     def log(self, msg: str):
         """
@@ -92,6 +170,23 @@ class WikiFrontend(MediaWikiHtmlFilter):
 
         return site, remaining_path
 
+    @staticmethod
+    def normalize_title(page_title: str) -> str:
+        """
+        normalize the given page title the way MediaWiki does
+        so that e.g. "main_page" and "Main Page" share a cache entry
+
+        Args:
+            page_title(str): the page title to normalize
+
+        Returns:
+            str: the normalized title
+        """
+        title = " ".join(page_title.replace("_", " ").split())
+        if title:
+            title = title[0].upper() + title[1:]
+        return title
+
     def open(self):
         """
         open the frontend
@@ -101,9 +196,88 @@ class WikiFrontend(MediaWikiHtmlFilter):
             self.wiki = WikiClient.ofWikiId(self.frontend.wikiId)
             if WikiFrontend.with_login:
                 self.wiki.login()
+            if self.cache_config.cache_dir and self.page_cache.store is None:
+                store = SqliteCacheStore.of_cache_dir(
+                    self.cache_config.cache_dir,
+                    self.name,
+                    max_bytes=self.cache_config.store_max_bytes,
+                )
+                self.page_cache.attach_store(store)
+            if self.cache_config.media_cache_dir and self.media_cache is None:
+                self.media_cache = MediaCache(
+                    os.path.join(self.cache_config.media_cache_dir, self.name),
+                    max_bytes=self.cache_config.media_max_bytes,
+                    max_age=self.cache_config.media_max_age,
+                )
             self.smwclient = SMWClient(self.wiki.getSite())
             self.cms_pages = self.get_cms_pages()
             self.frontend.enabled = True
+            if self.cache_config.poll_interval:
+                self.recent_changes_poller = RecentChangesPoller(
+                    self, interval=self.cache_config.poll_interval
+                )
+                self.recent_changes_poller.start()
+
+    def close(self):
+        """
+        close the frontend - stopping background activities
+        """
+        if self.recent_changes_poller is not None:
+            self.recent_changes_poller.stop()
+            self.recent_changes_poller = None
+        self.revalidate_executor.shutdown(wait=False)
+        if self.page_cache.store is not None:
+            self.page_cache.store.close()
+            self.page_cache.store = None
+        self.http_session.close()
+
+    def invalidate_titles(self, page_titles: Iterable[str]) -> Set[str]:
+        """
+        invalidate the cached content of the given pages
+        e.g. after they have been changed in the wiki
+
+        Changed CMS pages are fetched again and since they are part of
+        every frame all rendered pages are invalidated in that case.
+
+        Args:
+            page_titles: the titles of the changed pages
+
+        Returns:
+            set: the normalized titles that have been invalidated
+        """
+        titles = {self.normalize_title(page_title) for page_title in page_titles}
+        changed_cms_pages = [
+            page_title
+            for page_title in list(self.cms_pages)
+            if self.normalize_title(page_title) in titles
+        ]
+        with self.invalidation_lock:
+            for title in titles | ({""} if changed_cms_pages else set()):
+                self.invalidations[title] = self.invalidations.get(title, 0) + 1
+        if changed_cms_pages:
+            for page_title in changed_cms_pages:
+                pageContent = self.getContent(page_title)
+                if not pageContent.error:
+                    self.cms_pages[page_title] = pageContent.html
+                else:
+                    self.logger.warning(pageContent.error)
+            self.page_cache.clear()
+        else:
+            self.page_cache.invalidate_where(lambda key: key[1] in titles)
+        return titles
+
+    def invalidation_generation(self, title: str) -> int:
+        """
+        get the invalidation generation of the page with the given normalized title
+
+        Returns:
+            int: a number that grows with every invalidation of the page
+        """
+        with self.invalidation_lock:
+            generation = self.invalidations.get(title, 0) + self.invalidations.get(
+                "", 0
+            )
+        return generation
 
     def get_cms_pages(self) -> dict:
         """
@@ -176,61 +350,284 @@ class WikiFrontend(MediaWikiHtmlFilter):
             needs_proxy = needs_proxy or path.startswith(prefix)
         return needs_proxy
 
-    def proxy(self, path: str) -> str:
+    def proxy(
+        self, path: str, headers: Optional[Dict[str, str]] = None, stream: bool = False
+    ) -> requests.Response:
         """
         Proxy a request.
         See https://stackoverflow.com/a/50231825/1497139
 
         Args:
             path (str): the path to proxy
+            headers (dict): optional request headers to send to the wiki e.g. Range
+            stream (bool): if True do not read the body before returning
 
         Returns:
-            the proxied result as a string
+            the proxied response
         """
         wikiUser = self.wiki.wikiUser
         url = f"{wikiUser.url}{wikiUser.scriptPath}{path}"
 
-        # Get the response
-        response = requests.get(url)
+        # Get the response via the pooled keep-alive session
+        response = self.http_session.get(
+            url, headers=headers, stream=stream, timeout=self.http_config.timeout
+        )
+
+        return response
+
+    def forward_headers(self, request_headers) -> Dict[str, str]:
+        """
+        select the request headers to forward to the wiki
+
+        Args:
+            request_headers: the headers of the client request
+
+        Returns:
+            dict: the headers to forward
+        """
+        forwarded = {}
+        if request_headers:
+            for name, value in request_headers.items():
+                if name.lower() in self.proxy_request_headers:
+                    forwarded[name.lower()] = value
+        return forwarded
+
+    def cached_media_response(
+        self, path: str, entry: MediaEntry, request_headers=None
+    ) -> Optional[Response]:
+        """
+        get the response for the given media cache entry
+
+        Args:
+            path(str): the proxied path
+            entry(MediaEntry): the cached entry
+            request_headers: the headers of the client request
+
+        Returns:
+            Response: 304 Not Modified, the pinned file or None if the
+            file has been evicted in the meantime
+        """
+        last_modified = (
+            parse_http_date(entry.last_modified) if entry.last_modified else None
+        )
+        if is_not_modified(request_headers, entry.etag, last_modified):
+            return Response(status_code=304, headers=entry.headers)
+        response = None
+        if self.media_cache.pin(path):
+            # served with sendfile where available - Range is handled locally
+            response = MediaFileResponse(self.media_cache, path, entry)
+        return response
+
+    def proxy_response(self, path: str, request_headers=None) -> Response:
+        """
+        stream the proxied content of the given path chunk by chunk
+        so that memory stays bounded for big e.g. video files
+
+        Args:
+            path(str): the path to proxy
+            request_headers: the headers of the client request - Range and
+                If-Range are forwarded so that browsers can seek in videos and
+                If-None-Match and If-Modified-Since so that the wiki may answer 304
+
+        Returns:
+            Response: the streamed response with the wiki's status
+            e.g. 206 for partial content or the file from the media cache -
+            expired files are revalidated with the wiki first
+        """
+        entry = None
+        if self.media_cache is not None:
+            entry = self.media_cache.get(path)
+            if entry is not None and self.media_cache.is_fresh(entry):
+                response = self.cached_media_response(path, entry, request_headers)
+                if response is not None:
+                    return response
+                # evicted in the meantime
+                entry = None
+        if entry is None:
+            upstream = self.proxy(
+                path, headers=self.forward_headers(request_headers), stream=True
+            )
+        else:
+            # revalidate the expired file with the wiki
+            try:
+                upstream = self.proxy(
+                    path, headers=entry.conditional_headers, stream=True
+                )
+            except requests.RequestException as ex:
+                self.logger.warning(f"revalidating {path} failed: {ex}")
+                upstream = None
+            if upstream is None or upstream.status_code == 304:
+                if upstream is not None:
+                    upstream.close()
+                    self.media_cache.refresh(path)
+                response = self.cached_media_response(path, entry, request_headers)
+                if response is not None:
+                    return response
+                upstream = self.proxy(
+                    path, headers=self.forward_headers(request_headers), stream=True
+                )
+        headers = {
+            name: value
+            for name, value in upstream.headers.items()
+            if name.lower() not in self.hop_by_hop_headers
+        }
+        # the body is passed on as is - Content-Encoding stays valid
+        chunks = upstream.raw.stream(self.proxy_chunk_size, decode_content=False)
+        if (
+            self.media_cache is not None
+            and upstream.status_code == 200
+            and not upstream.headers.get("Content-Encoding")
+        ):
+            entry = MediaEntry(
+                path=path,
+                size=0,
+                content_type=upstream.headers.get("Content-Type"),
+                etag=upstream.headers.get("ETag"),
+                last_modified=upstream.headers.get("Last-Modified"),
+            )
+            content_length = upstream.headers.get("Content-Length")
+            chunks = self.media_cache.store(
+                entry, chunks, int(content_length) if content_length else None
+            )
+
+        def content():
+            try:
+                yield from chunks
+            finally:
+                # return the connection to the pool
+                upstream.close()
 
+        response = StreamingResponse(
+            content(), status_code=upstream.status_code, headers=headers
+        )
         return response
 
-    def getContent(self, pagePath: str) -> PageContent:
+    def get_page_title(self, pagePath: str) -> Tuple[str, Optional[str]]:
+        """
+        get the wiki page title for the given pagePath
+
+        Args:
+            pagePath(str): the pagePath
+
+        Returns:
+            tuple: the page title and None or an error message for an invalid path
+        """
+        error = None
+        if pagePath == "/":
+            page_title = self.frontend.defaultPage
+        else:
+            error = self.checkPath(pagePath)
+            page_title = self.wikiPage(pagePath)
+        return page_title, error
+
+    def get_cache_key(
+        self, page_title: str, lang: str = "en"
+    ) -> Tuple[str, str, str, str]:
+        """
+        get the page cache key for the given page title and language
+
+        Args:
+            page_title(str): the title of the page
+            lang(str): the language of the frame
+
+        Returns:
+            tuple: the (site, normalized page title, lang, resource fingerprint) key
+            - pages are only served with the css/js bundles they refer to
+        """
+        fingerprint = HtmlFrame.get_resource_loader().fingerprint()
+        if fingerprint != self.resource_fingerprint:
+            self.on_resources_changed(fingerprint)
+        cache_key = (self.name, self.normalize_title(page_title), lang, fingerprint)
+        return cache_key
+
+    def on_resources_changed(self, fingerprint: str):
+        """
+        drop the cached pages that refer to outdated css/js bundles
+
+        Args:
+            fingerprint(str): the fingerprint of the current resources
+        """
+        self.resource_fingerprint = fingerprint
+        # also drops the pages persisted with other resources before a restart
+        count = self.page_cache.invalidate_where(lambda key: key[-1] != fingerprint)
+        if count:
+            self.logger.info(
+                f"{self.name}: resources changed - {count} cached pages invalidated"
+            )
+
+    def getContent(self, pagePath: str, stream: bool = False) -> PageContent:
         """get the content for the given pagePath
         Args:
             pagePath(str): the pagePath
-            whatToFilter(list): list of filter keys
+            stream(bool): if True leave pages that should be streamed unfiltered
+                - see use_stream
         Returns:
             pageContent(PageContent): the HTML content for the given path wrapped in a PageContent
         """
         pc = PageContent()
         try:
-            if pagePath == "/":
-                pc.page_title = self.frontend.defaultPage
-            else:
-                pc.error = self.checkPath(pagePath)
-                pc.page_title = self.wikiPage(pagePath)
+            pc.page_title, pc.error = self.get_page_title(pagePath)
             if pc.error is None:
                 if self.wiki is None:
                     raise Exception(
                         "getContent without wiki - you might want to call open first"
                     )
-                pc.html=self.wiki.getHtml(pc.page_title)
-                pc.markup=self.wiki.get_wiki_markup(pc.page_title)
-                pc.page_title=pc.page_title
-                pc.detect_lang()
-                self.filter_page_content(pc)
+                parse = self.fetch_parse(pc.page_title)
+                pc.set_parse_result(parse)
+                if not (stream and self.use_stream(pc.html)):
+                    self.filter_page_content(pc)
         except Exception as e:
             pc.error = self.errMsg(e)
 
         return pc
 
-    def get_frame(self, page_title: str) -> str:
+    def fetch_parse(self, page_title: str) -> dict:
+        """
+        fetch the rendered html, wiki markup, revision id and display title
+        of the given page with a single action=parse api call
+
+        Args:
+            page_title(str): the title of the page
+
+        Returns:
+            dict: the "parse" part of the api result
+        """
+        result = self.wiki.getSite().api(
+            "parse",
+            page=page_title,
+            prop="text|wikitext|revid|displaytitle",
+        )
+        parse = result["parse"]
+        return parse
+
+    def get_frame(self, page_title: str, markup: str = None) -> str:
         """
         get the frame property for the given page_title
+
+        Args:
+            page_title(str): the title of the page
+            markup(str): the already fetched markup of the page - fetched if None
+
+        Returns:
+            str: the frame e.g. reveal or None
+        """
+        if markup is None:
+            markup = self.wiki.get_wiki_markup(page_title)
+        frame = self.frame_of_markup(markup)
+        return frame
+
+    @staticmethod
+    def frame_of_markup(markup: str) -> str:
+        """
+        get the frame property from the given wiki markup
+
+        Args:
+            markup(str): the wiki markup
+
+        Returns:
+            str: the frame e.g. reveal or None
         """
         frame = None
-        markup = self.wiki.get_wiki_markup(page_title)
         # {{#set:frame=reveal}}
         # {{UseFrame|Contact.rythm|
         patterns = [
@@ -239,49 +636,237 @@ class WikiFrontend(MediaWikiHtmlFilter):
         ]
 
         for pattern in patterns:
-            match = re.search(pattern, markup)
+            match = re.search(pattern, markup or "")
             if match:
                 frame = match.group(1)
         return frame
 
-    def get_path_response(self, path: str) -> Response:
+    def get_slides(self, pc: PageContent) -> str:
         """
-        get the repsonse for the the given path
+        get the reveal.js slideshow html for the given page content
+        - cached per revision and filter context so that large decks
+        are only sectioned once
+
+        Args:
+            pc(PageContent): the filtered content of a slideshow page
+
+        Returns:
+            str: the html of the slideshow
+        """
+        slides_html = None
+        cache_key = None
+        if pc.revid:
+            cache_key = (
+                self.normalize_title(pc.page_title),
+                pc.revid,
+                self.filter_context(pc.lang),
+            )
+            slides_html = self.slide_cache.get(cache_key)
+        if slides_html is None:
+            pc.content = self.toReveal(pc.content)
+            slides_html = self.wrapWithReveal(pc.content)
+            if cache_key is not None:
+                self.slide_cache.put(cache_key, slides_html)
+        return slides_html
+
+    def render_page(
+        self, path: str, lang: str = "en", stream: bool = False
+    ) -> RenderedPage:
+        """
+        render the page for the given path by fetching, filtering and framing it
 
         Args:
             path(str): the path to render the content for
+            lang(str): the language of the frame
+            stream(bool): if True pages of at least my stream_threshold are
+                filtered and framed chunk by chunk while they are sent
 
         Returns:
-            Response: a FastAPI response
+            RenderedPage: the rendered page - with status code 404 on errors
         """
-        if self.needsProxy(path):
-            html_response = self.proxy(path)
-            # Create a FastAPI response object
-            response = Response(
-                content=html_response.content,
-                status_code=html_response.status_code,
-                headers=dict(html_response.headers),
+        pc = self.getContent(path, stream=stream)
+        html_frame = HtmlFrame(self, title=pc.page_title, lang=lang)
+        if pc.error:
+            rendered = RenderedPage(
+                page_title=pc.page_title,
+                body=f"Page not found: {path}".encode("utf-8"),
+                status_code=404,
             )
+            self.log(f"error getting {pc.page_title} for {self.name}:<br>{pc.error}")
         else:
-            pc = self.getContent(path)
-            html_frame = HtmlFrame(self, title=pc.page_title)
-            if pc.error:
-                response = Response(
-                    content=f"Page not found: {path}",
-                    status_code=404,
-                    media_type="text/html",
-                )
-                self.log(
-                    f"error getting {pc.page_title} for {self.name}:<br>{pc.error}"
+            slideshow = "<slideshow" in pc.html or "&lt;slideshow" in pc.html
+            if pc.content is None and slideshow:
+                # slides are built from the complete content
+                self.filter_page_content(pc)
+            if pc.content is None:
+                # filtered and framed chunk by chunk - each response streams anew
+                rendered = RenderedPage(
+                    page_title=pc.page_title,
+                    body=b"",
+                    revid=pc.revid,
+                    stream=lambda: html_frame.frame_stream(
+                        self.filter_stream(iter_chunks(pc.html), pc.lang)
+                    ),
                 )
             else:
-                if "<slideshow" in pc.html or "&lt;slideshow" in pc.html:
+                if slideshow:
                     # reveal.js slideshow: convert content to slides, wrap with reveal
-                    pc.content = self.toReveal(pc.content)
-                    framed_html = self.wrapWithReveal(pc.content)
+                    framed_html = self.get_slides(pc)
                 else:
                     framed_html = html_frame.frame(pc.content)
-                response = HTMLResponse(framed_html)
+                rendered = RenderedPage(
+                    page_title=pc.page_title,
+                    body=framed_html.encode("utf-8"),
+                    revid=pc.revid,
+                )
+        return rendered
+
+    def get_page_response(
+        self, path: str, lang: str = "en", request_headers=None
+    ) -> Response:
+        """
+        get the response for the given page path from my page cache
+        rendering and caching it on a miss
+
+        Args:
+            path(str): the path of the page
+            lang(str): the language of the frame
+            request_headers: the headers of the client request - cached pages
+                matching If-None-Match or If-Modified-Since get a 304
+
+        Returns:
+            Response: a FastAPI response
+        """
+        page_title, error = self.get_page_title(path)
+        if error:
+            rendered = self.render_page(path, lang)
+        else:
+            cache_key = self.get_cache_key(page_title, lang)
+            entry = self.page_cache.get_entry(cache_key)
+            if entry is None:
+                # concurrent misses for the same page share a single rendering
+                rendered = self.single_flight.do(
+                    cache_key, self.render_and_cache, path, lang, cache_key
+                )
+            else:
+                rendered = entry.value
+                if entry.is_expired(time.time()):
+                    # stale while revalidate
+                    self.revalidate(path, lang, cache_key)
+        response = rendered.as_response(request_headers)
+        return response
+
+    def revalidate(self, path: str, lang: str, cache_key: Tuple[str, str, str, str]):
+        """
+        refresh the stale page with the given cache key in the background
+        unless a rendering of it is already in flight or failed less than
+        revalidate_backoff seconds ago
+
+        Args:
+            path(str): the path of the page
+            lang(str): the language of the frame
+            cache_key(tuple): the page cache key
+        """
+        if cache_key in self.render_failures:
+            # the wiki failed recently - keep serving the stale page
+            return
+        if not self.single_flight.in_flight(cache_key):
+            self.revalidate_executor.submit(
+                self.revalidate_in_background, path, lang, cache_key
+            )
+
+    def revalidate_in_background(
+        self, path: str, lang: str, cache_key: Tuple[str, str, str, str]
+    ):
+        """
+        refresh the page with the given cache key - recording failures
+        """
+        try:
+            self.single_flight.do(
+                cache_key, self.render_and_cache, path, lang, cache_key
+            )
+        except Exception as ex:
+            self.record_render_failure(cache_key)
+            self.logger.warning(f"{self.name}: revalidating {path} failed: {ex}")
+
+    def record_render_failure(self, cache_key: Tuple[str, str, str, str]):
+        """
+        record a failed rendering of the page with the given cache key so that
+        it is not revalidated again during the backoff - only pages with a
+        copy that may be served stale are recorded e.g. not missing pages
+
+        Args:
+            cache_key(tuple): the page cache key
+        """
+        if (
+            self.cache_config.revalidate_backoff
+            and self.page_cache.peek(cache_key, allow_stale=True) is not None
+        ):
+            self.render_failures.put(cache_key, time.time())
+
+    def render_and_cache(
+        self, path: str, lang: str, cache_key: Tuple[str, str, str, str]
+    ) -> RenderedPage:
+        """
+        render the page for the given path and put it into my page cache
+        unless the page has been invalidated while it was rendered
+
+        Args:
+            path(str): the path of the page
+            lang(str): the language of the frame
+            cache_key(tuple): the page cache key
+
+        Returns:
+            RenderedPage: the rendered page - or the last good copy
+            if rendering failed and the cached page may still be served stale
+            - streamed pages are not cached
+        """
+        # a previous leader might have just cached the page
+        rendered = self.page_cache.peek(cache_key)
+        if rendered is None:
+            generation = self.invalidation_generation(cache_key[1])
+            render_time = time.time()
+            rendered = self.render_page(path, lang, stream=True)
+            if rendered.stream is not None:
+                # too large to be cached - drop an outdated copy
+                self.page_cache.invalidate(cache_key)
+                self.render_failures.invalidate(cache_key)
+            elif rendered.status_code == 200:
+                # the render time avoids a further api call for the revision time
+                rendered.set_validators(render_time)
+                rendered.compress()
+                if self.invalidation_generation(cache_key[1]) == generation:
+                    self.page_cache.put(cache_key, rendered)
+                else:
+                    # the page changed while it was rendered - the result
+                    # might show the old revision
+                    self.log(f"not caching {rendered.page_title} - invalidated")
+                self.render_failures.invalidate(cache_key)
+            else:
+                stale = self.page_cache.peek(cache_key, allow_stale=True)
+                if stale is not None:
+                    self.record_render_failure(cache_key)
+                    self.logger.warning(
+                        f"{self.name}: serving stale {rendered.page_title} - rendering failed"
+                    )
+                    rendered = stale
+        return rendered
+
+    def get_path_response(self, path: str, request_headers=None) -> Response:
+        """
+        get the repsonse for the the given path
+
+        Args:
+            path(str): the path to render the content for
+            request_headers: the optional headers of the client request
+
+        Returns:
+            Response: a FastAPI response
+        """
+        if self.needsProxy(path):
+            response = self.proxy_response(path, request_headers)
+        else:
+            response = self.get_page_response(path, request_headers=request_headers)
         return response
 
 
@@ -290,11 +875,26 @@ class WikiFrontends:
     wiki frontends
     """
 
-    def __init__(self, servers):
+    def __init__(
+        self,
+        servers,
+        cache_config: PageCacheConfig = None,
+        http_config: HttpSessionConfig = None,
+        filter_keys: Dict[str, List[str]] = None,
+    ):
         """
         constructor
+
+        Args:
+            servers: the servers with the frontends to serve
+            cache_config(PageCacheConfig): the page cache configuration for all frontends
+            http_config(HttpSessionConfig): the proxy session configuration for all frontends
+            filter_keys(dict): the html filter keys by frontend name - "*" for all others
         """
         self.servers = servers
+        self.cache_config = cache_config
+        self.http_config = http_config
+        self.filter_keys = filter_keys or {}
         self.wiki_frontends = {}
 
     def get_sites(self, args, sites: List[str]) -> List[str]:
@@ -332,6 +932,48 @@ class WikiFrontends:
 
         return parsed_sites
 
+    @staticmethod
+    def parse_filter_keys(specs: List[str]) -> Dict[str, List[str]]:
+        """
+        parse filter key specifications of the command line
+
+        Args:
+            specs(list): specifications like "www=editsection,-comments"
+                or "editsection,parser-output" for all frontends
+
+        Returns:
+            dict: the filter keys by frontend name - "*" for all others
+        """
+        filter_keys = {}
+        for spec in specs or []:
+            name, _, keys = spec.rpartition("=")
+            filter_keys[name or "*"] = [key for key in keys.split(",") if key]
+        return filter_keys
+
+    def configure(self, args, server=None) -> List[str]:
+        """
+        configure the page caches, proxy sessions, html filters and resources
+        of my frontends from the given command line arguments - shared by
+        the webserver and the static export
+
+        Args:
+            args: the parsed command line arguments
+            server: the server whose frontends are the default sites
+
+        Returns:
+            list: the names of the sites selected by the arguments
+        """
+        self.cache_config = PageCacheConfig.of_args(args)
+        self.http_config = HttpSessionConfig.of_args(args)
+        self.filter_keys = self.parse_filter_keys(getattr(args, "filter_keys", None))
+        if getattr(args, "minify_resources", False):
+            HtmlFrame.configure_resource_loader(minify=True)
+        sites = []
+        if server and server.frontends:
+            sites = [frontend.name for frontend in server.frontends.values()]
+        sites = self.get_sites(args, sites)
+        return sites
+
     def enableSites(self, siteNames):
         """
         enable the sites given in the sites list
@@ -355,8 +997,76 @@ class WikiFrontends:
         # Create new frontend if not cached
         frontend = self.servers.frontends_by_name.get(name)
         if frontend:
-            wiki_frontend = WikiFrontend(frontend)
+            wiki_frontend = WikiFrontend(
+                frontend,
+                filterKeys=self.filter_keys.get(name, self.filter_keys.get("*")),
+                cache_config=self.cache_config,
+                http_config=self.http_config,
+            )
             wiki_frontend.open()
             # Cache it
             self.wiki_frontends[name] = wiki_frontend
             return wiki_frontend
+
+    def cache_stats(self) -> Dict[str, CacheStats]:
+        """
+        get the page cache statistics of all my frontends
+
+        Returns:
+            dict: the cache statistics by frontend name
+        """
+        stats = {
+            name: wiki_frontend.page_cache.stats
+            for name, wiki_frontend in self.wiki_frontends.items()
+        }
+        return stats
+
+    def filter_stats(self) -> Dict[str, Dict[str, StageStats]]:
+        """
+        get the html filter stage statistics of all my frontends
+
+        Returns:
+            dict: the StageStats by stage key by frontend name
+        """
+        stats = {
+            name: wiki_frontend.stage_stats()
+            for name, wiki_frontend in self.wiki_frontends.items()
+        }
+        return stats
+
+    def prewarm(
+        self,
+        max_workers: int = 4,
+        top_n: int = 0,
+        clickstream_path: Optional[str] = None,
+        show_progress: bool = True,
+    ) -> List[CachePrewarmer]:
+        """
+        start prewarming the page caches of all my frontends in the background
+
+        Args:
+            max_workers(int): the maximum number of concurrent renderings per frontend
+            top_n(int): the number of most visited pages to prewarm from the clickstream logs
+            clickstream_path(str): the directory of the clickstream logs
+            show_progress(bool): if True show progress bars
+
+        Returns:
+            list: the started prewarmers
+        """
+        manager = None
+        if top_n and clickstream_path:
+            # the logs are loaded by the first background prewarmer
+            # so that parsing them does not block the server start
+            manager = ClickstreamManager(clickstream_path, show_progress=show_progress)
+        prewarmers = []
+        for wiki_frontend in self.wiki_frontends.values():
+            prewarmer = CachePrewarmer(
+                wiki_frontend,
+                max_workers=max_workers,
+                show_progress=show_progress,
+                clickstream_manager=manager,
+                top_n=top_n,
+            )
+            prewarmer.start()
+            prewarmers.append(prewarmer)
+        return prewarmers
@@ -0,0 +1,159 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+
+fakes and fixtures shared by the tests
+"""
+
+from types import SimpleNamespace
+
+from mwstools_backend.site import FrontendSite
+
+from frontend.forms.form_field import FormDefinition, FormField, FormLabel
+from frontend.page_cache import RenderedPage
+from frontend.wikicms import WikiFrontend
+
+
+def make_contact_form() -> FormDefinition:
+    """
+    Build the Contact demo form definition in Python using i18n dicts and
+    WTForms validator descriptors.
+    """
+    return FormDefinition(
+        name="contact",
+        legend={
+            "en": "Contact us",
+            "de": "Kontaktieren Sie uns",
+            "fr": "Contactez-nous",
+        },
+        fields=[
+            FormField(
+                name="name",
+                field_type="text",
+                label=FormLabel(text={"en": "Name", "de": "Name", "fr": "Nom"}),
+                placeholder={"en": "Your name", "de": "Ihr Name", "fr": "Votre nom"},
+                glyphicon="user",
+                required=True,
+                error_msg={
+                    "en": "Please enter your name.",
+                    "de": "Bitte geben Sie Ihren Namen ein.",
+                    "fr": "Veuillez saisir votre nom.",
+                },
+                validators=[
+                    {"type": "DataRequired"},
+                    {"type": "Length", "min": 2, "max": 100},
+                ],
+            ),
+            FormField(
+                name="email",
+                field_type="text",
+                label=FormLabel(text={"en": "E-Mail", "de": "E-Mail"}),
+                placeholder={
+                    "en": "Your e-mail address",
+                    "de": "Ihre E-Mail-Adresse",
+                },
+                glyphicon="envelope",
+                required=True,
+                error_msg={
+                    "en": "Please enter a valid e-mail address.",
+                    "de": "Bitte geben Sie eine gültige E-Mail-Adresse ein.",
+                },
+                validators=[
+                    {"type": "DataRequired"},
+                    {"type": "Email"},
+                ],
+            ),
+            FormField(
+                name="message",
+                field_type="textarea",
+                label=FormLabel(
+                    text={"en": "Message", "de": "Nachricht", "fr": "Message"}
+                ),
+                placeholder={"en": "Your message", "de": "Ihre Nachricht"},
+                glyphicon="pencil",
+                required=True,
+                error_msg={
+                    "en": "Please enter a message.",
+                    "de": "Bitte geben Sie eine Nachricht ein.",
+                },
+                validators=[
+                    {"type": "DataRequired"},
+                    {"type": "Length", "min": 10, "max": 2000},
+                ],
+            ),
+            FormField(
+                name="postToken",
+                field_type="hidden",
+                value="dummy-token",
+            ),
+        ],
+        submit_label={"en": "Send", "de": "Absenden", "fr": "Envoyer"},
+        submit_glyphicon="send",
+        success_message={
+            "en": "Thank you for your message!",
+            "de": "Vielen Dank für Ihre Nachricht!",
+        },
+    )
+
+
+class CountingFrontend(WikiFrontend):
+    """
+    a WikiFrontend that renders pages locally and counts the renderings
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(FrontendSite(name="www", wikiId="wiki"), **kwargs)
+        self.render_count = 0
+        self.failing = False
+
+    def render_page(
+        self, path: str, lang: str = "en", stream: bool = False
+    ) -> RenderedPage:
+        self.render_count += 1
+        page_title, _error = self.get_page_title(path)
+        if self.failing:
+            rendered = RenderedPage(
+                page_title=page_title, body=b"Page not found", status_code=404
+            )
+        else:
+            rendered = RenderedPage(
+                page_title=page_title, body=f"<p>{page_title}</p>".encode("utf-8")
+            )
+        return rendered
+
+
+class FakeUpstream:
+    """
+    a streamed response of the wiki that records how it was consumed
+    """
+
+    def __init__(self, body: bytes, status_code: int = 200, headers=None):
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.chunk_sizes = []
+        self.closed = False
+        self.raw = SimpleNamespace(stream=self.stream)
+
+    def stream(self, chunk_size: int, decode_content: bool = True):
+        for start in range(0, len(self.body), chunk_size):
+            self.chunk_sizes.append(chunk_size)
+            yield self.body[start : start + chunk_size]
+
+    def iter_content(self, chunk_size: int = 1):
+        yield from self.stream(chunk_size)
+
+    def close(self):
+        self.closed = True
+
+
+def get_proxy_frontend() -> CountingFrontend:
+    """
+    get a frontend proxying https://wiki.bitplan.com
+    """
+    frontend = CountingFrontend()
+    frontend.wiki = SimpleNamespace(
+        wikiUser=SimpleNamespace(url="https://wiki.bitplan.com", scriptPath="")
+    )
+    return frontend
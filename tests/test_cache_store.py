@@ -0,0 +1,131 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import tempfile
+import threading
+
+from basemkit.basetest import Basetest
+
+from frontend.cache_store import SqliteCacheStore
+from frontend.page_cache import PageCache, RenderedPage
+
+
+class TestCacheStore(Basetest):
+    """
+    test the persistent cache tier
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        Basetest.tearDown(self)
+
+    def get_cache(self) -> PageCache:
+        """
+        get a page cache backed by a store in my temporary directory
+        """
+        cache = PageCache(ttl=None)
+        store = SqliteCacheStore.of_cache_dir(self.tmp_dir.name, "www")
+        cache.attach_store(store)
+        return cache
+
+    def test_survives_restart(self):
+        """
+        test that cached pages are available after a restart
+        """
+        key = ("www", "Joker", "en")
+        page = RenderedPage(page_title="Joker", body=b"<p>Joker</p>", revid=42)
+        cache = self.get_cache()
+        cache.put(key, page)
+        cache.put(("www", "Sharks", "en"), b"sharks")
+        cache.store.close()
+        # "restart" with an empty memory tier
+        restarted = self.get_cache()
+        self.assertEqual(2, len(restarted.store))
+        cached = restarted.get(key)
+        self.assertEqual(page, cached)
+        self.assertEqual(1, restarted.stats.store_hits)
+        # the second access is served from memory
+        restarted.get(key)
+        self.assertEqual(1, restarted.stats.store_hits)
+        self.assertEqual(2, restarted.stats.hits)
+
+    def test_invalidation(self):
+        """
+        test that invalidation reaches the persistent tier
+        """
+        cache = self.get_cache()
+        for title in ["Joker", "Sharks", "Welcome"]:
+            cache.put(("www", title, "en"), title.encode())
+        self.assertTrue(cache.invalidate(("www", "Joker", "en")))
+        count = cache.invalidate_where(lambda key: key[1] == "Sharks")
+        self.assertEqual(1, count)
+        self.assertEqual([("www", "Welcome", "en")], cache.store.keys())
+        cache.clear()
+        self.assertEqual(0, len(cache.store))
+
+    def test_expired_entries_are_purged(self):
+        """
+        test that entries that may not be served anymore are purged on attach
+        """
+        cache = self.get_cache()
+        cache.put("old", b"old", ttl=-1)
+        cache.put("new", b"new")
+        cache.store.close()
+        restarted = self.get_cache()
+        self.assertEqual(["new"], restarted.store.keys())
+
+    def test_byte_budget(self):
+        """
+        test the running byte total and the eviction of the oldest entries
+        """
+        store = SqliteCacheStore.of_cache_dir(self.tmp_dir.name, "www", max_bytes=10)
+        cache = PageCache(ttl=None)
+        cache.attach_store(store)
+        for key in ["a", "b", "c"]:
+            cache.put(key, key.encode() * 4)
+        self.assertEqual(["b", "c"], sorted(store.keys()))
+        self.assertEqual(8, store.size)
+        # replacing an entry does not count it twice
+        cache.put("c", b"cccc")
+        self.assertEqual(8, store.size)
+        store.delete_where(lambda key: key == "b")
+        self.assertEqual(4, store.size)
+        store.close()
+        self.assertEqual(4, self.get_cache().store.size)
+
+    def test_memory_hits_do_not_wait_for_the_store(self):
+        """
+        test that memory hits are served while the store is busy
+        """
+        cache = self.get_cache()
+        cache.put("hit", "cached")
+        store_get = cache.store.get
+        in_store = threading.Event()
+        release = threading.Event()
+
+        def slow_get(key):
+            in_store.set()
+            release.wait(5)
+            return store_get(key)
+
+        cache.store.get = slow_get
+        miss = threading.Thread(target=cache.get, args=("miss",))
+        miss.start()
+        try:
+            self.assertTrue(in_store.wait(5))
+            # the miss is waiting for the store - the lock is free
+            self.assertTrue(cache._lock.acquire(timeout=1))
+            cache._lock.release()
+            self.assertEqual("cached", cache.get("hit"))
+        finally:
+            release.set()
+            miss.join()
+        self.assertEqual(1, cache.stats.misses)
+        cache.store.close()
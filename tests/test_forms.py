@@ -17,8 +17,13 @@ from frontend.forms.form_field import (
 from frontend.forms.handler import FormHandler
 from frontend.forms.registry import FormRegistry
 from frontend.forms.renderer import FormRenderer
-from frontend.forms.validators import build_wtforms_validators, validate_with_wtforms
+from frontend.forms.validators import (
+    build_wtforms_validators,
+    get_wtforms_validators,
+    validate_with_wtforms,
+)
 from frontend.htmlfilter import MediaWikiHtmlFilter, PageContent
+from tests.fakes import make_contact_form
 
 # Path to the built-in contact.yaml shipped with the package
 _CONTACT_YAML = (
@@ -26,88 +31,114 @@ _CONTACT_YAML = (
 )
 
 
-def make_contact_form() -> FormDefinition:
+def make_order_form() -> FormDefinition:
     """
-    Build the Contact demo form definition in Python using i18n dicts and
-    WTForms validator descriptors.
+    Build a small order form with a select field and a hidden default value.
     """
     return FormDefinition(
-        name="contact",
-        legend={
-            "en": "Contact us",
-            "de": "Kontaktieren Sie uns",
-            "fr": "Contactez-nous",
-        },
+        name="order",
+        legend={"en": "Order", "de": "Bestellung"},
         fields=[
+            FormField(name="name", label=FormLabel(text={"en": "Name"}), required=True),
             FormField(
-                name="name",
-                field_type="text",
-                label=FormLabel(text={"en": "Name", "de": "Name", "fr": "Nom"}),
-                placeholder={"en": "Your name", "de": "Ihr Name", "fr": "Votre nom"},
-                glyphicon="user",
-                required=True,
-                error_msg={
-                    "en": "Please enter your name.",
-                    "de": "Bitte geben Sie Ihren Namen ein.",
-                    "fr": "Veuillez saisir votre nom.",
-                },
-                validators=[
-                    {"type": "DataRequired"},
-                    {"type": "Length", "min": 2, "max": 100},
-                ],
-            ),
-            FormField(
-                name="email",
-                field_type="text",
-                label=FormLabel(text={"en": "E-Mail", "de": "E-Mail"}),
-                placeholder={
-                    "en": "Your e-mail address",
-                    "de": "Ihre E-Mail-Adresse",
-                },
-                glyphicon="envelope",
-                required=True,
-                error_msg={
-                    "en": "Please enter a valid e-mail address.",
-                    "de": "Bitte geben Sie eine gültige E-Mail-Adresse ein.",
-                },
-                validators=[
-                    {"type": "DataRequired"},
-                    {"type": "Email"},
-                ],
-            ),
-            FormField(
-                name="message",
-                field_type="textarea",
-                label=FormLabel(
-                    text={"en": "Message", "de": "Nachricht", "fr": "Message"}
-                ),
-                placeholder={"en": "Your message", "de": "Ihre Nachricht"},
-                glyphicon="pencil",
-                required=True,
-                error_msg={
-                    "en": "Please enter a message.",
-                    "de": "Bitte geben Sie eine Nachricht ein.",
-                },
-                validators=[
-                    {"type": "DataRequired"},
-                    {"type": "Length", "min": 10, "max": 2000},
-                ],
-            ),
-            FormField(
-                name="postToken",
-                field_type="hidden",
-                value="dummy-token",
+                name="size",
+                field_type="select",
+                label=FormLabel(text={"en": "Size"}),
+                choices=["S", "M", "L"],
+                placeholder_choice={"en": "Please choose"},
             ),
+            FormField(name="token", field_type="hidden", value="default-token"),
         ],
-        submit_label={"en": "Send", "de": "Absenden", "fr": "Envoyer"},
-        submit_glyphicon="send",
-        success_message={
-            "en": "Thank you for your message!",
-            "de": "Vielen Dank für Ihre Nachricht!",
-        },
+        submit_label={"en": "Order"},
     )
 
 
+# the expected html of the blank order form
+_ORDER_BLANK_HTML = "\n".join(
+    [
+        '  <form class="form-horizontal" action="" method="post">',
+        "    <fieldset>",
+        "    <!-- Form Name -->",
+        "    <legend>Order</legend>",
+        '        <div class="form-group">',
+        '          <label class="col-md-3 control-label">Name</label>  ',
+        '          <div class="col-md-6 inputGroupContainer">',
+        '            <div class="input-group">',
+        '              <input type="text" name="name" id="name" placeholder="" class="form-control" value="">',
+        "            </div>",
+        "          </div>",
+        "        </div>",
+        '        <div class="form-group">',
+        '          <label class="col-md-3 control-label">Size</label>  ',
+        '          <div class="col-md-6 inputGroupContainer">',
+        '            <div class="input-group">',
+        '              <select name="size" id="size" class="form-control selectpicker">',
+        '              <option value=" " selected>Please choose</option>',
+        "              <option>S</option>",
+        "              <option>M</option>",
+        "              <option>L</option>",
+        "              </select>",
+        "            </div>",
+        "          </div>",
+        "        </div>",
+        '        <input type="hidden" name="token" id="token" value="default-token">',
+        "        <!-- Button -->",
+        '        <div class="form-group">',
+        '          <label class="col-md-4 control-label"></label>',
+        '          <div class="col-md-4">',
+        '            <button type="submit">Order</button>',
+        "          </div>",
+        "        </div>",
+        "    </fieldset>",
+        "  </form>",
+        "",
+    ]
+)
+
+# the expected html of the order form with a value, an error and a selection
+_ORDER_FILLED_HTML = "\n".join(
+    [
+        '  <form class="form-horizontal" action="" method="post">',
+        "    <fieldset>",
+        "    <!-- Form Name -->",
+        "    <legend>Order</legend>",
+        '        <div class="form-group">',
+        '          <label class="col-md-3 control-label">Name</label>  ',
+        '          <div class="col-md-6 inputGroupContainer">',
+        '            <div class="input-group">',
+        '              <input type="text" name="name" id="name" placeholder="" class="form-control" value="&lt;b&gt;Bob&lt;/b&gt;">',
+        "            </div>",
+        "          </div>",
+        '          <small class="help-block" data-bv-validator="notEmpty">Too short &amp; bold</small>',
+        "        </div>",
+        '        <div class="form-group">',
+        '          <label class="col-md-3 control-label">Size</label>  ',
+        '          <div class="col-md-6 inputGroupContainer">',
+        '            <div class="input-group">',
+        '              <select name="size" id="size" class="form-control selectpicker">',
+        '              <option value=" ">Please choose</option>',
+        "              <option>S</option>",
+        "              <option selected>M</option>",
+        "              <option>L</option>",
+        "              </select>",
+        "            </div>",
+        "          </div>",
+        "        </div>",
+        '        <input type="hidden" name="token" id="token" value="default-token">',
+        "        <!-- Button -->",
+        '        <div class="form-group">',
+        '          <label class="col-md-4 control-label"></label>',
+        '          <div class="col-md-4">',
+        '            <button type="submit">Order</button>',
+        "          </div>",
+        "        </div>",
+        "    </fieldset>",
+        "  </form>",
+        "",
+    ]
+)
+
+
 class TestForms(Basetest):
     """
     Tests for the frontend/forms subpackage.
@@ -168,6 +199,49 @@ class TestForms(Basetest):
         self.assertEqual(retrieved.name, "contact")
         self.assertIsNone(FormRegistry.get("nonexistent"))
 
+    def test_registry_render_blank_cached(self):
+        """
+        Test that blank forms are rendered once per name, lang and version.
+        """
+        form_def = make_order_form()
+        FormRegistry.register(form_def)
+        html_en = FormRegistry.render_blank("order", "en")
+        self.assertEqual(_ORDER_BLANK_HTML, html_en)
+        self.assertIs(html_en, FormRegistry.render_blank("order", "en"))
+        html_de = FormRegistry.render_blank("order", "de")
+        self.assertEqual(
+            _ORDER_BLANK_HTML.replace("<legend>Order", "<legend>Bestellung"), html_de
+        )
+        self.assertIsNone(FormRegistry.render_blank("nonexistent"))
+        # registering a definition invalidates the cache
+        form_def.legend = {"en": "Write to us"}
+        FormRegistry.register(form_def)
+        html_en2 = FormRegistry.render_blank("order", "en")
+        self.assertEqual(
+            _ORDER_BLANK_HTML.replace("<legend>Order", "<legend>Write to us"), html_en2
+        )
+
+    def test_compiled_form_rerender(self):
+        """
+        Test that a compiled form re-renders values, errors and selections.
+        """
+        form_def = make_order_form()
+        FormRegistry.register(form_def)
+        compiled = FormRegistry.compiled("order", "en")
+        self.assertIs(compiled, FormRegistry.compiled("order", "en"))
+        self.assertIsNone(FormRegistry.compiled("nonexistent"))
+        values = {"name": "<b>Bob</b>", "size": "M"}
+        errors = {"name": ["Too short & bold"]}
+        self.assertEqual(_ORDER_FILLED_HTML, compiled.render(values, errors))
+        self.assertEqual(
+            _ORDER_FILLED_HTML,
+            FormRenderer().render(form_def, values=values, errors=errors, lang="en"),
+        )
+        self.assertEqual(_ORDER_BLANK_HTML, compiled.render())
+        # the static fragments are merged between the slots
+        slots = [f for f in compiled.fragments if not isinstance(f, str)]
+        self.assertEqual(len(compiled.fragments), 2 * len(slots) + 1)
+
     def test_registry_loads_builtin_contact(self):
         """
         Test that the registry auto-loads the built-in contact.yaml.
@@ -223,6 +297,40 @@ class TestForms(Basetest):
         self.assertEqual(validators[1].min, 2)
         self.assertEqual(validators[1].max, 100)
 
+    def test_validator_chains_cached(self):
+        """
+        Test that validator chains of registered forms are built once per
+        form name, field name and lang and rebuilt when the registry changes.
+        """
+        form_def = make_contact_form()
+        FormRegistry.register(form_def)
+        name_field = form_def.fields[0]
+        chain = get_wtforms_validators(form_def, name_field, "en")
+        self.assertIs(chain, get_wtforms_validators(form_def, name_field, "en"))
+        self.assertIsNot(chain, get_wtforms_validators(form_def, name_field, "de"))
+        chain_count = len(FormRegistry.instance()._validator_chains)
+        # an equally named ad-hoc definition is neither cached nor kept alive
+        other_def = make_contact_form()
+        other_chain = get_wtforms_validators(other_def, other_def.fields[0], "en")
+        self.assertIsNot(chain, other_chain)
+        self.assertIsNot(
+            other_chain, get_wtforms_validators(other_def, other_def.fields[0], "en")
+        )
+        self.assertEqual(chain_count, len(FormRegistry.instance()._validator_chains))
+        # registering a definition drops the cached chains
+        FormRegistry.register(other_def)
+        self.assertEqual(0, len(FormRegistry.instance()._validator_chains))
+        other_chain = get_wtforms_validators(other_def, other_def.fields[0], "en")
+        self.assertIs(
+            other_chain, get_wtforms_validators(other_def, other_def.fields[0], "en")
+        )
+        # the chains belong to the registry instance
+        FormRegistry._instance = None
+        self.assertIsNot(chain, get_wtforms_validators(form_def, name_field, "en"))
+        errors = validate_with_wtforms(form_def, {"name": "A"}, "en")
+        self.assertIn("name", errors)
+        self.assertIn("email", errors)
+
     def test_renderer_renders_html_english(self):
         """
         Test that FormRenderer produces expected Bootstrap 3 HTML in English.
@@ -0,0 +1,210 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import tracemalloc
+from types import SimpleNamespace
+
+import lxml.html
+from basemkit.basetest import Basetest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from mwstools_backend.site import FrontendSite
+
+from frontend.forms.registry import FormRegistry
+from frontend.frame import HtmlFrame
+from frontend.html_stream import StreamingHtmlRewriter, iter_chunks
+from frontend.htmlfilter import MediaWikiHtmlFilter, PageContent
+from frontend.page_cache import PageCacheConfig
+from frontend.wikicms import WikiFrontend
+from tests.fakes import make_contact_form
+
+
+def report_page(rows: int) -> str:
+    """
+    get a generated report page with a long table, an edit section,
+    comments, empty paragraphs, media and a form
+    """
+    parts = [
+        '<div class="mw-parser-output">',
+        '<h2><span class="mw-headline" id="Report">Report</span>'
+        '<span class="mw-editsection">[<a href="/index.php?title=R&amp;action=edit">edit</a>]</span></h2>\n',
+        "<!-- NewPP limit report -->\n",
+        '<p class="mw-empty-elt">\n</p>\n\n',
+        '<div class="wikicms-form" data-form-name="contact"><p>form not rendered</p></div>\n',
+        "<table>\n",
+    ]
+    for i in range(rows):
+        parts.append(
+            f'<tr><td><a href="/index.php/Item{i}">Item {i}</a></td>'
+            f'<td><img src="/images/a/ab/I{i}.png" alt="x &lt; y"></td>'
+            f"<td>{i} &amp; {i + 1}</td></tr>\n"
+        )
+    parts.append('</table>\n<video><source src="/videos/V.mp4"></video>\n</div>')
+    html = "".join(parts)
+    return html
+
+
+class TestHtmlStream(Basetest):
+    """
+    test the streaming html rewriter
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        if FormRegistry.get("contact") is None:
+            FormRegistry.register(make_contact_form())
+
+    def test_same_as_tree_filter(self):
+        """
+        test that the streamed result equals the tree based filter
+        for any chunking of the input
+        """
+        html = report_page(50)
+        mwf = MediaWikiHtmlFilter(site_name="www", memo_entries=0)
+        # lxml writes an end tag for the void source element
+        expected = mwf.filter_html(html).replace("</source>", "")
+        for chunk_size in [1, 7, 4096, len(html)]:
+            streamed = "".join(mwf.filter_stream(iter_chunks(html, chunk_size)))
+            self.assertEqual(expected, streamed, chunk_size)
+        self.assertNotIn("mw-editsection", streamed)
+        self.assertNotIn("mw-parser-output", streamed)
+        self.assertNotIn("NewPP", streamed)
+        self.assertNotIn("mw-empty-elt", streamed)
+        self.assertNotIn("form not rendered", streamed)
+        self.assertIn("<form", streamed)
+        self.assertIn('href="/www/index.php/Item3"', streamed)
+        self.assertIn('src="/www/videos/V.mp4"', streamed)
+        self.assertIn('alt="x &lt; y"', streamed)
+        self.assertEqual(4, mwf.stage_stats()["stream"].calls)
+
+    def test_implicit_end_tags(self):
+        """
+        test that implicitly closed elements and the content outside of the
+        mw-parser-output div are handled like the tree based filter does
+        """
+        html = """<p>before the wrapper</p>
+<div class="mw-parser-output"><p>intro
+<ul><li>one<li>two
+<ul><li>nested</ul><li>three</ul>
+<p>para<div>block</div>
+<dl><dt>term<dd>definition<dt>term 2</dl>
+<table><tr><td>a<td>b<tr><th>c<td>d</table>
+<p>unclosed<p>next
+</div>
+<p>after the wrapper</p>"""
+        mwf = MediaWikiHtmlFilter(site_name="www", memo_entries=0)
+        expected = mwf.filter_html(html)
+        for chunk_size in [1, 5, len(html)]:
+            streamed = "".join(mwf.filter_stream(iter_chunks(html, chunk_size)))
+            self.assertEqual(expected, streamed, chunk_size)
+        self.assertIn("<li>one</li><li>two", streamed)
+        self.assertNotIn("</li></li>", streamed)
+        self.assertNotIn("wrapper", streamed)
+        # without the parser-output stage the content around the div is kept
+        keep_all = MediaWikiHtmlFilter(
+            site_name="www", filterKeys=["-parser-output"], memo_entries=0
+        )
+        streamed = "".join(keep_all.filter_stream(iter_chunks(html, 7)))
+        self.assertEqual(keep_all.filter_html(html), streamed)
+        self.assertIn("after the wrapper", streamed)
+
+    def test_chunked_output(self):
+        """
+        test that the output flows while the input is read
+        """
+        html = report_page(2000)
+        mwf = MediaWikiHtmlFilter(site_name="www", memo_entries=0)
+        outputs = list(mwf.filter_stream(iter_chunks(html, 16 * 1024)))
+        self.assertGreater(len(outputs), len(html) // (32 * 1024))
+        tree = lxml.html.fragment_fromstring("".join(outputs), create_parent="div")
+        self.assertEqual(2000, len(tree.findall(".//tr")))
+
+    def test_bounded_memory(self):
+        """
+        test that the peak memory of streaming stays far below the page size
+        """
+        rows = 5000
+        mwf = MediaWikiHtmlFilter(site_name="www", memo_entries=0)
+        chunk_count = 0
+        total = 0
+
+        def chunks():
+            yield from iter_chunks(report_page(0)[: -len("</table>\n</div>")])
+            for i in range(rows):
+                yield f'<tr><td><a href="/index.php/Item{i}">Item {i}</a></td></tr>\n'
+            yield "</table></div>"
+
+        tracemalloc.start()
+        try:
+            for output in mwf.filter_stream(chunks()):
+                chunk_count += 1
+                total += len(output)
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        if self.debug:
+            print(f"{total} bytes in {chunk_count} chunks with peak {peak} bytes")
+        self.assertGreater(total, 250000)
+        self.assertLess(peak, total / 4)
+
+    def test_use_stream(self):
+        """
+        test that only large pages are streamed unless a stage
+        of the pipeline needs the tree - filter keeps using the tree
+        """
+        html = report_page(20)
+        mwf = MediaWikiHtmlFilter(site_name="www", stream_threshold=1000)
+        self.assertTrue(mwf.use_stream(html))
+        content = mwf.filter(PageContent(html=html)).content
+        self.assertIn('href="/www/index.php/Item3"', content)
+        self.assertIn("parse", mwf.stage_stats())
+        self.assertNotIn("stream", mwf.stage_stats())
+        self.assertTrue(StreamingHtmlRewriter.is_streamable(["fix-urls", "forms"]))
+        self.assertFalse(StreamingHtmlRewriter.is_streamable(["fix-urls", "nofollow"]))
+        small = MediaWikiHtmlFilter(site_name="www", stream_threshold=len(html) + 1)
+        self.assertFalse(small.use_stream(html))
+        # streaming is off by default
+        default = MediaWikiHtmlFilter(site_name="www")
+        self.assertIsNone(default.stream_threshold)
+        self.assertFalse(default.use_stream(html * 1000))
+
+    def test_streamed_page_response(self):
+        """
+        test that pages above the stream threshold of the cache configuration
+        are sent as a chunked response and are not cached
+        """
+        html = report_page(200)
+        args = SimpleNamespace(stream_threshold=1000)
+        frontend = WikiFrontend(
+            FrontendSite(name="www", wikiId="wiki"),
+            cache_config=PageCacheConfig.of_args(args),
+        )
+        frontend.wiki = SimpleNamespace()
+        frontend.fetch_parse = lambda page_title: {
+            "text": {"*": html},
+            "wikitext": {"*": "report"},
+            "revid": 1,
+        }
+        response = frontend.get_page_response("/Report")
+        self.assertIsInstance(response, StreamingResponse)
+        app = FastAPI()
+
+        @app.get("/www/{page_path:path}")
+        def render_path(page_path: str):
+            return frontend.get_page_response(f"/{page_path}")
+
+        client = TestClient(app)
+        for _i in range(2):
+            response = client.get("/www/Report")
+            self.assertEqual(200, response.status_code)
+            self.assertNotIn("content-length", response.headers)
+            content = frontend.filter_html(html).replace("</source>", "")
+            expected = HtmlFrame(frontend, title="Report").frame(content)
+            self.assertEqual(expected, response.text)
+        self.assertEqual(0, len(frontend.page_cache))
+        self.assertIn("stream", frontend.stage_stats())
+        frontend.close()
@@ -4,15 +4,93 @@ Created on 2026-03-30
 @author: wf
 """
 
+import os
+import re
+import time
+import unittest
+
+import lxml.html
 from basemkit.basetest import Basetest
+from bs4 import BeautifulSoup, Comment
+
+from frontend.forms.registry import FormRegistry
+from frontend.htmlfilter import MediaWikiHtmlFilter, PageContent
+from frontend.wikicms import WikiFrontends
+from tests.fakes import CountingFrontend, make_contact_form
+
+
+class SoupHtmlFilter(MediaWikiHtmlFilter):
+    """
+    the former BeautifulSoup pipeline that parses and serializes the
+    html several times - the reference for the single parse filter
+    """
+
+    def filter_soup(self, pc: PageContent) -> PageContent:
+        """
+        filter the given page content with the BeautifulSoup pipeline
+        """
+        soup = self.soup_filter(pc.html, self.filterKeys)
+        soup = self.fix_soup(soup)
+        filtered_html = self.unwrap(soup)
+        filtered_html = self.replace_form_divs(filtered_html, pc.lang)
+        pc.content = filtered_html
+        return pc
 
-from frontend.htmlfilter import MediaWikiHtmlFilter
+    def soup_filter(self, html: str, filterKeys) -> BeautifulSoup:
+        """
+        parse the html with BeautifulSoup and apply the structural filters
+        """
+        soup = BeautifulSoup(html, self.parser)
+        if "parser-output" in filterKeys:
+            parserdiv = soup.find("div", {"class": "mw-parser-output"})
+            if parserdiv:
+                inner_html = parserdiv.decode_contents()
+                soup = BeautifulSoup(inner_html, self.parser)
+        if "editsection" in filterKeys:
+            for s in soup.select("span.mw-editsection"):
+                s.extract()
+        for comments in soup.find_all(string=lambda text: isinstance(text, Comment)):
+            comments.extract()
+        return soup
+
+    def fix_soup(self, soup) -> BeautifulSoup:
+        """
+        fix the image, video and link paths in the given soup
+        """
+        for img in soup.findAll("img"):
+            self.fixNode(img, "src", "/")
+            self.fixNode(img, "srcset", "/", ", ")
+        for video in soup.findAll("video"):
+            for source in video.findAll("source"):
+                self.fixNode(source, "src", "/")
+        for a in soup.findAll("a"):
+            self.fixNode(a, "href", "/")
+        return soup
+
+    def replace_form_divs(self, html: str, lang: str = "en") -> str:
+        """
+        replace the wikicms-form divs with the rendered forms
+        """
+
+        def replace_match(m: re.Match) -> str:
+            replacement = self.form_registry.render_blank(m.group(1), lang)
+            if replacement is None:
+                replacement = m.group(0)
+            return replacement
+
+        result = re.sub(
+            r'<div\s+class="wikicms-form"\s+data-form-name="([^"]+)"[^>]*>.*?</div>',
+            replace_match,
+            html,
+            flags=re.DOTALL,
+        )
+        return result
 
 
 class TestHtmlFilter(Basetest):
     """
     test MediaWiki HTML filter
-    2 tests in 0.07 secs
+    9 tests in 0.6 secs
     """
 
     def setUp(self, debug=False, profile=True):
@@ -60,3 +138,258 @@ class TestHtmlFilter(Basetest):
         # filtered content has no editsection
         self.assertNotIn("mw-editsection", pc.content)
         self.assertIn("Ankunft", pc.content)
+
+    def test_set_parse_result(self):
+        """
+        test taking html, markup, revision id and display title
+        from a single action=parse api result
+        """
+        parse = {
+            "title": "Willkommen",
+            "revid": 4711,
+            "displaytitle": "<i>Willkommen</i>",
+            "text": {"*": '<div class="mw-parser-output"><p>Hallo</p></div>'},
+            "wikitext": {"*": "{{Language|language=de}}\nHallo"},
+        }
+        pc = PageContent(page_title="Willkommen")
+        pc.set_parse_result(parse)
+        self.assertEqual(4711, pc.revid)
+        self.assertEqual("<i>Willkommen</i>", pc.display_title)
+        self.assertIn("Hallo", pc.html)
+        self.assertEqual("de", pc.lang)
+
+    def test_do_filter(self):
+        """
+        test the structural filters kept for compatibility
+        """
+        mwf = MediaWikiHtmlFilter(site_name="www")
+        html = (
+            '<div class="mw-parser-output"><!-- c --><span class="mw-editsection">'
+            "editsection</span><span class='image'>image section</span>"
+            '<a href="/index.php/Main">Main</a></div>'
+        )
+        filtered = mwf.doFilter(html, ["editsection", "parser-output"])
+        self.assertEqual(
+            '<span class="image">image section</span>'
+            '<a href="/index.php/Main">Main</a>',
+            filtered,
+        )
+        self.assertNotIn("<body>", mwf.doFilter(html, "mw-parser-output"))
+
+    def large_page(self, sections: int = 300) -> str:
+        """
+        get a large MediaWiki page with headings, images, links and comments
+        """
+        parts = ['<div class="mw-parser-output">']
+        for i in range(sections):
+            parts.append(
+                f'<h2><span class="mw-headline" id="S{i}">Section {i}</span>'
+                f'<span class="mw-editsection">[<a href="/index.php?title=P&amp;action=edit&amp;section={i}">edit</a>]</span></h2>\n'
+                f"<!-- comment {i} -->\n"
+                f'<p>Text with a <a href="/index.php/Page{i}">link</a> &amp; an image'
+                f'<img src="/images/thumb/a/ab/I{i}.png/200px-I{i}.png"'
+                f' srcset="/images/a/ab/I{i}.png 1.5x, /images/a/ab/I{i}.png 2x"/></p>\n'
+                f'<p class="mw-empty-elt">\n</p>\n\n'
+                f'<video><source src="/videos/V{i}.mp4"></video>\n'
+            )
+        parts.append("</div>")
+        html = "".join(parts)
+        return html
+
+    def test_single_parse_filter(self):
+        """
+        test that the single parse filter gives the same result as the
+        BeautifulSoup pipeline
+        """
+        html = self.large_page(20)
+        mwf = SoupHtmlFilter(site_name="www")
+        pc = mwf.filter(PageContent(html=html))
+        soup_pc = mwf.filter_soup(PageContent(html=html))
+        for content in [pc.content, soup_pc.content]:
+            self.assertNotIn("mw-editsection", content)
+            self.assertNotIn("mw-parser-output", content)
+            self.assertNotIn("<!--", content)
+            self.assertNotIn("mw-empty-elt", content)
+        tree = lxml.html.fragment_fromstring(pc.content, create_parent="div")
+        soup_tree = lxml.html.fragment_fromstring(soup_pc.content, create_parent="div")
+        self.assertEqual(soup_tree.text_content(), tree.text_content())
+        for xpath in ["//img/@src", "//img/@srcset", "//a/@href", "//source/@src"]:
+            self.assertEqual(soup_tree.xpath(xpath), tree.xpath(xpath), xpath)
+        self.assertIn('src="/www/images/thumb/a/ab/I0.png/200px-I0.png"', pc.content)
+        self.assertIn('href="/www/index.php/Page1"', pc.content)
+
+    @unittest.skipUnless(
+        os.environ.get("WIKICMS_BENCHMARK"), "set WIKICMS_BENCHMARK=1 for timings"
+    )
+    def test_filter_speedup(self):
+        """
+        measure the speedup of the single parse filter on a large page
+        """
+        html = self.large_page(300)
+        mwf = SoupHtmlFilter(site_name="www")
+        timings = {}
+        for name, filter_func in [
+            ("soup", mwf.filter_soup),
+            # not filter which would return memoized results
+            ("single parse", lambda pc: mwf.filter_html(pc.html, pc.lang)),
+        ]:
+            start = time.perf_counter()
+            for _i in range(3):
+                filter_func(PageContent(html=html))
+            timings[name] = (time.perf_counter() - start) / 3
+        speedup = timings["soup"] / timings["single parse"]
+        if self.debug:
+            print(f"{len(html)} bytes: {timings} speedup {speedup:.1f}x")
+        self.assertGreater(speedup, 2.0)
+
+    def test_filter_stages(self):
+        """
+        test selecting, ordering and timing the filter stages
+        """
+        registry = MediaWikiHtmlFilter.stage_registry
+        keys = [stage.key for stage in registry.pipeline(["editsection", "-comments"])]
+        self.assertEqual(["editsection", "empty-paragraphs", "fix-urls", "forms"], keys)
+        html = self.large_page(2)
+        mwf = MediaWikiHtmlFilter(filterKeys=["parser-output", "-comments"])
+        content = mwf.filter(PageContent(html=html)).content
+        self.assertIn("<!-- comment 0 -->", content)
+        self.assertIn("mw-editsection", content)
+        stats = mwf.stage_stats()
+        self.assertEqual(
+            [
+                "parse",
+                "parser-output",
+                "empty-paragraphs",
+                "fix-urls",
+                "forms",
+                "serialize",
+            ],
+            list(stats.keys()),
+        )
+        self.assertEqual(len(html), stats["parse"].in_size)
+        # the parser output div is smaller than the document
+        self.assertLess(stats["parser-output"].out_size, stats["parser-output"].in_size)
+        self.assertEqual(len(content), stats["serialize"].out_size)
+
+        # custom stages can be plugged in
+        def stage_nofollow(html_filter, context):
+            for a in context.root.iter("a"):
+                a.set("rel", "nofollow")
+
+        registry.register("nofollow", stage_nofollow, enabled_by_default=False)
+        try:
+            content = MediaWikiHtmlFilter(filterKeys=["nofollow"]).filter_html(html)
+            self.assertIn('rel="nofollow"', content)
+            content = MediaWikiHtmlFilter(filterKeys=[]).filter_html(html)
+            self.assertNotIn('rel="nofollow"', content)
+        finally:
+            registry.stages.pop("nofollow")
+        self.assertEqual(
+            {"www": ["editsection", "-comments"], "*": ["parser-output"]},
+            WikiFrontends.parse_filter_keys(
+                ["www=editsection,-comments", "parser-output"]
+            ),
+        )
+
+    def test_filter_memo(self):
+        """
+        test that identical input is filtered only once
+        """
+        html = self.large_page(2)
+        mwf = MediaWikiHtmlFilter(site_name="www", memo_entries=2)
+        content = mwf.filter(PageContent(html=html)).content
+        for _i in range(3):
+            self.assertEqual(content, mwf.filter(PageContent(html=html)).content)
+        self.assertEqual(1, mwf.stage_stats()["parse"].calls)
+        stats = mwf.filter_memo.stats
+        self.assertEqual(3, stats.hits)
+        self.assertEqual(1, stats.misses)
+        # a different language, changed forms or changed html are filtered again
+        mwf.filter(PageContent(html=html, lang="de"))
+        form_def = make_contact_form()
+        form_def.name = "memo"
+        FormRegistry.register(form_def)
+        mwf.filter(PageContent(html=html))
+        # registering the same forms again does not change the output
+        FormRegistry.register(form_def)
+        mwf.filter(PageContent(html=html))
+        mwf.filter(PageContent(html=html + "<p>new</p>"))
+        self.assertEqual(4, mwf.stage_stats()["parse"].calls)
+        # the memo is bounded
+        self.assertEqual(2, mwf.filter_memo.stats.entries)
+
+    def slide_deck(self, slides: int = 200) -> str:
+        """
+        get the filtered html of a slideshow with the given number of slides
+        using the <div class="mw-heading"> wrapped headings of MediaWiki 1.43
+        """
+        parts = ["<p>intro</p>"]
+        for i in range(slides):
+            parts.append(
+                f'<div class="mw-heading mw-heading2"><h2 id="⌘⌘_Slide{i}">'
+                f"⌘⌘ Slide{i}</h2></div>\n<p>content {i}</p>\n<ul><li>point {i}</li></ul>"
+            )
+        html = "\n".join(parts)
+        return html
+
+    def test_reveal_sections(self):
+        """
+        test the single pass slide sectioning
+        """
+        html = """<p>intro</p>
+<h2><span id=".E2.8C.98.E2.8C.98_Slide1"></span><span class="mw-headline" id="⌘⌘_Slide1">⌘⌘ Slide1</span></h2>
+<p>Content for slide 1</p>
+<h2><span class="mw-headline" id="Notes">Notes</span></h2>
+<p>not on a slide</p>
+<div class="mw-heading mw-heading2"><h2 id="⌘⌘_Slide2">⌘⌘ Slide2</h2></div>
+<p>Content for slide 2</p>"""
+        mwf = MediaWikiHtmlFilter()
+        reveal_html = mwf.toReveal(html)
+        if self.debug:
+            print(reveal_html)
+        root = lxml.html.fragment_fromstring(reveal_html, create_parent="div")
+        sections = root.findall("section")
+        self.assertEqual(2, len(sections))
+        self.assertIn("Content for slide 1", sections[0].text_content())
+        self.assertNotIn("Notes", sections[0].text_content())
+        self.assertIn("Content for slide 2", sections[1].text_content())
+        # content outside of slides keeps its place
+        tags = [child.tag for child in root]
+        self.assertEqual(["p", "section", "h2", "p", "section"], tags)
+
+    def test_reveal_large_deck(self):
+        """
+        test that a 200 slide deck is sectioned in one pass and cached per revision
+        """
+        html = self.slide_deck(200)
+        mwf = MediaWikiHtmlFilter()
+        start = time.perf_counter()
+        reveal_html = mwf.toReveal(html)
+        elapsed = time.perf_counter() - start
+        if self.debug:
+            print(f"200 slides sectioned in {elapsed*1000:.1f} ms")
+        self.assertEqual(200, reveal_html.count("<section>"))
+        root = lxml.html.fragment_fromstring(reveal_html, create_parent="div")
+        sections = root.findall("section")
+        self.assertEqual(200, len(sections))
+        for i in [0, 99, 199]:
+            self.assertIn(f"content {i}", sections[i].text_content())
+            self.assertNotIn(f"content {i + 1}", sections[i].text_content())
+        frontend = CountingFrontend()
+        for _i in range(3):
+            pc = PageContent(page_title="Training_Deck", html=html)
+            pc.content = html
+            pc.revid = 42
+            slides_html = frontend.get_slides(pc)
+            self.assertIn("Reveal.initialize({", slides_html)
+        stats = frontend.slide_cache.stats
+        self.assertEqual(1, stats.misses)
+        self.assertEqual(2, stats.hits)
+        # a new revision is sectioned again
+        pc.revid = 43
+        frontend.get_slides(pc)
+        self.assertEqual(2, frontend.slide_cache.stats.misses)
+        # so is the same revision with other filter keys
+        frontend.filterKeys = frontend.filterKeys + ["nofollow"]
+        frontend.get_slides(pc)
+        self.assertEqual(3, frontend.slide_cache.stats.misses)
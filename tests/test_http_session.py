@@ -0,0 +1,111 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+from argparse import Namespace
+from types import SimpleNamespace
+
+from basemkit.basetest import Basetest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from frontend.http_session import HttpSessionConfig
+from tests.fakes import FakeUpstream, get_proxy_frontend
+
+
+class TestHttpSession(Basetest):
+    """
+    test the pooled http session used for proxying
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+
+    def test_create_session(self):
+        """
+        test the pool and retry configuration of the session
+        """
+        args = Namespace(proxy_pool_size=8, proxy_read_timeout=12.0)
+        config = HttpSessionConfig.of_args(args)
+        self.assertEqual((5.0, 12.0), config.timeout)
+        session = config.create_session()
+        adapter = session.get_adapter("https://wiki.bitplan.com/images/logo.png")
+        self.assertEqual(8, adapter._pool_maxsize)
+        self.assertEqual(2, adapter.max_retries.total)
+        session.close()
+
+    def test_proxy_uses_session(self):
+        """
+        test that the frontend proxies via its shared session with timeouts
+        """
+        frontend = get_proxy_frontend()
+        calls = []
+
+        def get(url, **kwargs):
+            calls.append((url, kwargs))
+            return SimpleNamespace(status_code=200, content=b"png")
+
+        frontend.http_session.get = get
+        for _i in range(2):
+            response = frontend.proxy("/images/logo.png")
+            self.assertEqual(b"png", response.content)
+        self.assertEqual(2, len(calls))
+        url, kwargs = calls[0]
+        self.assertEqual("https://wiki.bitplan.com/images/logo.png", url)
+        self.assertEqual(frontend.http_config.timeout, kwargs["timeout"])
+        frontend.close()
+
+    def test_streaming_range_proxy(self):
+        """
+        test that proxied videos are streamed in chunks with Range support
+        """
+        frontend = get_proxy_frontend()
+        frontend.proxy_chunk_size = 4
+        body = b"0123456789"
+        upstream = FakeUpstream(
+            body[2:],
+            status_code=206,
+            headers={
+                "Content-Type": "video/mp4",
+                "Content-Range": "bytes 2-9/10",
+                "Connection": "keep-alive",
+            },
+        )
+        calls = []
+
+        def get(url, **kwargs):
+            calls.append(kwargs)
+            return upstream
+
+        frontend.http_session.get = get
+        app = FastAPI()
+
+        @app.get("/www/{page_path:path}")
+        def render_path(page_path: str, request: Request):
+            return frontend.get_path_response(f"/{page_path}", request.headers)
+
+        client = TestClient(app)
+        response = client.get(
+            "/www/videos/demo.mp4",
+            headers={
+                "Range": "bytes=2-",
+                "If-Range": '"v1"',
+                "If-None-Match": '"v0"',
+                "Cookie": "a=b",
+            },
+        )
+        self.assertEqual(206, response.status_code)
+        self.assertEqual(b"23456789", response.content)
+        self.assertEqual("bytes 2-9/10", response.headers["content-range"])
+        self.assertNotEqual("keep-alive", response.headers.get("connection"))
+        kwargs = calls[0]
+        self.assertTrue(kwargs["stream"])
+        self.assertEqual(
+            {"range": "bytes=2-", "if-range": '"v1"', "if-none-match": '"v0"'},
+            kwargs["headers"],
+        )
+        self.assertEqual([4, 4], upstream.chunk_sizes)
+        self.assertTrue(upstream.closed)
+        frontend.close()
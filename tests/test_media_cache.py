@@ -0,0 +1,198 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import tempfile
+
+from basemkit.basetest import Basetest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from frontend.media_cache import MediaCache, MediaEntry
+from tests.fakes import FakeUpstream, get_proxy_frontend
+
+
+class TestMediaCache(Basetest):
+    """
+    test the disk cache for proxied media
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        Basetest.tearDown(self)
+
+    def cache_file(self, cache: MediaCache, path: str, content: bytes):
+        entry = MediaEntry(path=path, size=0, content_type="image/png")
+        chunks = list(cache.store(entry, iter([content]), len(content)))
+        self.assertEqual([content], chunks)
+
+    def test_lru_eviction(self):
+        """
+        test that the least recently used files are evicted - also after a restart
+        """
+        cache = MediaCache(self.tmp_dir.name, max_bytes=10)
+        self.cache_file(cache, "/images/a.png", b"aaaa")
+        self.cache_file(cache, "/images/b.png", b"bbbb")
+        # touch a so that b becomes the least recently used file
+        self.assertIsNotNone(cache.get("/images/a.png"))
+        self.cache_file(cache, "/images/c.png", b"cccc")
+        self.assertIn("/images/a.png", cache)
+        self.assertNotIn("/images/b.png", cache)
+        self.assertEqual(8, cache.size)
+        self.assertEqual(1, cache.evictions)
+        # files beyond the budget are passed on but not cached
+        self.cache_file(cache, "/images/huge.png", b"x" * 11)
+        self.assertNotIn("/images/huge.png", cache)
+        restarted = MediaCache(self.tmp_dir.name, max_bytes=10)
+        self.assertEqual(2, len(restarted))
+        self.assertEqual("image/png", restarted.get("/images/c.png").content_type)
+
+    def test_incomplete_download(self):
+        """
+        test that an aborted download is not cached
+        """
+        cache = MediaCache(self.tmp_dir.name)
+        entry = MediaEntry(path="/videos/demo.mp4", size=0)
+        stream = cache.store(entry, iter([b"12", b"34"]), 4)
+        next(stream)
+        stream.close()
+        self.assertEqual(0, len(cache))
+
+    def test_pinned_files_are_kept(self):
+        """
+        test that a file that is being served is neither evicted nor replaced
+        """
+        cache = MediaCache(self.tmp_dir.name, max_bytes=10)
+        self.cache_file(cache, "/images/a.png", b"aaaa")
+        self.assertTrue(cache.pin("/images/a.png"))
+        self.assertFalse(cache.pin("/images/missing.png"))
+        self.cache_file(cache, "/images/b.png", b"bbbb")
+        self.cache_file(cache, "/images/c.png", b"cccc")
+        # b is evicted instead of the pinned least recently used a
+        self.assertIn("/images/a.png", cache)
+        self.assertNotIn("/images/b.png", cache)
+        self.cache_file(cache, "/images/a.png", b"new")
+        self.assertEqual(8, cache.size)
+        cache.release("/images/a.png")
+        self.cache_file(cache, "/images/d.png", b"dddd")
+        self.assertNotIn("/images/a.png", cache)
+
+    def test_max_age(self):
+        """
+        test the freshness of media entries
+        """
+        entry = MediaEntry(path="/images/a.png", size=1, etag='"e"', fetched=100.0)
+        self.assertTrue(entry.is_fresh(None))
+        self.assertTrue(entry.is_fresh(60, now=150.0))
+        self.assertFalse(entry.is_fresh(60, now=170.0))
+        self.assertFalse(MediaEntry(path="/images/a.png", size=1).is_fresh(60))
+        self.assertEqual({"if-none-match": '"e"'}, entry.conditional_headers)
+
+    def test_proxy_media_cache(self):
+        """
+        test that proxied images are served from disk after the first request
+        """
+        frontend = get_proxy_frontend()
+        frontend.media_cache = MediaCache(self.tmp_dir.name)
+        calls = []
+
+        def get(url, **kwargs):
+            calls.append(url)
+            return FakeUpstream(
+                b"png-data",
+                headers={
+                    "Content-Type": "image/png",
+                    "Content-Length": "8",
+                    "ETag": '"abc"',
+                },
+            )
+
+        frontend.http_session.get = get
+        app = FastAPI()
+
+        @app.get("/www/{page_path:path}")
+        def render_path(page_path: str, request: Request):
+            return frontend.get_path_response(f"/{page_path}", request.headers)
+
+        client = TestClient(app)
+        for _i in range(3):
+            response = client.get("/www/images/logo.png")
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(b"png-data", response.content)
+            self.assertEqual('"abc"', response.headers["etag"])
+        self.assertEqual(1, len(calls))
+        self.assertEqual(2, frontend.media_cache.hits)
+        response = client.get(
+            "/www/images/logo.png", headers={"If-None-Match": '"abc"'}
+        )
+        self.assertEqual(304, response.status_code)
+        # ranges are served from the cached file
+        response = client.get("/www/images/logo.png", headers={"Range": "bytes=4-"})
+        self.assertEqual(206, response.status_code)
+        self.assertEqual(b"data", response.content)
+        frontend.close()
+
+    def test_proxy_media_revalidation(self):
+        """
+        test that expired files are revalidated with the wiki
+        """
+        frontend = get_proxy_frontend()
+        frontend.media_cache = MediaCache(self.tmp_dir.name, max_age=60)
+        calls = []
+        upstream = {"status_code": 200, "body": b"old-data", "etag": '"v1"'}
+
+        def get(url, headers=None, **kwargs):
+            calls.append(headers)
+            if headers.get("if-none-match") == upstream["etag"]:
+                return FakeUpstream(b"", status_code=304)
+            return FakeUpstream(
+                upstream["body"],
+                headers={"Content-Type": "image/png", "ETag": upstream["etag"]},
+            )
+
+        frontend.http_session.get = get
+        path = "/images/logo.png"
+        self.assertEqual(
+            b"old-data", TestClient(self.get_app(frontend)).get(f"/www{path}").content
+        )
+        client = TestClient(self.get_app(frontend))
+        # fresh - no upstream request
+        self.assertEqual(b"old-data", client.get(f"/www{path}").content)
+        self.assertEqual(1, len(calls))
+        self.expire(frontend.media_cache, path)
+        # expired and not modified
+        self.assertEqual(b"old-data", client.get(f"/www{path}").content)
+        self.assertEqual({"if-none-match": '"v1"'}, calls[-1])
+        self.assertTrue(frontend.media_cache.get(path).is_fresh(60))
+        self.expire(frontend.media_cache, path)
+        # expired and modified
+        upstream.update(body=b"new-data", etag='"v2"')
+        self.assertEqual(b"new-data", client.get(f"/www{path}").content)
+        self.assertEqual(b"new-data", client.get(f"/www{path}").content)
+        self.assertEqual('"v2"', frontend.media_cache.get(path).etag)
+        self.assertEqual(3, len(calls))
+        frontend.close()
+
+    def get_app(self, frontend) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/www/{page_path:path}")
+        def render_path(page_path: str, request: Request):
+            return frontend.get_path_response(f"/{page_path}", request.headers)
+
+        return app
+
+    def expire(self, cache: MediaCache, path: str):
+        """
+        let the entry of the given path expire
+        """
+        entry = cache.get(path)
+        entry.fetched -= 3600
+        with cache._lock:
+            cache._write_meta(cache.key_of(path), entry)
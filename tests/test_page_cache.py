@@ -0,0 +1,246 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import gzip
+import time
+from argparse import Namespace
+from types import SimpleNamespace
+
+from basemkit.basetest import Basetest
+
+from frontend.conditional import etag_matches, http_date
+from frontend.page_cache import PageCache, PageCacheConfig, RenderedPage
+from frontend.wikicms import WikiFrontend, WikiFrontends
+from tests.fakes import CountingFrontend
+
+
+class TestPageCache(Basetest):
+    """
+    test the rendered page cache
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+
+    def test_lru_eviction(self):
+        """
+        test that the least recently used entry is evicted first
+        """
+        cache = PageCache(max_entries=2, ttl=None)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        # touch a so that b becomes the least recently used entry
+        self.assertEqual("A", cache.get("a"))
+        cache.put("c", "C")
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        stats = cache.stats
+        self.assertEqual(1, stats.evictions)
+        self.assertEqual(2, stats.entries)
+
+    def test_byte_budget(self):
+        """
+        test that the byte budget is respected
+        """
+        cache = PageCache(max_bytes=10, ttl=None)
+        cache.put("a", b"12345")
+        cache.put("b", b"12345")
+        cache.put("c", b"12345")
+        self.assertEqual(10, cache.stats.size)
+        self.assertNotIn("a", cache)
+        # values beyond the budget are not cached at all
+        self.assertFalse(cache.put("huge", b"x" * 11))
+        self.assertIn("c", cache)
+
+    def test_ttl(self):
+        """
+        test that expired entries count as misses
+        """
+        cache = PageCache(ttl=0.01)
+        cache.put("a", "A")
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        stats = cache.stats
+        self.assertEqual(1, stats.misses)
+        self.assertEqual(1, stats.expirations)
+
+    def test_normalize_title(self):
+        """
+        test MediaWiki style title normalization
+        """
+        for title, expected in [
+            ("main_page", "Main page"),
+            ("Main Page", "Main Page"),
+            ("  Main__Page ", "Main Page"),
+        ]:
+            self.assertEqual(expected, WikiFrontend.normalize_title(title))
+
+    def test_frontend_page_cache(self):
+        """
+        test that a frontend renders a page only once and reports its stats
+        """
+        config = PageCacheConfig(ttl=None)
+        frontend = CountingFrontend(cache_config=config)
+        for path in ["/Joker", "/index.php/Joker", "/Joker"]:
+            response = frontend.get_path_response(path)
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(b"<p>Joker</p>", response.body)
+        self.assertEqual(1, frontend.render_count)
+        # invalid paths are not cached
+        frontend.get_path_response("/{Illegal}")
+        frontend.get_path_response("/{Illegal}")
+        self.assertEqual(3, frontend.render_count)
+        wiki_frontends = WikiFrontends(servers=None)
+        wiki_frontends.wiki_frontends["www"] = frontend
+        stats = wiki_frontends.cache_stats()["www"]
+        if self.debug:
+            print(stats)
+        self.assertEqual(2, stats.hits)
+        self.assertEqual(1, stats.misses)
+
+    def test_configure(self):
+        """
+        test configuring the frontends from the command line arguments
+        """
+        args = Namespace(
+            sites=None,
+            cache_ttl=10.0,
+            cache_store_max_mb=2.0,
+            proxy_read_timeout=12.0,
+            filter_keys=["www=editsection"],
+        )
+        server = SimpleNamespace(
+            frontends={
+                "www": SimpleNamespace(name="www"),
+                "cr": SimpleNamespace(name="cr"),
+            }
+        )
+        wiki_frontends = WikiFrontends(servers=None)
+        sites = wiki_frontends.configure(args, server)
+        self.assertEqual(["www", "cr"], sites)
+        self.assertEqual(10.0, wiki_frontends.cache_config.ttl)
+        self.assertEqual(2 * 1024 * 1024, wiki_frontends.cache_config.store_max_bytes)
+        self.assertEqual(12.0, wiki_frontends.http_config.timeout[1])
+        self.assertEqual({"www": ["editsection"]}, wiki_frontends.filter_keys)
+        args.sites = ["cr"]
+        self.assertEqual(["cr"], wiki_frontends.configure(args, server))
+        self.assertEqual([], wiki_frontends.configure(Namespace(sites=None)))
+
+    def test_stale_while_revalidate(self):
+        """
+        test that expired pages are served stale while being refreshed
+        and that the last good copy is served while the wiki fails
+        """
+        config = PageCacheConfig(ttl=0.05, stale_ttl=60)
+        frontend = CountingFrontend(cache_config=config)
+        frontend.get_path_response("/Joker")
+        time.sleep(0.06)
+        # stale hit - the refresh runs in the background
+        response = frontend.get_path_response("/Joker")
+        self.assertEqual(b"<p>Joker</p>", response.body)
+        frontend.revalidate_executor.shutdown(wait=True)
+        self.assertEqual(2, frontend.render_count)
+        self.assertEqual(1, frontend.page_cache.stats.stale_hits)
+        # the wiki goes down after the page expired
+        time.sleep(0.06)
+        frontend.failing = True
+        cache_key = frontend.get_cache_key("Joker")
+        rendered = frontend.render_and_cache("/Joker", "en", cache_key)
+        self.assertEqual(3, frontend.render_count)
+        self.assertEqual(b"<p>Joker</p>", rendered.body)
+        self.assertEqual(200, rendered.status_code)
+
+    def test_revalidate_backoff(self):
+        """
+        test that a failing page is not revalidated again during the backoff
+        """
+        config = PageCacheConfig(ttl=0.05, stale_ttl=60, revalidate_backoff=60)
+        frontend = CountingFrontend(cache_config=config)
+        frontend.get_path_response("/Joker")
+        time.sleep(0.06)
+        frontend.failing = True
+        for _i in range(3):
+            response = frontend.get_path_response("/Joker")
+            self.assertEqual(b"<p>Joker</p>", response.body)
+            frontend.revalidate_executor.shutdown(wait=True)
+        # only the first stale hit triggered a rendering
+        self.assertEqual(2, frontend.render_count)
+        self.assertIn(frontend.get_cache_key("Joker"), frontend.render_failures)
+        # missing pages without a cached copy are not recorded
+        for i in range(3):
+            self.assertEqual(
+                404, frontend.get_path_response(f"/Missing{i}").status_code
+            )
+        self.assertEqual(1, len(frontend.render_failures))
+        # the failure is forgotten after the backoff
+        frontend.render_failures.ttl = 0.01
+        frontend.record_render_failure(frontend.get_cache_key("Joker"))
+        time.sleep(0.02)
+        self.assertNotIn(frontend.get_cache_key("Joker"), frontend.render_failures)
+
+    def test_conditional_requests(self):
+        """
+        test ETag and Last-Modified validators and 304 responses
+        """
+        frontend = CountingFrontend(cache_config=PageCacheConfig(ttl=None))
+        response = frontend.get_path_response("/Joker")
+        etag = response.headers["etag"]
+        last_modified = response.headers["last-modified"]
+        self.assertTrue(etag.startswith('"'))
+        for request_headers, expected_status in [
+            ({"If-None-Match": etag}, 304),
+            ({"If-None-Match": f'"other", W/{etag}'}, 304),
+            ({"If-None-Match": '"other"'}, 200),
+            ({"If-Modified-Since": last_modified}, 304),
+            ({"If-Modified-Since": http_date(0)}, 200),
+            # If-None-Match takes precedence
+            ({"If-None-Match": '"other"', "If-Modified-Since": last_modified}, 200),
+        ]:
+            response = frontend.get_path_response("/Joker", request_headers)
+            self.assertEqual(expected_status, response.status_code, request_headers)
+            self.assertEqual(etag, response.headers["etag"])
+            if expected_status == 304:
+                self.assertEqual(b"", response.body)
+        self.assertEqual(1, frontend.render_count)
+        self.assertTrue(etag_matches("*", etag))
+
+    def test_precompressed_variants(self):
+        """
+        test that cached pages are served precompressed as negotiated
+        """
+        frontend = CountingFrontend(cache_config=PageCacheConfig(ttl=None))
+        rendered = RenderedPage(page_title="Joker", body=b"<p>Joker</p>" * 200)
+        rendered.set_validators()
+        rendered.compress()
+        cache_key = frontend.get_cache_key("Joker")
+        frontend.page_cache.put(cache_key, rendered)
+        response = frontend.get_path_response("/Joker", {"Accept-Encoding": "gzip"})
+        self.assertEqual("gzip", response.headers["content-encoding"])
+        self.assertEqual("Accept-Encoding", response.headers["vary"])
+        self.assertEqual(rendered.body, gzip.decompress(response.body))
+        gzip_etag = response.headers["etag"]
+        self.assertNotEqual(rendered.etag, gzip_etag)
+        response = frontend.get_path_response(
+            "/Joker", {"Accept-Encoding": "gzip", "If-None-Match": gzip_etag}
+        )
+        self.assertEqual(304, response.status_code)
+        for accept_encoding in [None, "identity", "gzip;q=0", "deflate"]:
+            headers = {"Accept-Encoding": accept_encoding} if accept_encoding else {}
+            response = frontend.get_path_response("/Joker", headers)
+            self.assertNotIn("content-encoding", response.headers)
+            self.assertEqual(rendered.body, response.body)
+        self.assertEqual(0, frontend.render_count)
+        for accept_encoding, expected in [
+            ("gzip, br", "br"),
+            ("br;q=0.5, gzip", "gzip"),
+            ("*", "br"),
+        ]:
+            coding = RenderedPage.negotiate_encoding(accept_encoding, ["br", "gzip"])
+            self.assertEqual(expected, coding)
+        # tiny pages are not compressed
+        tiny = RenderedPage(page_title="Tiny", body=b"<p>Tiny</p>")
+        tiny.compress()
+        self.assertEqual({}, tiny.encodings)
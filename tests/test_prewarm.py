@@ -0,0 +1,109 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+from basemkit.basetest import Basetest
+
+from frontend.clickstream import ClickStream, ClickstreamManager, PageHit
+from frontend.page_cache import PageCacheConfig
+from frontend.prewarm import CachePrewarmer
+from tests.fakes import CountingFrontend
+
+
+class TestPrewarm(Basetest):
+    """
+    test prewarming the page cache
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+
+    def get_manager(self) -> ClickstreamManager:
+        """
+        get a clickstream manager with some page hits
+        """
+        now = datetime.now()
+        streams = []
+        for domain, paths in [
+            ("www.bitplan.com", ["/Joker", "/Sharks", "/Joker", "/Welcome", "/Joker"]),
+            ("other.bitplan.com", ["/Welcome", "/Welcome", "/Welcome"]),
+        ]:
+            streams.append(
+                ClickStream(
+                    url=f"https://{domain}",
+                    ip="127.0.0.1",
+                    domain=domain,
+                    timeStamp=now,
+                    pageHits=[PageHit(path=path, timeStamp=now) for path in paths],
+                    userAgent=None,
+                )
+            )
+        manager = ClickstreamManager("/nonexistent", show_progress=False)
+        manager.clickstream_logs = [SimpleNamespace(clickStreams=streams)]
+        return manager
+
+    def test_top_paths_of_clickstream(self):
+        """
+        test computing the most visited paths
+        """
+        manager = self.get_manager()
+        paths = CachePrewarmer.top_paths_of_clickstream(manager, 2)
+        self.assertEqual(["/Welcome", "/Joker"], paths)
+        paths = CachePrewarmer.top_paths_of_clickstream(
+            manager, 2, domain="www.bitplan.com"
+        )
+        self.assertEqual(["/Joker", "/Sharks"], paths)
+
+    def test_prewarm(self):
+        """
+        test that the collected titles end up in the page cache
+        """
+        frontend = CountingFrontend(cache_config=PageCacheConfig(ttl=None))
+        frontend.frontend.defaultPage = "Welcome"
+        frontend.cms_pages = {"CMS/footer/de": "<footer/>"}
+        prewarmer = CachePrewarmer(
+            frontend,
+            max_workers=2,
+            top_titles=[
+                "/Joker",
+                "/index.php/Welcome",
+                "/{Illegal}",
+                "/images/a/ab/Logo.png",
+                "/videos/Intro.mp4",
+                "/index.php?title=Joker&action=history",
+            ],
+            show_progress=False,
+        )
+        titles = prewarmer.collect_titles()
+        self.assertEqual(["Welcome", "Joker", "CMS/footer/de"], titles)
+        prewarmer.start()
+        prewarmer.join()
+        self.assertEqual(3, prewarmer.rendered)
+        self.assertEqual(3, frontend.render_count)
+        self.assertIn(frontend.get_cache_key("Joker"), frontend.page_cache)
+
+    def test_prewarm_clickstream_domain(self):
+        """
+        test that the top titles are taken in the background
+        from the clickstreams of the frontend's domain only
+        """
+        frontend = CountingFrontend(cache_config=PageCacheConfig(ttl=None))
+        frontend.frontend.hostname = "other.bitplan.com"
+        prewarmer = CachePrewarmer(
+            frontend,
+            max_workers=2,
+            show_progress=False,
+            clickstream_manager=self.get_manager(),
+            top_n=2,
+        )
+        self.assertEqual([], prewarmer.top_titles)
+        prewarmer.start()
+        prewarmer.join()
+        self.assertEqual(["/Welcome"], prewarmer.top_titles)
+        self.assertIn(frontend.get_cache_key("Welcome"), frontend.page_cache)
+        self.assertNotIn(frontend.get_cache_key("Joker"), frontend.page_cache)
@@ -0,0 +1,98 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import time
+
+from basemkit.basetest import Basetest
+
+from frontend.page_cache import PageCacheConfig
+from frontend.recent_changes import RecentChangesPoller
+from tests.fakes import CountingFrontend
+
+
+class ListPoller(RecentChangesPoller):
+    """
+    a poller that gets its changes from a list instead of a wiki
+    """
+
+    def __init__(self, wiki_frontend, changes, latest=None):
+        super().__init__(wiki_frontend)
+        self.changes = changes
+        self.latest = latest
+
+    def fetch_latest_change(self):
+        return self.latest
+
+    def fetch_changes(self):
+        return self.changes
+
+
+class TestRecentChanges(Basetest):
+    """
+    test recent changes based cache invalidation
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+
+    def test_to_mw_timestamp(self):
+        """
+        test converting struct_time values as returned by mwclient
+        """
+        struct_time = time.strptime("2026-10-17 08:15:00", "%Y-%m-%d %H:%M:%S")
+        timestamp = RecentChangesPoller.to_mw_timestamp(struct_time)
+        self.assertEqual("2026-10-17T08:15:00Z", timestamp)
+
+    def test_poll_invalidates_changed_pages(self):
+        """
+        test that only the changed pages are invalidated
+        """
+        frontend = CountingFrontend(cache_config=PageCacheConfig(ttl=None))
+        for path in ["/Joker", "/Sharks", "/Main_Page"]:
+            frontend.get_path_response(path)
+        changes = [
+            {"rcid": 1, "title": "Joker", "timestamp": "2026-10-17T08:15:00Z"},
+            {
+                "rcid": 2,
+                "title": "Old Page",
+                "timestamp": "2026-10-17T08:16:00Z",
+                "logparams": {"target_title": "Main Page"},
+            },
+        ]
+        latest = {"rcid": 0, "timestamp": "2026-10-17T08:14:00Z"}
+        poller = ListPoller(frontend, changes, latest)
+        # the first poll only records the time of the latest change of the wiki
+        self.assertEqual(set(), poller.poll())
+        self.assertEqual("2026-10-17T08:14:00Z", poller.last_timestamp)
+        changed = poller.poll()
+        self.assertEqual({"Joker", "Old Page", "Main Page"}, changed)
+        self.assertEqual(2, poller.last_rcid)
+        self.assertEqual("2026-10-17T08:16:00Z", poller.last_timestamp)
+        keys = frontend.page_cache.keys()
+        self.assertEqual([frontend.get_cache_key("Sharks")], keys)
+        # already seen changes are ignored
+        self.assertEqual(set(), poller.poll())
+
+    def test_invalidation_while_rendering(self):
+        """
+        test that a rendering is not cached if its page was invalidated meanwhile
+        """
+        frontend = CountingFrontend(cache_config=PageCacheConfig(ttl=None))
+        render_page = frontend.render_page
+
+        def render_during_change(path: str, lang: str = "en", stream: bool = False):
+            rendered = render_page(path, lang, stream)
+            # the page is changed in the wiki while it is being rendered
+            frontend.invalidate_titles(["Joker"])
+            return rendered
+
+        frontend.render_page = render_during_change
+        response = frontend.get_path_response("/Joker")
+        self.assertEqual(b"<p>Joker</p>", response.body)
+        self.assertNotIn(frontend.get_cache_key("Joker"), frontend.page_cache)
+        frontend.render_page = render_page
+        frontend.get_path_response("/Joker")
+        self.assertIn(frontend.get_cache_key("Joker"), frontend.page_cache)
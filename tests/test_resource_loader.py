@@ -0,0 +1,204 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import tempfile
+from pathlib import Path
+
+from basemkit.basetest import Basetest
+
+from frontend.frame import HtmlFrame
+from frontend.minify import minify_css, minify_html, minify_js
+from frontend.resource_loader import ResourceLoader
+from tests.fakes import CountingFrontend
+
+
+class TestResourceLoader(Basetest):
+    """
+    test loading and bundling the css/js resources
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.builtin_dir = Path(self.tmp_dir.name) / "builtin"
+        self.user_dir = Path(self.tmp_dir.name) / "user"
+        self.write("builtin", "css", "a.css", '<link rel="stylesheet" href="x.css">')
+        self.write("builtin", "css", "b.css", "<style>\n.a { color: red; }\n</style>")
+        self.write(
+            "builtin",
+            "js",
+            "a.js",
+            '<script src="jquery.js"></script>\n<div id="menu"></div>\n'
+            "<script>\nfunction toggle() {}\n</script>",
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        Basetest.tearDown(self)
+
+    def write(self, base: str, kind: str, name: str, content: str):
+        path = Path(self.tmp_dir.name) / base / kind
+        path.mkdir(parents=True, exist_ok=True)
+        (path / name).write_text(content, encoding="utf-8")
+
+    def test_bundle(self):
+        """
+        test that inline blocks are moved to fingerprinted bundles
+        """
+        loader = ResourceLoader(self.builtin_dir, self.user_dir)
+        css = loader.bundle("css")
+        self.assertEqual(".a { color: red; }", css.content)
+        self.assertIn('href="x.css"', css.html())
+        self.assertIn(f'<link rel="stylesheet" href="{css.url}">', css.html())
+        self.assertNotIn("<style>", css.html())
+        self.assertTrue(css.url.startswith("/_assets/app."))
+        js = loader.bundle("js")
+        self.assertEqual("function toggle() {}", js.content)
+        html = js.html()
+        self.assertIn('<script src="jquery.js"></script>', html)
+        self.assertIn('<div id="menu"></div>', html)
+        self.assertTrue(html.endswith(f'<script src="{js.url}"></script>'))
+        self.assertIs(css, loader.get_bundle(css.file_name))
+        self.assertIsNone(loader.get_bundle("app.0000000000000000.css"))
+        # a user override changes the fingerprint
+        self.write("user", "css", "b.css", "<style>.a { color: blue; }</style>")
+        loader.clear_cache()
+        self.assertNotEqual(css.url, loader.bundle("css").url)
+
+    def test_change_detection(self):
+        """
+        test that changed files are detected and only their kind is rebuilt
+        """
+        loader = ResourceLoader(self.builtin_dir, self.user_dir, check_interval=0)
+        css = loader.bundle("css")
+        js = loader.bundle("js")
+        self.assertIs(css, loader.bundle("css"))
+        self.write("user", "css", "c.css", "<style>.c { color: blue; }</style>")
+        new_css = loader.bundle("css")
+        self.assertNotEqual(css.url, new_css.url)
+        self.assertIn(".c { color: blue; }", new_css.content)
+        self.assertIs(js, loader.bundle("js"))
+        # pages cached before the change still get their bundle
+        self.assertIs(css, loader.get_bundle(css.file_name))
+        # without a check interval changes are only picked up on demand
+        loader = ResourceLoader(self.builtin_dir, self.user_dir, check_interval=None)
+        css = loader.bundle("css")
+        self.write("user", "css", "d.css", "<style>.d { color: green; }</style>")
+        self.assertIs(css, loader.bundle("css"))
+        self.assertTrue(loader.check_changes("css", force=True))
+        self.assertNotEqual(css.url, loader.bundle("css").url)
+
+    def test_fingerprint(self):
+        """
+        test that the fingerprint in the page cache keys follows the resources
+        """
+        loader = ResourceLoader(self.builtin_dir, self.user_dir, check_interval=0)
+        fingerprint = loader.fingerprint()
+        self.assertEqual(fingerprint, loader.fingerprint())
+        self.assertEqual(
+            fingerprint, ResourceLoader(self.builtin_dir, self.user_dir).fingerprint()
+        )
+        # a changed remainder changes the header html but not the bundle urls
+        self.write("user", "js", "b.js", '<script src="extra.js"></script>')
+        self.assertNotEqual(fingerprint, loader.fingerprint())
+        saved_loader = HtmlFrame._resource_loader
+        try:
+            HtmlFrame._resource_loader = loader
+            frontend = CountingFrontend()
+            key = frontend.get_cache_key("Joker")
+            self.assertEqual(loader.fingerprint(), key[-1])
+            frontend.get_path_response("/Joker")
+            self.assertIn(key, frontend.page_cache)
+            self.write("user", "css", "c.css", "<style>.c { color: blue; }</style>")
+            # a page cached with the old resources is not found anymore
+            # and the pages referring to the outdated bundles are dropped
+            self.assertNotEqual(key, frontend.get_cache_key("Joker"))
+            self.assertEqual(0, len(frontend.page_cache))
+        finally:
+            HtmlFrame._resource_loader = saved_loader
+
+    def test_minify(self):
+        """
+        test minifying the resources and reporting the saved bytes
+        """
+        self.write(
+            "builtin",
+            "css",
+            "c.css",
+            "<!-- menu -->\n<style>\n  /* menu */\n  .menu li , a :hover {\n"
+            "    color : red;\n    margin: 0 5px;\n  }\n</style>",
+        )
+        loader = ResourceLoader(self.builtin_dir, self.user_dir, minify=True)
+        css = loader.bundle("css")
+        self.assertEqual(
+            ".a{color:red}\n.menu li,a :hover{color :red;margin:0 5px}", css.content
+        )
+        self.assertNotIn("<!--", css.html())
+        self.assertGreater(css.saved_bytes, 0)
+        # the sizes are those of the bundle content only
+        self.assertEqual(len(css.content), css.minified_size)
+        self.assertEqual(
+            len(
+                ".a { color: red; }\n/* menu */\n  .menu li , a :hover {\n"
+                "    color : red;\n    margin: 0 5px;\n  }"
+            ),
+            css.original_size,
+        )
+        js = loader.bundle("js")
+        self.assertEqual("function toggle() {}", js.content)
+        self.assertIn(
+            '<script src="jquery.js"></script><div id="menu"></div>', js.html()
+        )
+        unminified = ResourceLoader(self.builtin_dir, self.user_dir).bundle("css")
+        self.assertEqual(unminified.original_size, unminified.minified_size)
+        self.assertEqual(unminified.original_size, css.original_size)
+
+    def test_minify_html(self):
+        """
+        test that minification keeps whitespace sensitive content
+        """
+        html = """<div>
+  <pre>  line 1
+    line 2</pre>
+  <textarea>  a
+  b</textarea>
+</div>
+<script>
+  // a comment
+  var url = "http://example.com";
+  var t = `a
+    b`;
+</script>
+<script>
+  var re = /a\\/\\/b/;
+
+  var s = '//';
+</script>"""
+        minified = minify_html(html)
+        self.assertIn("<pre>  line 1\n    line 2</pre>", minified)
+        self.assertIn("<textarea>  a\n  b</textarea>", minified)
+        self.assertIn("<div><pre>", minified)
+        self.assertIn("</textarea></div><script>", minified)
+        # scripts with template literals are kept as they are
+        self.assertIn("  var t = `a\n    b`;", minified)
+        self.assertIn("// a comment", minified)
+        self.assertIn("<script>var re = /a\\/\\/b/;\nvar s = '//';</script>", minified)
+
+    def test_minify_strings(self):
+        """
+        test that quoted strings and continued string lines are kept
+        """
+        css = (
+            'a::after { content: "a  ,  b" ; /* c */ background: url( "x  y.png" ) }\n'
+            "p { content: '/* no */  ;  x' ; border: 1px/**/solid; }"
+        )
+        self.assertEqual(
+            'a::after{content:"a  ,  b";background:url( "x  y.png" )}'
+            "p{content:'/* no */  ;  x';border:1px solid}",
+            minify_css(css),
+        )
+        js = '  var s = "a \\\n    b";\n\n    var t = "  c  ";  '
+        self.assertEqual('var s = "a \\\n    b";\nvar t = "  c  ";', minify_js(js))
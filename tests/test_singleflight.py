@@ -0,0 +1,85 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from basemkit.basetest import Basetest
+
+from frontend.page_cache import PageCacheConfig, RenderedPage
+from frontend.singleflight import SingleFlight
+from tests.fakes import CountingFrontend
+
+
+class SlowFrontend(CountingFrontend):
+    """
+    a frontend with a slow upstream
+    """
+
+    def render_page(
+        self, path: str, lang: str = "en", stream: bool = False
+    ) -> RenderedPage:
+        time.sleep(0.1)
+        return super().render_page(path, lang, stream)
+
+
+class TestSingleFlight(Basetest):
+    """
+    test request coalescing
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+
+    def test_concurrent_calls_share_result(self):
+        """
+        test that concurrent calls for the same key run only once
+        """
+        single_flight = SingleFlight()
+        calls = []
+        start = threading.Barrier(8)
+
+        def slow(value):
+            calls.append(value)
+            time.sleep(0.1)
+            return value * 2
+
+        def worker(_i):
+            start.wait()
+            return single_flight.do("key", slow, 21)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(worker, range(8)))
+        self.assertEqual([42] * 8, results)
+        self.assertEqual(1, len(calls))
+        self.assertEqual(7, single_flight.shared_count)
+        self.assertFalse(single_flight.in_flight("key"))
+
+    def test_errors_are_shared(self):
+        """
+        test that the error of the leader is raised for every caller
+        """
+        single_flight = SingleFlight()
+
+        def failing():
+            raise ValueError("wiki down")
+
+        with self.assertRaises(ValueError):
+            single_flight.do("key", failing)
+        # the failed call is not remembered
+        self.assertEqual("ok", single_flight.do("key", lambda: "ok"))
+
+    def test_frontend_renders_page_once(self):
+        """
+        test that concurrent misses for the same page render it only once
+        """
+        frontend = SlowFrontend(cache_config=PageCacheConfig(ttl=None))
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            responses = list(executor.map(frontend.get_path_response, ["/Joker"] * 10))
+        for response in responses:
+            self.assertEqual(b"<p>Joker</p>", response.body)
+        self.assertEqual(1, frontend.render_count)
@@ -0,0 +1,238 @@
+"""
+Created on 2026-10-17
+
+@author: wf
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+from basemkit.basetest import Basetest
+
+from frontend.forms.registry import FormRegistry
+from frontend.frame import HtmlFrame
+from frontend.page_cache import RenderedPage
+from frontend.resource_loader import ResourceLoader
+from frontend.static_export import StaticExporter
+from tests.fakes import CountingFrontend, FakeUpstream, make_contact_form
+
+
+class ImageFrontend(CountingFrontend):
+    """
+    a frontend whose pages show an image of the page
+    """
+
+    def render_page(self, path: str, lang: str = "en") -> RenderedPage:
+        self.render_count += 1
+        page_title, _error = self.get_page_title(path)
+        if page_title == "Missing":
+            return RenderedPage(page_title, b"Page not found", status_code=404)
+        image = page_title.replace(" ", "_")
+        html = (
+            f'<p>{page_title}<img src="/www/images/{image}.png"'
+            f' srcset="/www/images/{image}.png 1.5x, /www/images/{image}2.png 2x">'
+            f'<a href="/www/index.php/Other">Other</a></p>'
+        )
+        return RenderedPage(page_title=page_title, body=html.encode("utf-8"))
+
+    # version of the images on the wiki
+    image_version = 1
+
+    def proxy(self, path: str, headers=None, stream: bool = False):
+        etag = f'"{self.image_version}"'
+        if headers and headers.get("if-none-match") == etag:
+            return FakeUpstream(b"", status_code=304)
+        content = f"image {path} {self.image_version}".encode()
+        return FakeUpstream(content, headers={"ETag": etag})
+
+
+class TestStaticExport(Basetest):
+    """
+    test the static site export
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.saved_loader = HtmlFrame._resource_loader
+
+    def tearDown(self):
+        HtmlFrame._resource_loader = self.saved_loader
+        self.tmp_dir.cleanup()
+        Basetest.tearDown(self)
+
+    def get_exporter(self, frontend) -> StaticExporter:
+        """
+        get an exporter of the given frontend to my temporary directory
+        """
+        exporter = StaticExporter(
+            frontend, self.tmp_dir.name, max_workers=2, show_progress=False
+        )
+        return exporter
+
+    def test_export(self):
+        """
+        test exporting pages and mirroring their images
+        """
+        frontend = ImageFrontend()
+        frontend.frontend.defaultPage = "Main Page"
+        exporter = StaticExporter(
+            frontend, self.tmp_dir.name, max_workers=2, show_progress=False
+        )
+        result = exporter.export(["Main Page", "WikiCMS/Issue15", "Missing"])
+        self.assertEqual(2, result.pages)
+        self.assertEqual(["Missing"], result.failed)
+        self.assertEqual(4, result.assets)
+        site_dir = os.path.join(self.tmp_dir.name, "www")
+        for rel_path in [
+            "index.html",
+            "index.php/Main_Page/index.html",
+            "index.php/WikiCMS/Issue15/index.html",
+            "images/Main_Page.png",
+            "images/WikiCMS/Issue152.png",
+        ]:
+            self.assertTrue(os.path.isfile(os.path.join(site_dir, rel_path)), rel_path)
+        # the css/js bundles are shared by all sites
+        self.assertTrue(os.listdir(os.path.join(self.tmp_dir.name, "_assets")))
+
+    def test_incremental_export(self):
+        """
+        test that an incremental export only re-renders changed pages
+        """
+        frontend = ImageFrontend()
+        exporter = StaticExporter(
+            frontend, self.tmp_dir.name, max_workers=2, show_progress=False
+        )
+        revisions = {"Main Page": 1, "Joker": 2, "Gone": 3}
+        result = exporter.export_incremental(revisions)
+        self.assertEqual(3, result.pages)
+        self.assertEqual(3, frontend.render_count)
+        gone_path = exporter.page_file_path("Gone")
+        joker_path = exporter.page_file_path("Joker")
+        self.assertTrue(os.path.isfile(gone_path))
+        joker_mtime = os.stat(joker_path).st_mtime_ns
+        # a later run with a new revision of Main Page and a deleted page
+        exporter = StaticExporter(
+            frontend, self.tmp_dir.name, max_workers=2, show_progress=False
+        )
+        result = exporter.export_incremental({"Main Page": 4, "Joker": 2})
+        self.assertEqual(1, result.pages)
+        self.assertEqual(1, result.unchanged)
+        self.assertEqual(["Gone"], result.removed)
+        self.assertEqual(4, frontend.render_count)
+        self.assertFalse(os.path.exists(os.path.dirname(gone_path)))
+        self.assertEqual(joker_mtime, os.stat(joker_path).st_mtime_ns)
+        self.assertEqual(4, exporter.manifest.pages["Main Page"].revid)
+        # changing the CMS pages re-renders everything
+        frontend.cms_pages["Header"] = "new header"
+        result = exporter.export_incremental({"Main Page": 4, "Joker": 2})
+        self.assertEqual(2, result.pages)
+        self.assertEqual(0, result.unchanged)
+
+    def test_asset_revalidation(self):
+        """
+        test that mirrored assets are revalidated and refreshed when changed
+        """
+        frontend = ImageFrontend()
+        exporter = StaticExporter(
+            frontend, self.tmp_dir.name, max_workers=2, show_progress=False
+        )
+        result = exporter.export(["Joker"])
+        self.assertEqual(2, result.assets)
+        image_path = os.path.join(exporter.site_dir, "images", "Joker.png")
+        # a later export only asks whether the images were modified
+        exporter = StaticExporter(
+            frontend, self.tmp_dir.name, max_workers=2, show_progress=False
+        )
+        result = exporter.export(["Joker"])
+        self.assertEqual(0, result.assets)
+        self.assertEqual(2, result.unchanged_assets)
+        frontend.image_version = 2
+        result = exporter.export(["Joker"])
+        self.assertEqual(2, result.assets)
+        with open(image_path, "rb") as image_file:
+            self.assertEqual(b"image /images/Joker.png 2", image_file.read())
+        self.assertEqual('"2"', exporter.manifest.assets["/images/Joker.png"].etag)
+
+    def test_frame_changes(self):
+        """
+        test that changed css/js resources, minification, filter keys and
+        forms re-render all pages of an incremental export
+        """
+        css_dir = Path(self.tmp_dir.name) / "resources" / "css"
+        css_dir.mkdir(parents=True)
+        css_path = css_dir / "site.css"
+        css_path.write_text("<style>\n  p  {  color: red;  }\n</style>\n")
+        resource_dir = css_dir.parent
+        HtmlFrame._resource_loader = ResourceLoader(
+            resource_dir, resource_dir / "user", check_interval=0
+        )
+        frontend = ImageFrontend()
+        revisions = {"Main Page": 1, "Joker": 2}
+        result = self.get_exporter(frontend).export_incremental(revisions)
+        self.assertEqual(2, result.pages)
+        result = self.get_exporter(frontend).export_incremental(revisions)
+        self.assertEqual(0, result.pages)
+        self.assertEqual(2, result.unchanged)
+
+        def change_resources():
+            css_path.write_text("<style>p { color: blue; }</style>\n")
+
+        def minify_resources():
+            HtmlFrame.configure_resource_loader(
+                builtin_dir=resource_dir, user_dir=resource_dir / "user", minify=True
+            )
+
+        def change_filter_keys():
+            frontend.filterKeys = ["editsection"]
+
+        def change_forms():
+            form_def = make_contact_form()
+            form_def.name = "export"
+            FormRegistry.register(form_def)
+
+        for change in [
+            change_resources,
+            minify_resources,
+            change_filter_keys,
+            change_forms,
+        ]:
+            change()
+            result = self.get_exporter(frontend).export_incremental(revisions)
+            self.assertEqual(2, result.pages, change.__name__)
+            self.assertEqual(0, result.unchanged, change.__name__)
+            result = self.get_exporter(frontend).export_incremental(revisions)
+            self.assertEqual(2, result.unchanged, change.__name__)
+
+    def test_full_export_removes_missing_pages(self):
+        """
+        test that a full export removes the pages of a previous export
+        that no longer exist
+        """
+        frontend = ImageFrontend()
+        exporter = self.get_exporter(frontend)
+        exporter.all_titles = lambda: ["Main Page", "Gone"]
+        exporter.export()
+        gone_path = exporter.page_file_path("Gone")
+        self.assertTrue(os.path.isfile(gone_path))
+        exporter = self.get_exporter(frontend)
+        exporter.all_titles = lambda: ["Main Page"]
+        result = exporter.export()
+        self.assertEqual(["Gone"], result.removed)
+        self.assertFalse(os.path.exists(gone_path))
+        self.assertEqual(["Main Page"], list(exporter.manifest.pages))
+
+    def test_asset_outside_site_dir(self):
+        """
+        test that asset paths leading out of the site directory are not mirrored
+        """
+        frontend = ImageFrontend()
+        exporter = self.get_exporter(frontend)
+        for path in ["/images/../../escaped.png", "/images/../../www2/x.png"]:
+            self.assertIsNone(exporter.export_asset(path))
+        self.assertTrue(exporter.export_asset("/images/a/../Logo.png"))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, "escaped.png")))
+        self.assertTrue(
+            os.path.isfile(os.path.join(exporter.site_dir, "images", "Logo.png"))
+        )
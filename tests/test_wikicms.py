@@ -14,7 +14,7 @@ from tests.smw_access import SMWAccess
 class TestWikiCMS(Basetest):
     """
     test the Mediawiki based Content Management System
-    2 tests in 0.2 secs
+    3 tests in 0.2 secs
     """
 
     def setUp(self):
@@ -59,3 +59,16 @@ class TestWikiCMS(Basetest):
             # Assert that the results match the expectations.
             self.assertEqual(expected_site, site)
             self.assertEqual(expected_path, path)
+
+    def test_frame_of_markup(self):
+        """
+        test getting the frame property from already fetched markup
+        """
+        test_cases = [
+            ("{{#set:frame=reveal}}", "reveal"),
+            ("{{UseFrame|Contact.rythm|\n}}", "Contact"),
+            ("no frame here", None),
+            (None, None),
+        ]
+        for markup, expected in test_cases:
+            self.assertEqual(expected, WikiFrontend.frame_of_markup(markup))